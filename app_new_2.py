@@ -1,212 +1,532 @@
-import openai
+import asyncio
 import time
-import json
-import os
-from audio_text import text_to_ogg
-from audio_text import recognize_audio_whisper
-from config import DEEPSEEK_API_KEY
+import re
+import uuid
+from concurrent.futures import Future
+from audio_text import text_to_ogg, SentenceSpeaker
 from audio_recording import load_audio
+from transcription_queue import get_transcription_queue
+from incremental_asr import record_and_transcribe
+from llm_client import AsyncLLMClient, LLMError
+from metrics import metrics, span, interview_context
+from document_processor import extract_job_title
+from interview_store import get_interview_store
+from interview_reports import export_interview
+
+
+# Конец предложения: знаки препинания (и закрывающие кавычки/скобки), за которыми идёт пробел
+SENTENCE_END = re.compile(r'[.!?…]+["»)]*\s+')
+
+
+def _pop_sentences(buffer):
+    """Отделяет законченные предложения от начала буфера, возвращает (предложения, остаток)"""
+    sentences = []
+    start = 0
+    for match in SENTENCE_END.finditer(buffer):
+        sentence = buffer[start:match.end()].strip()
+        if sentence:
+            sentences.append(sentence)
+        start = match.end()
+    return sentences, buffer[start:]
+
+
+# Бюджеты контекста в токенах (оценка: ~3 символа русского текста на токен)
+PROFILE_TOKEN_BUDGET = 600
+QA_TOKEN_BUDGET = 3000
+
+
+def _approx_tokens(text):
+    return len(text) // 3
+
+
+def _truncate_to_budget(text, budget):
+    """Обрезает текст по границе слова, чтобы он уложился в бюджет токенов"""
+    limit = budget * 3
+    if len(text) <= limit:
+        return text
+    return text[:limit].rsplit(" ", 1)[0] + "…"
+
+
+FEEDBACK_TASK = """Ты HR-специалист. Составь общий краткий фидбек кандидату по результатам интервью.
+На основе ответов кандидата на собеседовании составь краткий общий фидбек (5-6 предложений).
+Игнорируй орфографические ошибки. Ответы могут быть краткими из-за ограничения по времени.
+
+Структура ответа:
+1. Общая оценка выступления
+2. Сильные стороны кандидата
+3. Основные зоны для развития
+4. Краткая рекомендация для будущих собеседований"""
+
+ASSESSMENT_TASK = """Ты старший HR-менеджер. Дай комплексную оценку кандидата после собеседования.
+На основе всего собеседования дай итоговую оценку кандидата. Игнорируй орфографические ошибки.
+Ответы могут быть краткими из-за ограничения по времени.
+
+Сделай комплексную оценку по следующим критериям:
+1. Соответствие вакансии
+2. Профессиональные компетенции
+3. Коммуникативные навыки
+4. Сильные стороны
+5. Зоны развития
+6. Рекомендация к найму (да/нет)
+7. Общий балл от 1 до 10"""
+
+COMBINED_TASK = f"""Подготовь по результатам собеседования два документа и верни JSON-объект
+с ключами "feedback" и "assessment" (значения — текст документов).
+
+Документ "feedback":
+{FEEDBACK_TASK}
+
+Документ "assessment":
+{ASSESSMENT_TASK}"""
 
 
 class InterviewBot:
-    def __init__(self, api_key, job_description, resume, num_questions):
-        openai.api_key = api_key
-        openai.api_base = "https://api.deepseek.com/v1"
+    def __init__(self, api_key, job_description, resume, num_questions, incremental_asr=False,
+                 streaming=True, api_base="https://api.deepseek.com/v1", store=None):
+        self.api_key = api_key
+        self.api_base = api_base
 
         self.job_description = job_description
         self.resume = resume
         self.questions = []
         self.answers = []
+        self.question_numbers = []  # номер каждого вопроса в хранилище
         self.overall_feedback = ""  # фидбек кандидату
         self.final_assessment = ""  # отчёт для HR
         self.current_question_number = 0
         self.num_questions = num_questions
+        self.terminated = False
+        # Распознавать ответ по ходу речи, а не после записи всего файла
+        self.incremental_asr = incremental_asr
+        # Озвучивать вопрос по предложениям, пока LLM ещё генерирует продолжение
+        self.streaming = streaming
+        self.last_first_token_time = None
+        self.last_time_to_first_audio = None
+        # Краткий профиль вакансии и кандидата, строится один раз за интервью
+        self.profile = None
+        # Идентификатор для трассы этапов интервью (metrics.trace_summary) и записи в хранилище
+        self.interview_id = uuid.uuid4().hex[:12]
+        # Вопросы и ответы записываются в хранилище сразу, а не в конце интервью
+        self.store = store or get_interview_store()
+
+    @classmethod
+    def from_store(cls, api_key, interview_id, store=None, **kwargs):
+        """Восстанавливает прерванное интервью из хранилища, чтобы продолжить его"""
+        store = store or get_interview_store()
+        record = store.load(interview_id)
+        if record is None:
+            raise KeyError(f"Интервью {interview_id} не найдено")
+
+        bot = cls(api_key, record["job_description"], record["resume"], record["num_questions"],
+                  store=store, **kwargs)
+        bot.interview_id = interview_id
+        bot.questions = record["questions"]
+        bot.answers = record["answers"]
+        bot.question_numbers = record["numbers"]
+        bot.profile = record["profile"]
+        bot.current_question_number = bot.question_numbers[-1] if bot.question_numbers else 0
+        return bot
+
+    @property
+    def next_question_number(self):
+        """Номер следующего вопроса: после последнего заданного (с ответом или без)"""
+        return self.question_numbers[-1] + 1 if self.question_numbers else 1
+
+    def _persist(self, method, *args, **kwargs):
+        """Запись в хранилище; ошибка записи не прерывает интервью"""
+        try:
+            getattr(self.store, method)(self.interview_id, *args, **kwargs)
+        except Exception as e:
+            print(f"⚠️ Ошибка записи интервью в хранилище: {e}")
+
+    def start_record(self):
+        """Регистрирует интервью в хранилище (при продолжении снова делает его активным)"""
+        self._persist("start", self.job_description, self.resume, self.num_questions,
+                      job_title=extract_job_title(self.job_description))
+
+    def record_question(self, question):
+        number = self.next_question_number
+        self.questions.append(question)
+        self.question_numbers.append(number)
+        self._persist("add_question", number, question,
+                      first_token=self.last_first_token_time, first_audio=self.last_time_to_first_audio)
+
+    def record_answer(self, answer):
+        """Добавляет ответ; ответ, который ещё распознаётся (Future), записывается по готовности"""
+        self.answers.append(answer)
+        number = self.question_numbers[len(self.answers) - 1]
+        if isinstance(answer, Future):
+            answer.add_done_callback(lambda future: self._persist(
+                "add_answer", number, future.result() if future.exception() is None
+                else "Не удалось распознать ответ"))
+        else:
+            self._persist("add_answer", number, answer)
+
+    def mark_failed(self, error):
+        self._persist("fail", error)
 
     def generate_question(self, previous_answer=None):
         """Генерирует следующий вопрос на основе предыдущего ответа"""
+        messages = self._question_messages(previous_answer)
+        with span("llm", kind="question"):
+            response = self._chat_completion(messages)
+
+        return response.choices[0].message.content
+
+    def stream_question(self, previous_answer=None, on_sentence=None):
+        """Генерирует вопрос потоково: каждое готовое предложение сразу передаётся в on_sentence"""
+        messages = self._question_messages(previous_answer)
+        start = time.perf_counter()
+        parts = []
+        buffer = ""
+        self.last_first_token_time = None
+        with span("llm", kind="question_stream"):
+            response = self._chat_completion(messages, stream=True)
+            for chunk in response:
+                delta = chunk.choices[0].delta.get("content") or ""
+                if not delta:
+                    continue
+                if self.last_first_token_time is None:
+                    self.last_first_token_time = time.perf_counter() - start
+                    metrics.record_span("llm_first_token", self.last_first_token_time)
+                parts.append(delta)
+                sentences, buffer = _pop_sentences(buffer + delta)
+                if on_sentence:
+                    for sentence in sentences:
+                        on_sentence(sentence)
+
+        if buffer.strip() and on_sentence:
+            on_sentence(buffer.strip())
+        return "".join(parts).strip()
+
+    def ask_question(self, previous_answer=None, on_sentence=None):
+        """Генерирует и озвучивает вопрос: звук начинается с первого готового предложения.
+
+        Ждёт окончания воспроизведения, чтобы сразу после него начать запись ответа.
+        """
+        speaker = SentenceSpeaker()
+        start = time.perf_counter()
+
+        def handle(sentence):
+            speaker.say(sentence)
+            if on_sentence:
+                on_sentence(sentence)
+
+        try:
+            question = self.stream_question(previous_answer, on_sentence=handle)
+        finally:
+            speaker.close()
+        speaker.wait()
+
+        if speaker.first_audio_at is not None:
+            self.last_time_to_first_audio = speaker.first_audio_at - start
+            metrics.record_span("first_audio", self.last_time_to_first_audio)
+            print(f"⏱️ Первый звук через {self.last_time_to_first_audio:.2f} с")
+        return question
+
+    async def astream_question(self, client, previous_answer=None, on_sentence=None):
+        """Асинхронная версия stream_question через AsyncLLMClient"""
+        messages = self._question_messages(previous_answer)
+        start = time.perf_counter()
+        parts = []
+        buffer = ""
+        self.last_first_token_time = None
+        with span("llm", kind="question_stream"):
+            async for delta in client.chat_stream(messages):
+                if self.last_first_token_time is None:
+                    self.last_first_token_time = time.perf_counter() - start
+                    metrics.record_span("llm_first_token", self.last_first_token_time)
+                parts.append(delta)
+                sentences, buffer = _pop_sentences(buffer + delta)
+                if on_sentence:
+                    for sentence in sentences:
+                        on_sentence(sentence)
+
+        if buffer.strip() and on_sentence:
+            on_sentence(buffer.strip())
+        return "".join(parts).strip()
+
+    def _chat_completion(self, messages, **params):
+        """Синхронный запрос к LLM; openai импортируется при первом вызове"""
+        import openai
+
+        return openai.ChatCompletion.create(model="deepseek-chat", messages=messages,
+                                            api_key=self.api_key, api_base=self.api_base, **params)
+
+    def _question_messages(self, previous_answer=None):
         if previous_answer is None:
             prompt = 'Начни собеседование. Задай первый релевантный вопрос кандидату.'
         else:
             prompt = f'Ответ кандидата: {previous_answer}. Сформулируй следующий логичный вопрос.'
 
-        response = openai.ChatCompletion.create(
-            model="deepseek-chat",
-            messages=[
-                {"role": "system",
-                 "content": f'Ты HR-интервьюер. Тебя зовут Лев. Вакансия: {self.job_description}. '
-                            f'Резюме: {self.resume}. Задавай вопросы по очереди. '
-                            f'Всего вопросов: {self.num_questions}.'
-                            f'Задавай наводящие и уточняющие вопросы'},
-                {"role": "user", "content": prompt},
-            ]
-        )
+        return [
+            self._context_message(),
+            {"role": "user",
+             "content": f'Ты HR-интервьюер. Задавай вопросы по очереди. '
+                        f'Задавай наводящие и уточняющие вопросы. {prompt}'},
+        ]
 
-        return response.choices[0].message.content
+    def _context_message(self):
+        """Общий системный промпт всех запросов интервью.
 
-    def generate_overall_feedback(self,last_answer_note=""):
-        """Генерирует общий краткий фидбек кандидату по всем ответам"""
-        feedback_prompt = f"""
-        На основе ответов кандидата на собеседовании составь краткий общий фидбек (5-6 предложений). 
-        Игнорируй орфографические ошибки. Ответы могут быть краткими из-за ограничения по времени
+        Он одинаков для вопросов, фидбека и оценки, поэтому провайдер может
+        кэшировать этот префикс, а вакансия и резюме не пересылаются целиком каждый раз.
+        """
+        return {"role": "system",
+                "content": f'Тебя зовут Лев, ты проводишь собеседование.\n'
+                           f'{self.build_profile()}\n'
+                           f'Всего вопросов: {self.num_questions}.'}
+
+    def build_profile(self):
+        """Краткий профиль вакансии и кандидата (навыки, опыт, требования), строится один раз"""
+        if self.profile is not None:
+            return self.profile
+
+        profile_prompt = self._profile_prompt()
+        if profile_prompt is None:
+            self.profile = self._plain_profile()
+            return self.profile
+
+        try:
+            with span("llm", kind="profile"):
+                response = self._chat_completion([{"role": "user", "content": profile_prompt}],
+                                                 max_tokens=2 * PROFILE_TOKEN_BUDGET)
+            self.profile = response.choices[0].message.content.strip()
+        except Exception as e:
+            print(f"⚠️ Ошибка построения профиля, используются сокращённые документы: {e}")
+            self.profile = self._plain_profile(PROFILE_TOKEN_BUDGET)
+        # Сжатый профиль сохраняется, чтобы при продолжении интервью не запрашивать его снова
+        self._persist("set_profile", self.profile)
+        return self.profile
+
+    async def abuild_profile(self, client):
+        """Асинхронная версия build_profile через AsyncLLMClient"""
+        if self.profile is not None:
+            return self.profile
+
+        profile_prompt = self._profile_prompt()
+        if profile_prompt is None:
+            self.profile = self._plain_profile()
+            return self.profile
+
+        try:
+            with span("llm", kind="profile"):
+                profile = await client.chat([{"role": "user", "content": profile_prompt}],
+                                            max_tokens=2 * PROFILE_TOKEN_BUDGET)
+            self.profile = profile.strip()
+        except Exception as e:
+            print(f"⚠️ Ошибка построения профиля, используются сокращённые документы: {e}")
+            self.profile = self._plain_profile(PROFILE_TOKEN_BUDGET)
+        self._persist("set_profile", self.profile)
+        return self.profile
+
+    def _plain_profile(self, budget=None):
+        job_description, resume = self.job_description, self.resume
+        if budget:
+            job_description = _truncate_to_budget(job_description, budget)
+            resume = _truncate_to_budget(resume, budget)
+        return f'ВАКАНСИЯ: {job_description}\nРЕЗЮМЕ КАНДИДАТА: {resume}'
+
+    def _profile_prompt(self):
+        """Запрос на сжатие документов в профиль или None, если они и так короткие"""
+        if _approx_tokens(self.job_description) + _approx_tokens(self.resume) <= 2 * PROFILE_TOKEN_BUDGET:
+            return None
+
+        return f"""
+        Сожми вакансию и резюме в краткие профили для интервьюера. Пиши только факты, без вступлений.
 
         ВАКАНСИЯ: {self.job_description}
         РЕЗЮМЕ КАНДИДАТА: {self.resume}
-        ВОПРОСЫ И ОТВЕТЫ:
-        {self._format_qa_for_assessment()}
-        {last_answer_note}
- 
-        Структура ответа:
-        1. Общая оценка выступления
-        2. Сильные стороны кандидата
-        3. Основные зоны для развития
-        4. Краткая рекомендация для будущих собеседований
+
+        Формат ответа:
+        ВАКАНСИЯ: должность; ключевые требования; обязанности; условия
+        КАНДИДАТ: ключевые навыки; опыт работы (места, роли, годы); образование
         """
 
-        response = openai.ChatCompletion.create(
-            model="deepseek-chat",
-            messages=[
-                {"role": "system",
-                 "content": "Ты HR-специалист. Составь общий краткий фидбек кандидату по результатам интервью."},
-                {"role": "user", "content": feedback_prompt},
-            ]
-        )
+    def generate_overall_feedback(self,last_answer_note=""):
+        """Генерирует общий краткий фидбек кандидату по всем ответам"""
+        messages = self._report_messages(FEEDBACK_TASK, last_answer_note)
+        with span("llm", kind="feedback"):
+            response = self._chat_completion(messages)
         return response.choices[0].message.content
 
     def generate_final_assessment(self, last_answer_note=""):
         """Генерирует итоговую оценку кандидата для HR"""
-        assessment_prompt = f"""
-        На основе всего собеседования дай итоговую оценку кандидата. Игнорируй орфографические ошибки. 
-        Ответы могут быть краткими из-за ограничения по времени
+        messages = self._report_messages(ASSESSMENT_TASK, last_answer_note)
+        with span("llm", kind="assessment"):
+            response = self._chat_completion(messages)
+        return response.choices[0].message.content
 
-        ВАКАНСИЯ: {self.job_description}
-        РЕЗЮМЕ КАНДИДАТА: {self.resume}
-        ВОПРОСЫ И ОТВЕТЫ:
-        {self._format_qa_for_assessment()}
-        {last_answer_note}
-
-        Сделай комплексную оценку по следующим критериям:
-        1. Соответствие вакансии
-        2. Профессиональные компетенции 
-        3. Коммуникативные навыки
-        4. Сильные стороны
-        5. Зоны развития
-        6. Рекомендация к найму (да/нет)
-        7. Общий балл от 1 до 10
+    def generate_reports(self, last_answer_note="", combined=False):
+        """Фидбек кандидату и оценка для HR: оба запроса идут к LLM одновременно.
+
+        Возвращает (фидбек, оценка); если запрос не удался, вместо текста — исключение.
         """
+        with interview_context(self.interview_id):
+            return asyncio.run(self.agenerate_reports(last_answer_note, combined))
 
-        response = openai.ChatCompletion.create(
-            model="deepseek-chat",
-            messages=[
-                {"role": "system",
-                 "content": "Ты старший HR-менеджер. Дай комплексную оценку кандидата после собеседования."},
-                {"role": "user", "content": assessment_prompt},
-            ]
-        )
-        return response.choices[0].message.content
+    async def agenerate_reports(self, last_answer_note="", combined=False, client=None):
+        """Асинхронная версия generate_reports; combined=True — один структурированный запрос"""
+        own_client = client is None
+        if own_client:
+            client = AsyncLLMClient(self.api_key, api_base=self.api_base)
+        try:
+            if combined:
+                try:
+                    with span("llm", kind="reports_combined"):
+                        data = await client.chat_json(self._report_messages(COMBINED_TASK, last_answer_note))
+                    return data["feedback"], data["assessment"]
+                except (LLMError, ValueError, KeyError) as e:
+                    print(f"⚠️ Ошибка совмещённого запроса, делаем два отдельных: {e}")
+
+            feedback, assessment = await asyncio.gather(
+                self._timed_chat(client, self._report_messages(FEEDBACK_TASK, last_answer_note), "feedback"),
+                self._timed_chat(client, self._report_messages(ASSESSMENT_TASK, last_answer_note), "assessment"),
+                return_exceptions=True)
+            return feedback, assessment
+        finally:
+            if own_client:
+                await client.close()
+
+    @staticmethod
+    async def _timed_chat(client, messages, kind):
+        with span("llm", kind=kind):
+            return await client.chat(messages)
+
+    def complete_reports(self, last_answer_note="", combined=False):
+        """Формирует оба итоговых отчёта, подставляя заглушки при ошибках"""
+        try:
+            feedback, assessment = self.generate_reports(last_answer_note, combined)
+        except Exception as e:
+            feedback = assessment = e
+        return self.set_reports(feedback, assessment)
+
+    def set_reports(self, feedback, assessment):
+        """Сохраняет отчёты; вместо неудавшихся (исключений) подставляет заглушки"""
+        if isinstance(feedback, Exception):
+            print(f"⚠️ Ошибка генерации фидбека: {feedback}")
+            feedback = "Не удалось сгенерировать общий фидбек"
+        if isinstance(assessment, Exception):
+            print(f"⚠️ Ошибка генерации итоговой оценки: {assessment}")
+            assessment = "Не удалось сгенерировать итоговую оценку"
+
+        self.overall_feedback = feedback
+        self.final_assessment = assessment
+        return feedback, assessment
+
+    def _report_messages(self, task, last_answer_note=""):
+        return [
+            self._context_message(),
+            {"role": "user",
+             "content": f"{task}\n\nВОПРОСЫ И ОТВЕТЫ:\n{self._format_qa_for_assessment()}\n{last_answer_note}"},
+        ]
+
+    def submit_answer(self, audio_file):
+        """Отправляет запись ответа на фоновое распознавание, не дожидаясь текста"""
+        self.record_answer(get_transcription_queue().submit(audio_file))
+
+    def wait_answers(self):
+        """Дожидается распознавания всех отправленных ответов"""
+        resolved = []
+        for answer in self.answers:
+            if isinstance(answer, Future):
+                try:
+                    answer = answer.result()
+                except Exception as e:
+                    print(f"⚠️ Ошибка распознавания ответа: {e}")
+                    answer = "Не удалось распознать ответ"
+            resolved.append(answer)
+        self.answers = resolved
+        return self.answers
 
     def _format_qa_for_assessment(self, last_answer_note=""):
         """Форматирует вопросы и ответы для итоговой оценки"""
+        self.wait_answers()
+        pairs = list(zip(self.questions, self.answers))
+        # Если диалог не помещается в бюджет, поровну урезаем каждую пару вопрос-ответ
+        pair_budget = QA_TOKEN_BUDGET // max(len(pairs), 1)
         formatted = ""
-        for i, (question, answer) in enumerate(zip(self.questions, self.answers), 1):
+        for i, (question, answer) in enumerate(pairs, 1):
+            if _approx_tokens(question) + _approx_tokens(answer) > pair_budget:
+                question = _truncate_to_budget(question, pair_budget // 3)
+                answer = _truncate_to_budget(answer, pair_budget - _approx_tokens(question))
             formatted += f"{i}. В: {question}\n   О: {answer}\n\n"
         return formatted
 
     def conduct_interview(self, num_questions=3):
-        """Проводит собеседование и формирует 2 отчёта"""
+        """Проводит собеседование (или продолжает восстановленное) и формирует 2 отчёта"""
+        with interview_context(self.interview_id):
+            self._conduct_interview(num_questions)
+        self.print_timings()
+        # Отчёты строятся из хранилища отдельным шагом
+        export_interview(self.interview_id, store=self.store)
+
+    def _conduct_interview(self, num_questions):
         print("=== НАЧАЛО СОБЕСЕДОВАНИЯ ===\n")
+        self.start_record()
 
-        for i in range(num_questions):
-            self.current_question_number = i + 1
+        for number in range(self.next_question_number, num_questions + 1):
+            self.current_question_number = number
 
-            # Генерируем вопрос
+            # Генерируем вопрос (текст предыдущего ответа нужен только сейчас)
+            self.wait_answers()
             previous_answer = self.answers[-1] if self.answers else None
-            question = self.generate_question(previous_answer)
-            self.questions.append(question)
-
-            # Выводим вопрос
             print(f"🔹 Вопрос {self.current_question_number}/{num_questions}:")
-            print(f"{question}\n")
 
-            # Озвучиваем вопрос
-            try:
-                text_to_ogg(question)
-            except Exception as e:
-                print(f"⚠️ Ошибка озвучивания: {e}")
+            if self.streaming:
+                # Выводим и озвучиваем вопрос по предложениям, пока он генерируется
+                question = self.ask_question(previous_answer, on_sentence=print)
+                self.record_question(question)
+                print()
+            else:
+                question = self.generate_question(previous_answer)
+                self.record_question(question)
+
+                # Выводим вопрос
+                print(f"{question}\n")
+
+                # Озвучиваем вопрос
+                try:
+                    text_to_ogg(question)
+                except Exception as e:
+                    print(f"⚠️ Ошибка озвучивания: {e}")
 
-            # Получаем ответ
+            # Получаем ответ: распознавание идёт в фоне
             try:
-                audio_file = load_audio()
-                answer = recognize_audio_whisper(audio_file)
-                self.answers.append(answer)
+                if self.incremental_asr:
+                    _, answer = record_and_transcribe()
+                    self.record_answer(answer)
+                else:
+                    audio_file = load_audio()
+                    self.submit_answer(audio_file)
             except Exception as e:
                 print(f"⚠️ Ошибка записи аудио: {e}")
                 answer = "Не удалось распознать ответ"
-                self.answers.append(answer)
+                self.record_answer(answer)
 
             print("-" * 60 + "\n")
-            time.sleep(2)
 
-        # Фидбек кандидату
-        print("📝 Генерируем общий фидбек для кандидата...")
-        try:
-            self.overall_feedback = self.generate_overall_feedback()
-            print("\n=== ФИДБЕК ДЛЯ КАНДИДАТА ===")
-            print(self.overall_feedback)
-        except Exception as e:
-            print(f"⚠️ Ошибка генерации фидбека: {e}")
-            self.overall_feedback = "Не удалось сгенерировать общий фидбек"
-
-        # Оценка для HR
-        print("\n🎯 Генерируем итоговую оценку для HR...")
-        try:
-            self.final_assessment = self.generate_final_assessment()
-            print("=== ОЦЕНКА ДЛЯ HR ===")
-            print(self.final_assessment)
-        except Exception as e:
-            print(f"⚠️ Ошибка генерации итоговой оценки: {e}")
-            self.final_assessment = "Не удалось сгенерировать итоговую оценку"
+        # Фидбек кандидату и оценка для HR — одновременно
+        print("📝 Генерируем фидбек для кандидата и итоговую оценку для HR...")
+        self.complete_reports()
+        print("\n=== ФИДБЕК ДЛЯ КАНДИДАТА ===")
+        print(self.overall_feedback)
+        print("\n=== ОЦЕНКА ДЛЯ HR ===")
+        print(self.final_assessment)
 
         self.save_interview()
 
     def save_interview(self):
-        """Сохраняет результаты собеседования в разные файлы"""
-        os.makedirs("reports", exist_ok=True)
-
-        results = {
-            "job_description": self.job_description,
-            "resume": self.resume,
-            "questions": self.questions,
-            "answers": self.answers,
-            "overall_feedback": self.overall_feedback,
-            "final_assessment": self.final_assessment
-        }
+        """Сохраняет итог собеседования в хранилище (отчёты в файлы — interview_reports.export_interview)"""
+        self.wait_answers()
+        self._persist("finish", self.overall_feedback, self.final_assessment,
+                      timings=self.timings(), terminated=self.terminated)
 
-        try:
-            # JSON — общий архив
-            with open("reports/interview_results.json", "w", encoding="utf-8") as f:
-                json.dump(results, f, ensure_ascii=False, indent=2)
-
-            # TXT для кандидата
-            with open("reports/candidate_feedback.txt", "w", encoding="utf-8") as f:
-                f.write("=== ФИДБЕК ДЛЯ КАНДИДАТА ===\n\n")
-                f.write(self.overall_feedback)
-
-            # TXT для HR
-            with open("reports/hr_assessment.txt", "w", encoding="utf-8") as f:
-                f.write("=== ОЦЕНКА ДЛЯ HR ===\n\n")
-                f.write(f"ВАКАНСИЯ: {self.job_description}\n")
-                f.write(f"КАНДИДАТ: {self.resume[:200]}...\n\n")
-                f.write("=== ВОПРОСЫ И ОТВЕТЫ ===\n")
-                for i, (question, answer) in enumerate(zip(self.questions, self.answers), 1):
-                    f.write(f"\n🔹 ВОПРОС {i}:\n{question}\n")
-                    f.write(f"💬 ОТВЕТ:\n{answer}\n")
-                    f.write("-" * 50 + "\n")
-                f.write("\n=== ИТОГОВАЯ ОЦЕНКА ===\n")
-                f.write(self.final_assessment)
-
-            print("\n💾 Результаты сохранены в файлы:")
-            print("   - reports/candidate_feedback.txt (фидбек для кандидата)")
-            print("   - reports/hr_assessment.txt (оценка для HR)")
-            print("   - reports/interview_results.json (архив)")
-        except Exception as e:
-            print(f"❌ Ошибка сохранения результатов: {e}")
+    def print_timings(self):
+        """Сводка времени по этапам этого интервью"""
+        print("\n⏱️ Время по этапам интервью:")
+        for stage, stats in sorted(self.timings().items(), key=lambda item: -item[1]["total"]):
+            print(f"   {stage}: {stats['count']} раз, всего {stats['total']:.2f} с, максимум {stats['max']:.2f} с")
+
+    def timings(self):
+        return metrics.trace_summary(self.interview_id)
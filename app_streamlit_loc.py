@@ -1,16 +1,96 @@
 import streamlit as st
-import torch
 import time
 import os
 from config import DEEPSEEK_API_KEY
-from audio_recording import load_audio
-from audio_text import recognize_audio_whisper, text_to_ogg
-from document_processor import DocumentReader, extract_job_title, get_embedding, _generate_recommendation
-from app_new_2 import InterviewBot  
+import hashlib
+from document_processor import (DocumentReader, extract_job_title, get_embedding, _generate_recommendation, MATCH_THRESHOLD,
+                                default_model_path)
+from embedding_cache import get_embedding_cache
+from vector_index import get_resume_index
+from interview_engine import get_interview_engine, ASKING, SPEAKING, RECORDING, TRANSCRIBING, REPORTING, FINISHED, FAILED
+from warmup import start_warmup
+from interview_store import get_interview_store, FINISHED as STORE_FINISHED
+from interview_reports import render_candidate_feedback, render_hr_assessment
+from lexical_scoring import get_lexical_scorer
+
+MODEL_PATH = default_model_path()
+# Как часто страница опрашивает состояние интервью
+POLL_INTERVAL = 0.5
+# Сколько прерванных интервью показывать в боковой панели
+UNFINISHED_SHOWN = 10
+
+STATE_LABELS = {
+    ASKING: "💭 Лев формулирует вопрос...",
+    SPEAKING: "🔊 Лев задаёт вопрос...",
+    RECORDING: "🎙️ Говорите (до 25 секунд, запись остановится после паузы)...",
+    TRANSCRIBING: "📝 Распознаём ответ...",
+    REPORTING: "📊 Готовим фидбек и итоговую оценку...",
+}
+
+
+
+@st.cache_resource
+def _start_warmup():
+    # Один раз на серверный процесс: модели грузятся в фоне, пока пользователь загружает документы
+    return start_warmup(MODEL_PATH)
+
+
+def _upload_key(*files):
+    """Идентификатор загруженных файлов: имя и содержимое"""
+    digest = hashlib.sha256()
+    for file in files:
+        digest.update(file.name.encode("utf-8"))
+        digest.update(file.getvalue())
+    return digest.hexdigest()
+
+
+def _analyze(job_file, resume_file):
+    """Разбор документов, навыки и схожесть — один раз на загрузку, а не на каждый перезапуск скрипта"""
+    job_path = f"uploaded_{job_file.name}"
+    resume_path = f"uploaded_{resume_file.name}"
+    with open(job_path, "wb") as f:
+        f.write(job_file.getvalue())
+    with open(resume_path, "wb") as f:
+        f.write(resume_file.getvalue())
+
+    # Большие PDF разбираются по диапазонам страниц в нескольких процессах
+    pdf_workers = os.cpu_count() or 1
+    job_text = DocumentReader(job_path, pdf_workers=pdf_workers).extract_text()
+    resume_text = DocumentReader(resume_path, pdf_workers=pdf_workers).extract_text()
+    analysis = {
+        "job_text": job_text,
+        "resume_text": resume_text,
+        "job_title": extract_job_title(job_text),
+        # Навыки из требований вакансии, найденные в резюме (без модели, по словарю навыков)
+        "skills": get_lexical_scorer().explain(job_text, resume_text),
+        "similarity": None,
+        "job_emb": None,
+        "error": None,
+    }
+
+    try:
+        job_emb = get_embedding(job_text, MODEL_PATH, chunked=True)
+        resume_emb = get_embedding(resume_text, MODEL_PATH, chunked=True)
+        if job_emb is not None and resume_emb is not None:
+            analysis["similarity"] = (resume_emb @ job_emb.T).item() * 100
+            analysis["job_emb"] = job_emb[0].numpy()
+
+            # Сохраняем резюме в пул кандидатов; уже известное резюме индекс на диске не переписывает
+            resume_index = get_resume_index(resume_emb.shape[1])
+            candidate_id = hashlib.sha256(resume_text.encode("utf-8")).hexdigest()[:16]
+            if candidate_id not in resume_index:
+                resume_index.add(candidate_id, resume_emb[0].numpy(),
+                                 {"file": resume_file.name, "vacancy": analysis["job_title"]})
+                resume_index.save()
+    except Exception as e:
+        analysis["error"] = str(e)
+    return analysis
+
 
 # Настройки страницы 
 st.set_page_config(page_title="Interview Bot", page_icon="🤖", layout="wide")
 st.title("🤖 HR - бот Лев")
+warmup = _start_warmup()
 
 #  Загрузка документов 
 st.header("📂 Загрузка документов")
@@ -20,125 +100,151 @@ resume_file = st.file_uploader("Резюме кандидата", type=["pdf", "
 job_text, resume_text, similarity = None, None, None
 
 if job_file and resume_file:
-    job_path = f"uploaded_{job_file.name}"
-    resume_path = f"uploaded_{resume_file.name}"
-    with open(job_path, "wb") as f:
-        f.write(job_file.read())
-    with open(resume_path, "wb") as f:
-        f.write(resume_file.read())
-
-    job_text = DocumentReader(job_path).extract_text()
-    resume_text = DocumentReader(resume_path).extract_text()
+    # Пока идёт интервью, страница перезапускается каждые POLL_INTERVAL — анализ берётся из session_state
+    upload_key = _upload_key(job_file, resume_file)
+    analysis = st.session_state.get("analysis")
+    if analysis is None or analysis["key"] != upload_key:
+        analysis = {"key": upload_key, **_analyze(job_file, resume_file)}
+        st.session_state["analysis"] = analysis
+    job_text, resume_text, similarity = analysis["job_text"], analysis["resume_text"], analysis["similarity"]
 
     st.subheader("📊 Анализ документов")
-    job_title = extract_job_title(job_text)
-    st.write(f"**Вакансия:** {job_title}")
+    st.write(f"**Вакансия:** {analysis['job_title']}")
 
-    try:
-        model_path = "model" if os.path.exists("model/config.json") else "cointegrated/rubert-tiny2"
-        job_emb = get_embedding(job_text, model_path)
-        resume_emb = get_embedding(resume_text, model_path)
-        if job_emb is not None and resume_emb is not None:
-            similarity = torch.mm(resume_emb, job_emb.T).item() * 100
-            st.write(f"🔗 Схожесть резюме и вакансии: **{similarity:.2f}%**")
-            st.info(_generate_recommendation(similarity))
-    except Exception as e:
-        st.error(f"❌ Ошибка вычисления эмбеддингов: {e}")
+    skills = analysis["skills"]
+    if skills["required"]:
+        st.write(f"🧩 Навыки вакансии в резюме: **{len(skills['matched'])}/{len(skills['required'])}**")
+        if skills["missing"]:
+            st.caption(f"Не найдены: {', '.join(skills['missing'])}")
+
+    if analysis["error"]:
+        st.error(f"❌ Ошибка вычисления эмбеддингов: {analysis['error']}")
+    elif similarity is not None:
+        st.write(f"🔗 Схожесть резюме и вакансии: **{similarity:.2f}%**")
+        st.info(_generate_recommendation(similarity))
+        cache_stats = get_embedding_cache(MODEL_PATH).stats()
+        st.caption(f"Кэш эмбеддингов: {cache_stats['entries']} записей, "
+                   f"попаданий {cache_stats['hit_rate']:.0%}")
+
+        # Лучшие кандидаты из пула под эту вакансию
+        resume_index = get_resume_index(len(analysis["job_emb"]))
+        with st.expander("👥 Лучшие кандидаты из базы для этой вакансии"):
+            for match in resume_index.search(analysis["job_emb"], top_k=5, min_score=MATCH_THRESHOLD):
+                st.write(f"{match['metadata'].get('file', match['candidate_id'])}: **{match['score']:.2f}%**")
 
 #  Автоматический диалог 
-if similarity and similarity >= 85.5:
+if similarity and similarity >= MATCH_THRESHOLD:
     st.success("✅ Кандидат подходит! Можно начать собеседование.")
     num_questions = st.slider("Количество вопросов", 3, 30, 5)
 
     if st.button("🚀 Старт собеседования"):
-        bot = InterviewBot(
+        # Интервью идёт в фоне в движке; скрипт только показывает его состояние
+        session_id = get_interview_engine().start_session(
             api_key=DEEPSEEK_API_KEY,
             job_description=job_text,
             resume=resume_text,
-            num_questions=num_questions  # передаём количество вопросов
+            num_questions=num_questions,  # передаём количество вопросов
+            local_audio=True
         )
-        st.session_state["bot"] = bot
-        st.session_state["num_questions"] = num_questions
+        st.session_state["session_id"] = session_id
         st.session_state["dialog_active"] = True
-        st.session_state["current_question"] = 0
-        st.session_state["chat_log"] = []
-        st.session_state["interview_terminated"] = False
         st.rerun()
 
+# Интервью, прерванные падением сервера, можно продолжить с первого вопроса без ответа.
+# Список читается из хранилища один раз за сессию браузера и обновляется после интервью
+if not st.session_state.get("dialog_active"):
+    if "unfinished" not in st.session_state:
+        st.session_state["unfinished"] = get_interview_store().unfinished(limit=UNFINISHED_SHOWN)
+    unfinished = [interview for interview in st.session_state["unfinished"]
+                  if interview["id"] not in get_interview_engine().sessions]
+    if unfinished:
+        with st.sidebar.expander(f"⏸️ Прерванные интервью ({len(unfinished)})"):
+            for interview in unfinished:
+                if st.button(f"▶️ {interview['job_title'] or interview['id']}", key=f"resume_{interview['id']}"):
+                    st.session_state["session_id"] = get_interview_engine().resume_session(
+                        interview["id"], api_key=DEEPSEEK_API_KEY, local_audio=True)
+                    st.session_state["dialog_active"] = True
+                    st.session_state.pop("unfinished", None)
+                    st.rerun()
+
+
+def _show_answers(questions, answers):
+    for i, (question, answer) in enumerate(zip(questions, answers), 1):
+        st.markdown(f"**🔹 Вопрос {i}:** {question}")
+        st.markdown(f"**💬 Ответ:** {answer}")
+
+
+def _show_downloads(session_id):
+    # Отчёты строятся из хранилища по запросу
+    record = get_interview_store().load(session_id)
+    st.download_button("⬇️ Отчёт для HR", render_hr_assessment(record),
+                       file_name=f"hr_assessment_{session_id}.txt")
+    st.download_button("⬇️ Фидбек для кандидата", render_candidate_feedback(record),
+                       file_name=f"candidate_feedback_{session_id}.txt")
+
+
+def _end_dialog():
+    st.session_state["dialog_active"] = False
+    st.session_state.pop("unfinished", None)
+
+
 if st.session_state.get("dialog_active"):
-    bot = st.session_state["bot"]
-    current_q = st.session_state["current_question"]
+    engine = get_interview_engine()
+    session_id = st.session_state["session_id"]
 
     # === Досрочное завершение ===
-    # При нажатии кнопки досрочного завершения
     if st.button("🛑 Закончить собеседование"):
-        bot.terminated = True
-        last_answer_note = "⚠️ Кандидат досрочно завершил интервью. Он сам закончил собеседование."
+        engine.stop_session(session_id)
 
-        # Генерация итогов
-        bot.overall_feedback = bot.generate_overall_feedback(last_answer_note=last_answer_note)
-        bot.final_assessment = bot.generate_final_assessment(last_answer_note=last_answer_note)
-        bot.save_interview()
-
-        # Вывод на экран
-        st.subheader("📊 Итоговая оценка для HR")
-        st.write(bot.final_assessment)
-        st.sidebar.subheader("📝 Фидбек для кандидата")
-        st.sidebar.write(bot.overall_feedback)
-
-        # Останавливаем интервью сразу
-        st.session_state["dialog_active"] = False
-        st.stop()
-
-    # === Генерация вопросов ===
-    if current_q < st.session_state["num_questions"]:
-        prev_answer = bot.answers[-1] if bot.answers else None
-        question = bot.generate_question(prev_answer)
-        if question is None:
-            st.session_state["current_question"] = st.session_state["num_questions"]
-            st.rerun()
-
-        bot.questions.append(question)
-
-        
-        st.write(question)
-
-        try:
-            text_to_ogg(question)
-        except:
-            pass
-
-        st.write("🎙️ Говорите (25 секунд)...")
-        try:
-            audio_file = load_audio(duration=25)
-            answer = recognize_audio_whisper(audio_file)
-            bot.answers.append(answer)
-        except:
-            answer = "Не удалось распознать ответ"
-            bot.answers.append(answer)
-
-        # Заглушка фидбека по каждому вопросу
-        feedback = "Обратная связь будет дана после завершения интервью"
-        st.session_state["chat_log"].append({"question": question, "answer": answer, "feedback": feedback})
-        st.session_state["current_question"] += 1
-        time.sleep(1)
-        st.rerun()
+    status = engine.status(session_id)
 
-    else:  # автоматическое завершение
-        bot.terminated = False
-        candidate_feedback = bot.generate_overall_feedback()
-        final_assessment = bot.generate_final_assessment()
-        bot.overall_feedback = candidate_feedback
-        bot.final_assessment = final_assessment
-        bot.save_interview()
+    if status is None:
+        # Движок уже забыл сессию (SESSION_TTL) или сервер перезапускался — показываем сохранённое
+        record = get_interview_store().load(session_id)
+        if record is None:
+            st.warning("⚠️ Интервью не найдено")
+        else:
+            _show_answers(record["questions"], record["answers"])
+            if record["status"] == STORE_FINISHED:
+                st.subheader("📊 Итоговая оценка для HR")
+                st.write(record["final_assessment"])
+                _show_downloads(session_id)
+            else:
+                st.info("⏸️ Интервью не завершено — его можно продолжить из списка прерванных")
+        st.session_state.pop("session_id", None)
+        _end_dialog()
 
+    elif status["state"] == FINISHED:
+        _show_answers(status["questions"], status["answers"])
         st.subheader("📊 Итоговая оценка для HR")
-        st.write(final_assessment)
+        st.write(status["final_assessment"])
 
         with st.sidebar.expander("📝 Фидбек для кандидата", expanded=True):
-            st.write(candidate_feedback)
+            st.write(status["overall_feedback"])
 
-        st.session_state["dialog_active"] = False
+        with st.expander("⏱️ Время по этапам интервью"):
+            st.table([{"этап": stage, **stats} for stage, stats in status["timings"].items()])
+
+        _show_downloads(session_id)
+
+        # Интервью уже в хранилище — сессия в движке больше не нужна
+        engine.remove_session(session_id)
+        _end_dialog()
+
+    elif status["state"] == FAILED:
+        _show_answers(status["questions"], status["answers"])
+        st.error(f"❌ Интервью прервано: {status['error']}")
+        engine.remove_session(session_id)
+        _end_dialog()
+
+    else:
+        _show_answers(status["questions"], status["answers"])
+        if status["state"] in (ASKING, SPEAKING, RECORDING):
+            st.markdown(f"**🔹 Вопрос {status['question_number']}/{status['num_questions']}:** "
+                        f"{status['question_text']}")
+        st.info(STATE_LABELS.get(status["state"], "⏳ Подготовка..."))
+        time.sleep(POLL_INTERVAL)
+        st.rerun()
 
 #  Информация о системе 
 st.sidebar.info("""
@@ -148,3 +254,7 @@ st.sidebar.info("""
 - AI: DeepSeek API
 - Поддержка форматов: PDF, DOCX, RTF, TXT, CSV, JSON
 """)
+if not warmup.done.is_set():
+    st.sidebar.caption("🔥 Модели загружаются в фоне...")
+elif warmup.errors:
+    st.sidebar.caption(f"⚠️ Не удалось прогреть: {', '.join(warmup.errors)}")
@@ -1,80 +1,202 @@
 import os
-import sounddevice as sd
 import soundfile as sf
 import numpy as np
-import wave
-import tempfile
-
-
-def load_audio(duration: int = 25, folder: str = "audio/answers") -> str:
-    os.makedirs(folder, exist_ok=True)
-
-    existing = [f for f in os.listdir(folder) if f.startswith("answer_") and f.endswith(".wav")]
-    next_index = len(existing) + 1
-
-    filename = os.path.join(folder, f"answer_{next_index}.wav")
-
-    print(f"🎙️ Запись звука: {duration} секунд...")
-
-    try:
-        # Записываем аудио
-        sample_rate = 44100
-        audio = sd.rec(int(duration * sample_rate),
-                       samplerate=sample_rate,
-                       channels=1,
-                       dtype='float32')
-        sd.wait()  # Ждем завершения записи
-
-        # Сохраняем в WAV формате (более надежно)
-        sf.write(filename, audio, sample_rate)
-        print(f"✅ Аудио сохранено: {filename}")
-
-        return filename
-
-    except Exception as e:
-        print(f"❌ Ошибка записи аудио: {e}")
-
-        # Создаем заглушку для тестирования
-        dummy_audio = np.zeros(44100 * 2)  # 2 секунды тишины
-        sf.write(filename, dummy_audio, 44100)
-        print(f"⚠️ Создан тестовый файл: {filename}")
-
-        return filename
-
-
-def load_audio(duration: int = 25, folder: str = "audio/answers") -> str:
-    print(f"🎙️ Запись {duration} секунд...")
+import threading
+from metrics import metrics, timed
+
+
+# sounddevice (PortAudio) подключается при первой записи
+sd = None
+
+
+def _sounddevice():
+    global sd
+    if sd is None:
+        import sounddevice
+        sd = sounddevice
+    return sd
+
+
+# Whisper всё равно приводит звук к 16 кГц моно, поэтому пишем сразу в этом формате
+SAMPLE_RATE = 16000
+FRAME_MS = 30
+
+
+class RingBuffer:
+    """Кольцевой буфер int16-сэмплов: callback устройства пишет, поток записи читает"""
+
+    def __init__(self, capacity: int):
+        self._data = np.zeros(capacity, dtype=np.int16)
+        self._capacity = capacity
+        self._written = 0  # всего записано сэмплов
+        self._read = 0  # всего прочитано сэмплов
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self.overruns = 0  # сэмплы, потерянные из-за медленного чтения
+
+    def write(self, samples):
+        n = min(len(samples), self._capacity)
+        with self._lock:
+            self.overruns += len(samples) - n
+            samples = samples[len(samples) - n:]
+            start = self._written % self._capacity
+            first = min(n, self._capacity - start)
+            self._data[start:start + first] = samples[:first]
+            self._data[:n - first] = samples[first:]
+            self._written += n
+            if self._written - self._read > self._capacity:
+                self.overruns += self._written - self._read - self._capacity
+                self._read = self._written - self._capacity
+        self._ready.set()
+
+    def read(self, timeout=None):
+        """Все непрочитанные сэмплы (пустой массив, если за timeout ничего не пришло)"""
+        self._ready.wait(timeout)
+        with self._lock:
+            self._ready.clear()
+            n = self._written - self._read
+            start = self._read % self._capacity
+            if start + n <= self._capacity:
+                samples = self._data[start:start + n].copy()
+            else:
+                samples = np.concatenate((self._data[start:], self._data[:start + n - self._capacity]))
+            self._read = self._written
+        return samples
+
+
+class EndpointDetector:
+    """Энергетический детектор речи: определяет паузу после окончания ответа"""
+
+    def __init__(self, sample_rate=SAMPLE_RATE, frame_ms=FRAME_MS, silence_duration=1.5,
+                 min_rms=300.0, noise_ratio=3.0, calibration=0.3):
+        self.frame_seconds = frame_ms / 1000
+        self.silence_duration = silence_duration
+        self.min_rms = min_rms
+        self.noise_ratio = noise_ratio
+        self.calibration_frames = int(calibration / self.frame_seconds)
+
+        self.frames = 0
+        self.noise_floor = 0.0
+        self.speech_started = False
+        self.silence_frames = 0
+
+    def update(self, frame) -> bool:
+        """Обрабатывает кадр, возвращает True, когда кандидат закончил говорить"""
+        rms = float(np.sqrt(np.mean(frame.astype(np.float32) ** 2)))
+        self.frames += 1
+
+        # Первые кадры — оценка фонового шума
+        if self.frames <= self.calibration_frames:
+            self.noise_floor += (rms - self.noise_floor) / self.frames
+            return False
+
+        if rms >= max(self.min_rms, self.noise_floor * self.noise_ratio):
+            self.speech_started = True
+            self.silence_frames = 0
+        elif self.speech_started:
+            self.silence_frames += 1
+        return self.speech_started and self.trailing_silence >= self.silence_duration
+
+    @property
+    def trailing_silence(self):
+        """Сколько секунд прошло с последнего кадра речи (0, пока речи не было)"""
+        return self.silence_frames * self.frame_seconds if self.speech_started else 0.0
+
+
+class StreamingRecorder:
+    """Потоковая запись с микрофона с остановкой по окончании речи.
+
+    on_chunk(chunk, is_final, trailing_silence) получает куски записи (int16) прямо во время
+    ответа, например для распознавания по частям; trailing_silence — секунды тишины после
+    последнего кадра речи на момент куска (по ним считается задержка от конца речи).
+    """
+
+    def __init__(self, max_duration=25, sample_rate=SAMPLE_RATE, chunk_duration=1.0,
+                 silence_duration=1.5, no_speech_timeout=8.0, on_chunk=None):
+        self.sample_rate = sample_rate
+        self.max_samples = int(max_duration * sample_rate)
+        self.frame_size = sample_rate * FRAME_MS // 1000
+        self.chunk_size = int(chunk_duration * sample_rate)
+        self.no_speech_frames = int(no_speech_timeout * 1000 / FRAME_MS)
+        self.on_chunk = on_chunk
+        self.detector = EndpointDetector(sample_rate, silence_duration=silence_duration)
+        self._buffer = RingBuffer(sample_rate * 10)
+        self._frames = []
+        self._leftover = np.empty(0, dtype=np.int16)
+        self._chunk_start = 0
+        self.recorded = 0
+        self.stopped_by = None
+
+    def _callback(self, indata, frames, time_info, status):
+        # Вызывается из потока аудиоустройства — только копируем данные
+        self._buffer.write(indata[:, 0])
+
+    def _open_stream(self):
+        return _sounddevice().InputStream(samplerate=self.sample_rate, channels=1, dtype="int16",
+                                          blocksize=self.frame_size, callback=self._callback)
+
+    @timed("record")
+    def record(self):
+        """Записывает ответ до паузы после речи (или до max_duration), возвращает int16-массив"""
+        with self._open_stream():
+            while self.stopped_by is None:
+                self._consume(self._buffer.read(timeout=0.5))
+        self._emit_chunk(final=True)
+        if self._buffer.overruns:
+            print(f"⚠️ Потеряно сэмплов при записи: {self._buffer.overruns}")
+        return np.concatenate(self._frames) if self._frames else np.zeros(0, dtype=np.int16)
+
+    def _consume(self, samples):
+        """Режет поступившие сэмплы на кадры и прогоняет через детектор речи"""
+        samples = np.concatenate((self._leftover, samples))
+        usable = len(samples) - len(samples) % self.frame_size
+        self._leftover = samples[usable:]
+
+        for start in range(0, usable, self.frame_size):
+            frame = samples[start:start + self.frame_size]
+            self._frames.append(frame)
+            self.recorded += len(frame)
+
+            if self.detector.update(frame):
+                self.stopped_by = "speech_end"
+            elif not self.detector.speech_started and self.detector.frames >= self.no_speech_frames:
+                self.stopped_by = "no_speech"
+            elif self.recorded >= self.max_samples:
+                self.stopped_by = "max_duration"
+
+            if self.recorded - self._chunk_start >= self.chunk_size:
+                self._emit_chunk()
+            if self.stopped_by:
+                return
+
+    def _emit_chunk(self, final=False):
+        if self.on_chunk is None:
+            return
+        chunk_frames = self._frames[self._chunk_start // self.frame_size:]
+        chunk = np.concatenate(chunk_frames) if chunk_frames else np.zeros(0, dtype=np.int16)
+        self._chunk_start += len(chunk)
+        self.on_chunk(chunk, final, self.detector.trailing_silence)
+
+
+def load_audio(duration: int = 25, folder: str = "audio/answers", on_chunk=None) -> str:
+    print(f"🎙️ Запись до {duration} секунд (остановится после паузы)...")
 
     try:
-        # Создаем временный файл
-        import tempfile
-        with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as tmp:
-            temp_filename = tmp.name
-
-        # Записываем аудио
-        sample_rate = 44100
-        audio = sd.rec(int(duration * sample_rate),
-                       samplerate=sample_rate,
-                       channels=1)
-        sd.wait()
+        recorder = StreamingRecorder(max_duration=duration, on_chunk=on_chunk)
+        audio = recorder.record()
+        metrics.observe("recorded_audio_seconds", len(audio) / SAMPLE_RATE)
+        metrics.inc("record_stops_total", reason=recorder.stopped_by)
 
-        # Сохраняем
-        sf.write(temp_filename, audio, sample_rate)
-
-        # Копируем в конечную папку
         os.makedirs(folder, exist_ok=True)
         final_filename = os.path.join(folder, f"answer_{len(os.listdir(folder)) + 1}.wav")
-        import shutil
-        shutil.copy2(temp_filename, final_filename)
-
-        # Удаляем временный файл
-        os.unlink(temp_filename)
+        sf.write(final_filename, audio, SAMPLE_RATE, subtype="PCM_16")
 
-        print(f"✅ Запись успешна: {final_filename}")
+        print(f"✅ Запись успешна: {final_filename} ({len(audio) / SAMPLE_RATE:.1f} с, {recorder.stopped_by})")
         return final_filename
 
     except Exception as e:
         print(f"❌ Ошибка записи: {e}")
+        metrics.inc("record_errors_total")
         # Возвращаем заглушку
         return "audio/answers/fallback.wav"
 
@@ -83,7 +205,7 @@ def load_audio(duration: int = 25, folder: str = "audio/answers") -> str:
 def list_audio_devices():
     """Показать доступные аудио устройства"""
     try:
-        devices = sd.query_devices()
+        devices = _sounddevice().query_devices()
         print("🎧 Доступные аудио устройства:")
         for i, device in enumerate(devices):
             print(f"{i}: {device['name']} (входов: {device['max_input_channels']})")
@@ -106,11 +228,11 @@ def test_recording():
         print("🎤 Говорите сейчас...")
 
         sample_rate = 44100
-        audio = sd.rec(int(3 * sample_rate),
-                       samplerate=sample_rate,
-                       channels=1,
-                       dtype='float32')
-        sd.wait()
+        audio = _sounddevice().rec(int(3 * sample_rate),
+                                   samplerate=sample_rate,
+                                   channels=1,
+                                   dtype='float32')
+        _sounddevice().wait()
 
         sf.write(test_file, audio, sample_rate)
         print(f"✅ Тестовая запись сохранена: {test_file}")
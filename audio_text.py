@@ -1,118 +1,556 @@
 from config import YANDEX_API_KEY, YANDEX_FOLDER_ID
+import contextvars
+import hashlib
+import io
 import os
+import queue
+import tempfile
 import requests
-import whisper
-import pygame
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
 import subprocess
 import sys
+import threading
+from metrics import metrics, span, timed
+
+# whisper, torch и pygame тяжёлые: они импортируются при первой загрузке модели / плеера
 
 # Данные для Яндекс SpeechKit
 API_KEY = YANDEX_API_KEY
 FOLDER_ID = YANDEX_FOLDER_ID
 
-# Глобальная переменная для модели Whisper
-whisper_model = None
+# Настройки распознавания речи
+WHISPER_MODEL = "base"
+WHISPER_THREADS = None  # None — значение PyTorch по умолчанию
+WHISPER_INT8 = False  # динамическая int8-квантизация для CPU
+WHISPER_SAMPLE_RATE = 16000
+# Окно декодера Whisper — 30 секунд (whisper.audio.N_SAMPLES)
+WHISPER_WINDOW_SAMPLES = 30 * WHISPER_SAMPLE_RATE
+
+
+class TranscriptionEngine:
+    """Модель Whisper, постоянно находящаяся в памяти процесса"""
+
+    def __init__(self, model_size=WHISPER_MODEL, threads=WHISPER_THREADS, int8=WHISPER_INT8, language="ru"):
+        import torch
+        import whisper
+
+        self.model_size = model_size
+        self.int8 = int8
+        self.language = language
+        if threads:
+            torch.set_num_threads(threads)
+
+        print(f"🔄 Загрузка модели Whisper ({model_size}{', int8' if int8 else ''})...")
+        start = time.perf_counter()
+        model = whisper.load_model(model_size, device="cpu" if int8 else None)
+        if int8:
+            model = _quantize_int8(model)
+        self.model = model
+        self.load_time = time.perf_counter() - start
+        print(f"✅ Модель Whisper загружена за {self.load_time:.1f} с")
+
+        self._lock = threading.Lock()
+        self.clips = 0
+        self.audio_seconds = 0.0
+        self.total_time = 0.0
+        self.last_rtf = None
+
+    def transcribe(self, audio):
+        """Распознаёт файл или массив float32 16 кГц, возвращает текст"""
+        import whisper
+
+        if isinstance(audio, str):
+            audio = whisper.load_audio(audio)
+        duration = len(audio) / WHISPER_SAMPLE_RATE
+
+        start = time.perf_counter()
+        with self._lock:
+            result = self.model.transcribe(audio, fp16=False, language=self.language)
+        elapsed = time.perf_counter() - start
+        metrics.record_span("asr", elapsed, engine="whisper")
+        metrics.observe("asr_audio_seconds", duration)
+
+        # RTF < 1 — распознавание быстрее реального времени
+        rtf = elapsed / duration if duration else 0.0
+        with self._lock:
+            self.clips += 1
+            self.audio_seconds += duration
+            self.total_time += elapsed
+            self.last_rtf = rtf
+        print(f"✅ Распознано за {elapsed:.2f} с (RTF {rtf:.2f}): {result['text']}")
+        return result["text"]
+
+    def decode_window(self, audio, prefix=None):
+        """Один проход декодера по записи до 30 секунд.
+
+        prefix — уже известное начало текста: оно подаётся декодеру готовым,
+        и возвращается только продолжение.
+        """
+        import whisper
+
+        mel = whisper.log_mel_spectrogram(whisper.pad_or_trim(audio))
+        options = whisper.DecodingOptions(language=self.language, fp16=False, without_timestamps=True,
+                                          prefix=prefix or None)
+        with self._lock:
+            result = whisper.decode(self.model, mel.to(self.model.device), options)
+        return result.text
+
+    def transcribe_batch(self, audios):
+        """Распознаёт несколько записей до 30 секунд одним проходом декодера"""
+        import torch
+        import whisper
+
+        audios = [whisper.load_audio(a) if isinstance(a, str) else a for a in audios]
+        texts = [None] * len(audios)
+        short = [i for i, audio in enumerate(audios) if len(audio) <= WHISPER_WINDOW_SAMPLES]
+
+        if short:
+            duration = sum(len(audios[i]) for i in short) / WHISPER_SAMPLE_RATE
+            start = time.perf_counter()
+            mels = torch.stack([whisper.log_mel_spectrogram(whisper.pad_or_trim(audios[i])) for i in short])
+            options = whisper.DecodingOptions(language=self.language, fp16=False, without_timestamps=True)
+            with self._lock:
+                results = whisper.decode(self.model, mels.to(self.model.device), options)
+            elapsed = time.perf_counter() - start
+            metrics.record_span("asr", elapsed, engine="whisper_batch")
+            metrics.inc("asr_batched_clips_total", len(short))
+            for i, result in zip(short, results):
+                texts[i] = result.text
+
+            rtf = elapsed / duration if duration else 0.0
+            with self._lock:
+                self.clips += len(short)
+                self.audio_seconds += duration
+                self.total_time += elapsed
+                self.last_rtf = rtf
+            print(f"✅ Распознано записей: {len(short)} за {elapsed:.2f} с (RTF {rtf:.2f})")
+
+        # Длинные записи распознаём по отдельности с разбиением на окна
+        for i, audio in enumerate(audios):
+            if texts[i] is None:
+                texts[i] = self.transcribe(audio)
+        return texts
+
+    def stats(self):
+        with self._lock:
+            return {
+                "model": self.model_size,
+                "int8": self.int8,
+                "load_time": self.load_time,
+                "clips": self.clips,
+                "audio_seconds": self.audio_seconds,
+                "total_time": self.total_time,
+                "rtf": self.total_time / self.audio_seconds if self.audio_seconds else None,
+                "last_rtf": self.last_rtf,
+            }
+
+
+def _quantize_int8(model):
+    """Динамическая int8-квантизация линейных слоёв Whisper"""
+    import torch
+    import whisper
+
+    # Whisper использует собственный подкласс Linear, который quantize_dynamic не распознаёт
+    for module in model.modules():
+        if type(module) is whisper.model.Linear:
+            module.__class__ = torch.nn.Linear
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+# Движки распознавания по конфигурации: (модель, потоки, int8) -> TranscriptionEngine
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_transcription_engine(model_size=WHISPER_MODEL, threads=WHISPER_THREADS, int8=WHISPER_INT8):
+    """Загружает модель Whisper один раз при первом обращении"""
+    key = (model_size, threads, int8)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = TranscriptionEngine(model_size, threads=threads, int8=int8)
+            _engines[key] = engine
+    return engine
 
 
 def load_whisper_model():
-    """Загружает модель Whisper один раз при старте"""
-    global whisper_model
-    if whisper_model is None:
-        try:
-            print("🔄 Загрузка модели Whisper...")
-            whisper_model = whisper.load_model('base')
-            print("✅ Модель Whisper загружена")
-        except Exception as e:
-            print(f"❌ Ошибка загрузки Whisper: {e}")
-            whisper_model = None
-    return whisper_model
+    """Модель Whisper по умолчанию (или None, если загрузить не удалось)"""
+    try:
+        return get_transcription_engine().model
+    except Exception as e:
+        print(f"❌ Ошибка загрузки Whisper: {e}")
+        return None
+
+
+def check_audio_file(audio_file):
+    """Текст ошибки, если файл записи нельзя распознавать, иначе None"""
+    if not os.path.exists(audio_file):
+        return "Аудиофайл не найден"
+
+    if os.path.getsize(audio_file) < 1000:
+        return "Запись слишком короткая"
+    return None
 
 
 def recognize_audio_whisper(audio_file):
     """Распознавание речи через Whisper (оффлайн)"""
     try:
         # Проверяем файл
-        if not os.path.exists(audio_file):
-            return "Аудиофайл не найден"
+        error = check_audio_file(audio_file)
+        if error:
+            return error
 
-        if os.path.getsize(audio_file) < 1000:
-            return "Запись слишком короткая"
-
-        # Загружаем модель
-        model = load_whisper_model()
-        if model is None:
+        try:
+            engine = get_transcription_engine()
+        except Exception as e:
+            print(f"❌ Ошибка загрузки Whisper: {e}")
             return "Модель распознавания не доступна"
 
-        # Распознаем речь
-        result = model.transcribe(audio_file, fp16=False, language='ru')
-        print(f"✅ Распознано: {result['text']}")
-        return result['text']
+        return engine.transcribe(audio_file)
 
     except Exception as e:
         print(f"❌ Ошибка распознавания Whisper: {e}")
+        metrics.inc("asr_errors_total", engine="whisper")
         return "Ошибка распознавания речи"
 
-def text_to_ogg(text: str, folder: str = "audio/questions") -> str:
-    os.makedirs(folder, exist_ok=True)
+# Настройки синтеза речи
+TTS_URL = 'https://tts.api.cloud.yandex.net/speech/v1/tts:synthesize'
+TTS_VOICE = 'zahar'
+TTS_SPEED = '1.5'
+TTS_FORMAT = 'oggopus'
+TTS_SAMPLE_RATE = 48000
+TTS_CACHE_DIR = "cache/tts"
+TTS_CACHE_MAX_BYTES = 200 * 1024 * 1024
+# При переполнении кэш чистится с запасом, до этой доли — чтобы не обходить каталог на каждой записи
+TTS_CACHE_EVICT_SHARE = 0.9
+TTS_TIMEOUT = 15
+STT_URL = 'https://stt.api.cloud.yandex.net/speech/v1/stt:recognize'
 
-    existing = [f for f in os.listdir(folder) if f.startswith("question_") and f.endswith(".ogg")]
-    next_index = len(existing) + 1
+_session = None
+_session_lock = threading.Lock()
+_tts_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="tts")
+_tts_inflight = {}  # ключ кэша -> Future с идущим синтезом
+_tts_lock = threading.Lock()
+# Размер кэша озвучки: считается обходом каталога при первой записи, дальше — по записанным файлам
+_tts_cache_bytes = None
+_tts_cache_lock = threading.Lock()
+_question_counters = {}
 
-    filename = os.path.join(folder, f"question_{next_index}.ogg")
-    url = 'https://tts.api.cloud.yandex.net/speech/v1/tts:synthesize'
-    headers = {'Authorization': f'Api-Key {API_KEY}'}
 
+def get_http_session():
+    """Общая HTTP-сессия: keep-alive и повторы при сбоях сервиса"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(total=3, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504),
+                          allowed_methods=None)
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+            _session = requests.Session()
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+    return _session
+
+
+def _tts_cache_path(text, voice, speed, audio_format):
+    key = hashlib.sha256(f"{text}|{voice}|{speed}|{audio_format}|{TTS_SAMPLE_RATE}".encode("utf-8")).hexdigest()
+    return os.path.join(TTS_CACHE_DIR, f"{key}.ogg")
+
+
+def _evict_tts_cache(limit=TTS_CACHE_MAX_BYTES):
+    """Удаляет самые давно использованные файлы, пока кэш больше limit байт.
+
+    Возвращает размер кэша после вытеснения.
+    """
+    entries = []
+    with os.scandir(TTS_CACHE_DIR) as it:
+        for entry in it:
+            if entry.is_file() and entry.name.endswith(".ogg"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= limit:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+    return total
+
+
+def _account_tts_cache(size):
+    """Учитывает записанный файл; каталог обходится только при первой записи и при переполнении.
+
+    Файлы, дописанные другими процессами, учитываются при следующем обходе.
+    """
+    global _tts_cache_bytes
+    with _tts_cache_lock:
+        if _tts_cache_bytes is not None:
+            _tts_cache_bytes += size
+            if _tts_cache_bytes <= TTS_CACHE_MAX_BYTES:
+                return
+        _tts_cache_bytes = _evict_tts_cache(int(TTS_CACHE_MAX_BYTES * TTS_CACHE_EVICT_SHARE))
+
+
+def _read_tts_cache(cache_path):
+    try:
+        with open(cache_path, 'rb') as f:
+            audio = f.read()
+    except FileNotFoundError:
+        return None
+    os.utime(cache_path)  # отметка использования для вытеснения
+    return audio
+
+
+def synthesize(text, voice=TTS_VOICE, speed=TTS_SPEED, audio_format=TTS_FORMAT):
+    """Синтез речи через SpeechKit с кэшем на диске. Возвращает байты аудио или None"""
+    cache_path = _tts_cache_path(text, voice, speed, audio_format)
+    audio = _read_tts_cache(cache_path)
+    metrics.inc("tts_cache_total", result="miss" if audio is None else "hit")
+    if audio is not None:
+        return audio
+
+    # Если этот текст уже синтезируется в фоне — ждём тот же запрос
+    with _tts_lock:
+        future = _tts_inflight.get(cache_path)
+    if future is not None:
+        audio = future.result()
+        if audio is not None:
+            return audio
+    return _synthesize_request(text, voice, speed, audio_format, cache_path)
+
+
+def _synthesize_request(text, voice, speed, audio_format, cache_path):
+    headers = {'Authorization': f'Api-Key {API_KEY}'}
     data = {
         'folderId': FOLDER_ID,
         'text': text,
         'lang': 'ru-RU',
-        'voice': 'zahar',
-        'speed': '1.5',
-        'format': 'oggopus',
-        'sampleRateHertz': 48000,
+        'voice': voice,
+        'speed': speed,
+        'format': audio_format,
+        'sampleRateHertz': TTS_SAMPLE_RATE,
     }
 
-    # Отправляем запрос и сохраняем аудио
-    response = requests.post(url, headers=headers, data=data)
+    with span("tts"):
+        response = get_http_session().post(TTS_URL, headers=headers, data=data, timeout=TTS_TIMEOUT)
+    if response.status_code != 200:
+        print(f"❌ Ошибка синтеза речи: {response.status_code} - {response.text}")
+        metrics.inc("tts_errors_total", status=response.status_code)
+        return None
+
+    os.makedirs(TTS_CACHE_DIR, exist_ok=True)
+    tmp_path = f"{cache_path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(response.content)
+    os.replace(tmp_path, cache_path)
+    _account_tts_cache(len(response.content))
+    return response.content
+
+
+def presynthesize(text, voice=TTS_VOICE, speed=TTS_SPEED, audio_format=TTS_FORMAT):
+    """Запускает синтез в фоне (например, следующего вопроса), чтобы потом взять его из кэша"""
+    cache_path = _tts_cache_path(text, voice, speed, audio_format)
+    with _tts_lock:
+        future = _tts_inflight.get(cache_path)
+        if future is None:
+            # Контекст вызывающего потока — чтобы замер синтеза попал в трассу его интервью
+            future = _tts_executor.submit(contextvars.copy_context().run, _presynthesize_task,
+                                          text, voice, speed, audio_format, cache_path)
+            _tts_inflight[cache_path] = future
+            future.add_done_callback(lambda _: _tts_inflight.pop(cache_path, None))
+    return future
+
+
+def _presynthesize_task(text, voice, speed, audio_format, cache_path):
+    try:
+        audio = _read_tts_cache(cache_path)
+        if audio is None:
+            audio = _synthesize_request(text, voice, speed, audio_format, cache_path)
+        return audio
+    except Exception as e:
+        print(f"⚠️ Ошибка фонового синтеза речи: {e}")
+        return None
 
-    if response.status_code == 200:
-        with open(filename, 'wb') as f:
-            f.write(response.content)
-        print(f"Аудио сохранено в OGG: {filename}")
 
-        # Воспроизводим аудио с помощью pygame (кроссплатформенное решение)
+def _next_question_filename(folder):
+    """Имя файла очередного вопроса; папка просматривается только при первом обращении"""
+    with _tts_lock:
+        if folder not in _question_counters:
+            existing = [f for f in os.listdir(folder) if f.startswith("question_") and f.endswith(".ogg")]
+            _question_counters[folder] = len(existing)
+        _question_counters[folder] += 1
+        return os.path.join(folder, f"question_{_question_counters[folder]}.ogg")
+
+
+class AudioPlayer:
+    """Долгоживущий плеер: микшер инициализируется один раз, звук играется прямо из памяти.
+
+    play() не блокирует — об окончании сообщают Event и необязательный callback.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._mixer = None
         try:
+            import pygame
             pygame.mixer.init()
-            pygame.mixer.music.load(filename)
-            pygame.mixer.music.play()
-            while pygame.mixer.music.get_busy():
-                time.sleep(0.1)
-            return True
+            self._mixer = pygame.mixer
+            self.backend = "pygame"
         except Exception as e:
-            print(f"⚠️ Ошибка воспроизведения через pygame: {e}")
-            # Альтернативный способ воспроизведения
+            print(f"⚠️ Ошибка инициализации pygame: {e}")
+            self.backend = "external"
+
+    def play(self, audio, on_done=None):
+        """Запускает воспроизведение байтов OGG, возвращает Event окончания"""
+        done = threading.Event()
+        with self._lock:
+            wait = None
+            if self.backend == "pygame":
+                try:
+                    sound = self._mixer.Sound(file=io.BytesIO(audio))
+                    channel = sound.play()
+                    wait = lambda: self._wait_channel(channel, sound.get_length())
+                except Exception as e:
+                    print(f"⚠️ Ошибка воспроизведения через pygame: {e}")
+            if wait is None:
+                wait = self._play_external(audio)
+
+        def watch():
             try:
-                if sys.platform == "win32":
-                    os.startfile(filename)
-                elif sys.platform == "darwin":  # macOS
-                    subprocess.call(("open", filename))
-                else:  # Linux
-                    subprocess.call(("aplay", filename))
-                return True
-            except Exception as e2:
-                print(f"⚠️ Ошибка альтернативного воспроизведения: {e2}")
-                return False
-    else:
-        print(f"❌ Ошибка синтеза речи: {response.status_code} - {response.text}")
+                wait()
+            finally:
+                done.set()
+                if on_done:
+                    on_done()
+
+        threading.Thread(target=watch, name="audio-player", daemon=True).start()
+        return done
+
+    def stop(self):
+        with self._lock:
+            if self.backend == "pygame":
+                self._mixer.stop()
+
+    @staticmethod
+    def _wait_channel(channel, duration):
+        # Спим почти всю длительность и лишь в конце коротко опрашиваем канал
+        time.sleep(max(0.0, duration - 0.05))
+        while channel is not None and channel.get_busy():
+            time.sleep(0.01)
+
+    @staticmethod
+    def _play_external(audio):
+        """Запасной вариант: системный проигрыватель. Возвращает функцию ожидания окончания"""
+        with tempfile.NamedTemporaryFile(suffix=".ogg", delete=False) as tmp:
+            tmp.write(audio)
+        if sys.platform == "win32":
+            command = ["cmd", "/c", "start", "/wait", "", tmp.name]
+        elif sys.platform == "darwin":  # macOS
+            command = ["afplay", tmp.name]
+        else:  # Linux
+            command = ["aplay", tmp.name]
+        process = subprocess.Popen(command)
+
+        def wait():
+            process.wait()
+            os.remove(tmp.name)
+        return wait
+
+
+_player = None
+_player_lock = threading.Lock()
+
+
+def get_audio_player():
+    global _player
+    with _player_lock:
+        if _player is None:
+            _player = AudioPlayer()
+    return _player
+
+
+def speak(text, folder="audio/questions", on_done=None):
+    """Синтезирует и начинает озвучивать текст, не дожидаясь конца.
+
+    Возвращает Event окончания воспроизведения или None, если синтез не удался.
+    """
+    audio = synthesize(text)
+    if audio is None:
+        return None
+
+    # Копия вопроса для архива; воспроизводится звук из памяти
+    os.makedirs(folder, exist_ok=True)
+    filename = _next_question_filename(folder)
+    with open(filename, 'wb') as f:
+        f.write(audio)
+    print(f"Аудио сохранено в OGG: {filename}")
+
+    try:
+        return get_audio_player().play(audio, on_done=on_done)
+    except Exception as e:
+        print(f"⚠️ Ошибка воспроизведения: {e}")
+        return None
+
+
+class SentenceSpeaker:
+    """Озвучивает текст по предложениям по мере их появления (например, из потока LLM).
+
+    Синтез каждого предложения стартует сразу в фоне, воспроизведение идёт строго по порядку.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self.first_audio_at = None  # time.perf_counter() начала первого звука
+        self._thread = threading.Thread(target=self._run, name="sentence-speaker", daemon=True)
+        self._thread.start()
+
+    def say(self, sentence):
+        self._queue.put(presynthesize(sentence))
+
+    def close(self):
+        """Больше предложений не будет"""
+        self._queue.put(None)
+
+    def wait(self, timeout=None):
+        """Ждёт, пока всё сказанное будет воспроизведено"""
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            future = self._queue.get()
+            if future is None:
+                return
+            audio = future.result()
+            if audio is None:
+                continue
+            if self.first_audio_at is None:
+                self.first_audio_at = time.perf_counter()
+            try:
+                get_audio_player().play(audio).wait()
+            except Exception as e:
+                print(f"⚠️ Ошибка воспроизведения: {e}")
+
+
+@timed("speak")
+def text_to_ogg(text: str, folder: str = "audio/questions") -> str:
+    """Озвучивает текст и ждёт окончания воспроизведения"""
+    done = speak(text, folder=folder)
+    if done is None:
         return False
+    done.wait()
+    return True
 
 
 def recognize_audio(audio_file, language='ru-RU'):
     API_KEY = YANDEX_API_KEY
     FOLDER_ID = YANDEX_FOLDER_ID
 
-    url = 'https://stt.api.cloud.yandex.net/speech/v1/stt:recognize'
+    url = STT_URL
     headers = {'Authorization': f'Api-Key {API_KEY}'}
 
     # Проверяем существование файла
@@ -149,24 +587,3 @@ def recognize_audio(audio_file, language='ru-RU'):
         print(f"❌ Ошибка при обработке файла: {e}")
         return None
 
-
-def recognize_audio_whisper(audio_file):
-    try:
-        # Проверяем существование файла
-        if not os.path.exists(audio_file):
-            print(f"❌ Аудио файл не найден: {audio_file}")
-            return "Файл не найден"
-
-        # Проверяем размер файла
-        file_size = os.path.getsize(audio_file)
-        if file_size == 0:
-            print(f"⚠️ Пустой аудио файл: {audio_file}")
-            return "Пустая запись"
-
-        model = whisper.load_model('base')
-        result = model.transcribe(audio_file, fp16=False)
-        print(f"✅ Распознано: {result['text']}")
-        return result['text']
-    except Exception as e:
-        print(f"❌ Ошибка распознавания Whisper: {e}")
-        return "Не удалось распознать речь"
\ No newline at end of file
@@ -0,0 +1,129 @@
+"""Сравнение сред выполнения модели эмбеддингов на CPU: скорость и совпадение схожестей с fp32.
+
+Запуск из корня проекта:
+    python -m benchmarks.embedding_backends --model model --texts 256 --threads 4
+
+Код выхода 1, если схожести какого-либо бэкенда расходятся с fp32 PyTorch больше --tolerance
+(в процентных пунктах, как в MATCH_THRESHOLD) или бэкенд не удалось загрузить. С --skip
+незагрузившиеся бэкенды (кроме эталонного torch) пропускаются.
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+SKILLS = ("SQL", "Python", "pandas", "Power BI", "A/B-тесты", "Excel", "1С", "Docker", "Kafka", "Java",
+          "переговоры", "продажи", "бухучёт", "Figma", "статистика", "машинное обучение")
+ROLES = ("Аналитик данных", "Бухгалтер", "Менеджер по продажам", "Backend-разработчик", "Дизайнер", "Тестировщик")
+
+
+def make_texts(count, seed=0):
+    """Синтетические резюме разной длины"""
+    rng = np.random.default_rng(seed)
+    texts = []
+    for _ in range(count):
+        skills = ", ".join(rng.choice(SKILLS, rng.integers(3, 8), replace=False))
+        body = f"{rng.choice(ROLES)}. Опыт работы {rng.integers(1, 15)} лет. Навыки: {skills}. "
+        texts.append(body * int(rng.integers(1, 12)))
+    return texts
+
+
+def bench_backend(model_path, backend, texts, threads, batch_size):
+    from embeddings import get_embedding_service
+
+    start = time.perf_counter()
+    service = get_embedding_service(model_path, device="cpu", backend=backend, threads=threads)
+    load_time = time.perf_counter() - start
+
+    service.embed_many(texts[:batch_size], batch_size=batch_size)  # прогрев
+    start = time.perf_counter()
+    service.embed_many(texts, batch_size=batch_size)
+    batch_time = time.perf_counter() - start
+
+    latencies = []
+    for text in texts[:20]:
+        start = time.perf_counter()
+        service.embed(text)
+        latencies.append(time.perf_counter() - start)
+    return {
+        "load_time": load_time,
+        "texts_per_s": len(texts) / batch_time,
+        "single_p50_ms": float(np.percentile(latencies, 50)) * 1000,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Скорость и точность сред выполнения модели эмбеддингов")
+    parser.add_argument("--model", default=None, help="Путь к модели эмбеддингов (по умолчанию model/)")
+    parser.add_argument("--backends", default="torch,int8,onnx", help="Бэкенды через запятую")
+    parser.add_argument("--texts", type=int, default=256)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=None, help="Потоки внутри операций")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="Допустимое расхождение схожестей с fp32, процентные пункты")
+    parser.add_argument("--skip", action="store_true",
+                        help="Пропускать бэкенды, которые не удалось загрузить, вместо ошибки")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    model_path = args.model or str(ROOT / "model")
+    if not (Path(model_path) / "config.json").exists():
+        print(f"❌ Модель не найдена: {model_path} (укажите --model)")
+        return 1
+
+    texts = make_texts(args.texts)
+    backends = args.backends.split(",")
+    if "torch" not in backends:
+        backends.insert(0, "torch")  # эталон для проверки точности
+
+    from embeddings import check_parity
+
+    results, errors = {}, {}
+    for backend in backends:
+        try:
+            stats = bench_backend(model_path, backend, texts, args.threads, args.batch_size)
+            if backend == "torch":
+                stats["parity"], stats["max_deviation"] = True, 0.0
+            else:
+                stats["parity"], stats["max_deviation"] = check_parity(
+                    model_path, texts, backend, tolerance=args.tolerance, threads=args.threads)
+        except Exception as e:
+            errors[backend] = str(e)
+            print(f"{'⏭️' if args.skip and backend != 'torch' else '❌'} Бэкенд {backend} не загружен: {e}")
+            continue
+        results[backend] = stats
+
+    if "torch" not in results:
+        print("❌ Эталонный бэкенд torch не загружен — сравнивать не с чем")
+        return 1
+
+    base = results["torch"]["texts_per_s"]
+    print(f"\n{'Бэкенд':<8}{'загрузка, с':>13}{'текстов/с':>12}{'ускорение':>11}{'1 текст, мс':>13}"
+          f"{'макс. откл., п.п.':>19}")
+    for backend, stats in results.items():
+        print(f"{backend:<8}{stats['load_time']:>13.2f}{stats['texts_per_s']:>12.1f}"
+              f"{stats['texts_per_s'] / base:>10.2f}x{stats['single_p50_ms']:>13.1f}"
+              f"{stats['max_deviation']:>19.3f}{'' if stats['parity'] else '  ❌'}")
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"embeddings_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({"created": time.strftime("%Y-%m-%d %H:%M:%S"), "args": vars(args),
+                                  "backends": results, "errors": errors}, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"💾 Результаты: {output}")
+
+    failed = [backend for backend, stats in results.items() if not stats["parity"]]
+    if failed:
+        print(f"❌ Схожести расходятся с fp32 больше {args.tolerance} п.п.: {', '.join(failed)}")
+    if errors and not args.skip:
+        print(f"❌ Не загружены: {', '.join(errors)} (--skip, чтобы пропускать такие бэкенды)")
+    return 1 if failed or (errors and not args.skip) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+import io
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import soundfile as sf
+
+# Фиксированные ответы заглушек: прогоны бенчмарка воспроизводимы
+QUESTION_TEXT = ("Здравствуйте, меня зовут Лев. Расскажите о своём опыте работы с данными. "
+                 "Какие инструменты вы использовали чаще всего?")
+REPORT_TEXT = ("Кандидат уверенно рассказал об опыте. Сильные стороны: аналитика, SQL. "
+               "Зоны развития: машинное обучение. Рекомендация: да. Общий балл: 7.")
+STT_TEXT = "Я три года работаю аналитиком данных, в основном с SQL и Python."
+
+
+class MockBackends:
+    """Локальные заглушки DeepSeek (chat completions), SpeechKit TTS и STT с настраиваемой задержкой.
+
+    llm_ttft — задержка до первого токена, llm_token_delay — между токенами потока,
+    llm_latency — время ответа без потока, tts_latency / stt_latency — время ответа SpeechKit,
+    tts_audio_seconds — длительность синтезированной тишины.
+    """
+
+    def __init__(self, llm_ttft=0.3, llm_token_delay=0.02, llm_latency=1.0, tts_latency=0.2,
+                 tts_audio_seconds=0.3, stt_latency=0.3, port=0):
+        self.llm_ttft = llm_ttft
+        self.llm_token_delay = llm_token_delay
+        self.llm_latency = llm_latency
+        self.tts_latency = tts_latency
+        self.tts_audio_seconds = tts_audio_seconds
+        self.stt_latency = stt_latency
+        self.requests = {"llm": 0, "tts": 0, "stt": 0}
+        self._lock = threading.Lock()
+
+        self._server = _Server(("127.0.0.1", port), _Handler)
+        self._server.daemon_threads = True
+        self._server.backends = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def llm_base(self):
+        return f"{self.url}/v1"
+
+    @property
+    def tts_url(self):
+        return f"{self.url}/tts"
+
+    @property
+    def stt_url(self):
+        return f"{self.url}/stt"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-backends", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def count(self, kind):
+        with self._lock:
+            self.requests[kind] += 1
+
+    def silence_wav(self):
+        buffer = io.BytesIO()
+        sf.write(buffer, np.zeros(int(self.tts_audio_seconds * 16000), dtype=np.int16), 16000,
+                 format="WAV", subtype="PCM_16")
+        return buffer.getvalue()
+
+
+class _Server(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # Клиенты закрывают keep-alive соединения при завершении — это не ошибка
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        backends = self.server.backends
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        path = self.path.split("?")[0]
+        if path.endswith("/chat/completions"):
+            backends.count("llm")
+            self._chat(backends, json.loads(body))
+        elif path == "/tts":
+            backends.count("tts")
+            time.sleep(backends.tts_latency)
+            self._send(backends.silence_wav(), "audio/wav")
+        elif path == "/stt":
+            backends.count("stt")
+            time.sleep(backends.stt_latency)
+            self._send(json.dumps({"result": STT_TEXT}, ensure_ascii=False).encode("utf-8"), "application/json")
+        else:
+            self._send(b"not found", "text/plain", status=404)
+
+    def _chat(self, backends, payload):
+        if payload.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            time.sleep(backends.llm_ttft)
+            for i, token in enumerate(QUESTION_TEXT.split(" ")):
+                if i:
+                    time.sleep(backends.llm_token_delay)
+                chunk = {"object": "chat.completion.chunk", "model": payload.get("model"),
+                         "choices": [{"index": 0, "delta": {"content": ("" if i == 0 else " ") + token},
+                                      "finish_reason": None}]}
+                self._write_chunk(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self._write_chunk(b"data: [DONE]\n\n")
+            self._write_chunk(b"")
+            return
+
+        time.sleep(backends.llm_latency)
+        if payload.get("response_format", {}).get("type") == "json_object":
+            content = json.dumps({"feedback": REPORT_TEXT, "assessment": REPORT_TEXT}, ensure_ascii=False)
+        else:
+            content = REPORT_TEXT
+        response = {"object": "chat.completion", "model": payload.get("model"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                                 "finish_reason": "stop"}],
+                    "usage": {}}
+        self._send(json.dumps(response, ensure_ascii=False).encode("utf-8"), "application/json")
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send(self, data, content_type, status=200):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def make_answer_wav(path, lead=0.5, speech=2.0, tail=3.0, sample_rate=16000, seed=0):
+    """WAV с «ответом кандидата»: тишина, речеподобный сигнал и пауза, после которой запись должна остановиться"""
+    rng = np.random.default_rng(seed)
+    total = int((lead + speech + tail) * sample_rate)
+    audio = rng.normal(0, 20, total)  # фоновый шум
+    start, end = int(lead * sample_rate), int((lead + speech) * sample_rate)
+    t = np.arange(end - start) / sample_rate
+    envelope = 0.6 + 0.4 * np.sin(2 * np.pi * 3 * t)  # слоги
+    audio[start:end] += 4000 * envelope * np.sin(2 * np.pi * 180 * t)
+    sf.write(path, np.clip(audio, -32768, 32767).astype(np.int16), sample_rate, subtype="PCM_16")
+    return path
+
+
+class FakeMicrophone:
+    """Замена модуля sounddevice: InputStream отдаёт WAV-файл кадрами в callback.
+
+    speed — во сколько раз быстрее реального времени идут кадры; после конца файла идёт тишина.
+    """
+
+    def __init__(self, wav_path, speed=1.0):
+        audio, self.sample_rate = sf.read(wav_path, dtype="int16")
+        self.audio = audio if audio.ndim == 1 else audio[:, 0]
+        self.speed = speed
+
+    def InputStream(self, samplerate, channels, dtype, blocksize, callback):
+        if samplerate != self.sample_rate:
+            raise ValueError(f"Частота WAV {self.sample_rate} Гц, запрошено {samplerate} Гц")
+        return _FakeStream(self.audio, samplerate, blocksize, callback, self.speed)
+
+
+class _FakeStream:
+    def __init__(self, audio, sample_rate, blocksize, callback, speed):
+        self.audio = audio
+        self.block_seconds = blocksize / sample_rate / speed
+        self.blocksize = blocksize
+        self.callback = callback
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="fake-microphone", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        position = 0
+        next_time = time.perf_counter()
+        while not self._stop.is_set():
+            block = self.audio[position:position + self.blocksize]
+            if len(block) < self.blocksize:
+                block = np.concatenate((block, np.zeros(self.blocksize - len(block), dtype=np.int16)))
+            position += self.blocksize
+            self.callback(block.reshape(-1, 1), self.blocksize, None, None)
+            next_time += self.block_seconds
+            self._stop.wait(max(0.0, next_time - time.perf_counter()))
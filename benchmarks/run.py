@@ -0,0 +1,340 @@
+"""Сквозной бенчмарк конвейера на локальных заглушках.
+
+Запуск из корня проекта:
+    python -m benchmarks.run --rounds 5 --sessions 20 --model model
+
+Результаты (p50/p95 по этапам, пропускная способность, пиковая память) печатаются
+и сохраняются в benchmarks/results/; --baseline сравнивает их с прошлым прогоном.
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+# Во сколько раз p95 этапа может вырасти относительно базового прогона
+REGRESSION_TOLERANCE = 0.2
+
+RESUME_TEXT = ("Иванов Иван. Аналитик данных. Опыт работы 3 года: SQL, Python, pandas, Power BI. "
+               "Построение отчётности, A/B-тесты, автоматизация выгрузок. Образование: МГУ, прикладная математика. ")
+JOB_TEXT = ("Вакансия: аналитик данных. Требования: SQL, Python, опыт от 2 лет, A/B-тесты. "
+            "Обязанности: отчётность, исследования продукта. Условия: удалённо. ")
+
+
+def peak_rss_mb():
+    """Пиковый объём памяти процесса (ru_maxrss: КБ в Linux, байты в macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class StageRecorder:
+    """Замеры длительностей по этапам"""
+
+    def __init__(self):
+        self.samples = {}
+        self.walls = {}
+        self.rss = {}
+
+    @contextmanager
+    def measure(self, stage):
+        start = time.perf_counter()
+        yield
+        self.add(stage, time.perf_counter() - start)
+
+    def add(self, stage, seconds):
+        self.samples.setdefault(stage, []).append(seconds)
+
+    @contextmanager
+    def wall(self, stage):
+        """Общее время этапа — для пропускной способности"""
+        start = time.perf_counter()
+        yield
+        self.walls[stage] = self.walls.get(stage, 0.0) + time.perf_counter() - start
+        self.rss[stage] = peak_rss_mb()
+
+    def summary(self):
+        result = {}
+        for stage, values in self.samples.items():
+            values = np.asarray(values)
+            group = stage.split(".")[0]
+            wall = self.walls.get(stage, self.walls.get(group))
+            result[stage] = {
+                "count": len(values),
+                "p50": float(np.percentile(values, 50)),
+                "p95": float(np.percentile(values, 95)),
+                "mean": float(values.mean()),
+                "max": float(values.max()),
+                "throughput": len(values) / wall if wall else None,  # операций в секунду
+                "peak_rss_mb": self.rss.get(stage, self.rss.get(group)),
+            }
+        return result
+
+
+def _make_documents(folder, count):
+    """Синтетические резюме во всех поддерживаемых форматах"""
+    import docx
+    import fitz
+
+    folder.mkdir(parents=True, exist_ok=True)
+    files = []
+    for i in range(count):
+        text = RESUME_TEXT * (5 + i % 5)
+        kind = ("txt", "csv", "json", "docx", "pdf")[i % 5]
+        path = folder / f"resume_{i}.{kind}"
+        if kind == "txt":
+            path.write_text(text, encoding="utf-8")
+        elif kind == "csv":
+            path.write_text("name,summary\n" + "".join(f"Кандидат {j},{text[:200]}\n" for j in range(50)),
+                            encoding="utf-8")
+        elif kind == "json":
+            path.write_text(json.dumps([{"name": f"Кандидат {j}", "summary": text} for j in range(20)],
+                                       ensure_ascii=False), encoding="utf-8")
+        elif kind == "docx":
+            document = docx.Document()
+            for paragraph in text.split(". "):
+                document.add_paragraph(paragraph)
+            document.save(path)
+        else:
+            pdf = fitz.open()
+            for _ in range(3):
+                pdf.new_page().insert_textbox(fitz.Rect(40, 40, 560, 800), text, fontsize=9)
+            pdf.save(path)
+        files.append(path)
+    return files
+
+
+def bench_documents(recorder, workdir, count, model_path):
+    from document_processor import DocumentReader, get_embedding
+
+    files = _make_documents(workdir / "documents", count)
+    texts = []
+    with recorder.wall("extract"):
+        for path in files:
+            with recorder.measure("extract"):
+                texts.append(DocumentReader(str(path)).extract_text())
+
+    if not model_path:
+        print("⏭️ Модель эмбеддингов не найдена — этап embedding пропущен (укажите --model)")
+        return
+    get_embedding("прогрев", model_path, use_cache=False)  # загрузка модели не входит в замер
+    with recorder.wall("embedding"):
+        for text in texts:
+            with recorder.measure("embedding"):
+                get_embedding(text, model_path, chunked=True, use_cache=False)
+
+
+def bench_llm(recorder, backends, rounds):
+    from app_new_2 import InterviewBot
+
+    bot = InterviewBot("benchmark", JOB_TEXT, RESUME_TEXT, rounds, api_base=backends.llm_base)
+    bot.build_profile()
+    with recorder.wall("llm"):
+        for _ in range(rounds):
+            with recorder.measure("llm.question"):
+                bot.stream_question("Я работал аналитиком три года.")
+            recorder.add("llm.first_token", bot.last_first_token_time)
+
+    bot.questions = ["Расскажите о себе"] * rounds
+    bot.answers = ["Я работал аналитиком три года."] * rounds
+    with recorder.wall("reports"):
+        for _ in range(rounds):
+            with recorder.measure("reports"):
+                bot.generate_reports()
+
+
+def bench_tts(recorder, rounds):
+    import audio_text
+
+    with recorder.wall("tts"):
+        for i in range(rounds):
+            text = f"Вопрос номер {i}. Расскажите о своём опыте."
+            with recorder.measure("tts.cold"):
+                audio_text.synthesize(text)
+            with recorder.measure("tts.cached"):
+                audio_text.synthesize(text)
+
+
+def bench_recording(recorder, workdir, rounds, speed):
+    import audio_recording
+    from benchmarks.mocks import FakeMicrophone, make_answer_wav
+
+    lead, speech = 0.5, 2.0
+    wav = make_answer_wav(workdir / "answer.wav", lead=lead, speech=speech)
+    audio_recording.sd = FakeMicrophone(wav, speed=speed)
+    answers_dir = str(workdir / "answers")
+    files = []
+    with recorder.wall("recording"):
+        for _ in range(rounds):
+            start = time.perf_counter()
+            files.append(audio_recording.load_audio(duration=25, folder=answers_dir))
+            elapsed = time.perf_counter() - start
+            recorder.add("recording", elapsed)
+            # Сколько запись продолжалась после окончания речи (в секундах звука)
+            recorder.add("recording.endpoint_delay", elapsed * speed - (lead + speech))
+    return files
+
+
+def bench_stt(recorder, files, whisper):
+    import audio_text
+
+    with recorder.wall("stt"):
+        for audio_file in files:
+            with recorder.measure("stt.speechkit"):
+                audio_text.recognize_audio(audio_file)
+
+    if whisper:
+        engine = audio_text.get_transcription_engine()
+        engine.transcribe(files[0])  # загрузка модели не входит в замер
+        with recorder.wall("stt.whisper"):
+            for audio_file in files:
+                with recorder.measure("stt.whisper"):
+                    engine.transcribe(audio_file)
+
+
+def bench_interviews(recorder, backends, sessions, questions, answer_file=None):
+    import interview_engine
+
+    engine = interview_engine.InterviewEngine()
+    try:
+        with recorder.wall("interview"):
+            ids = [engine.start_session("benchmark", JOB_TEXT, RESUME_TEXT, questions, api_base=backends.llm_base)
+                   for _ in range(sessions)]
+            pending = set(ids)
+            while pending:
+                for session_id in list(pending):
+                    status = engine.status(session_id)
+                    if status["state"] == interview_engine.RECORDING:
+                        if answer_file:
+                            engine.submit_answer(session_id, audio_file=answer_file)
+                        else:
+                            engine.submit_answer(session_id, text="Я работал аналитиком три года.")
+                    elif status["state"] in (interview_engine.FINISHED, interview_engine.FAILED):
+                        if status["state"] == interview_engine.FAILED:
+                            print(f"⚠️ Интервью {session_id} завершилось ошибкой: {status['error']}")
+                        recorder.add("interview", status["finished_at"] - status["started_at"])
+                        pending.discard(session_id)
+                time.sleep(0.02)
+    finally:
+        engine.shutdown()
+
+
+def compare(summary, baseline_path, tolerance=REGRESSION_TOLERANCE):
+    """Этапы, у которых p95 вырос больше чем на tolerance относительно базового прогона"""
+    baseline = json.loads(Path(baseline_path).read_text(encoding="utf-8"))["stages"]
+    regressions = []
+    for stage, stats in summary.items():
+        base = baseline.get(stage)
+        if base and base["p95"] > 0 and stats["p95"] > base["p95"] * (1 + tolerance):
+            regressions.append((stage, base["p95"], stats["p95"]))
+    return regressions
+
+
+def print_summary(summary):
+    print(f"\n{'Этап':<26}{'n':>5}{'p50, с':>10}{'p95, с':>10}{'оп/с':>9}{'RSS, МБ':>10}")
+    for stage, stats in sorted(summary.items()):
+        throughput = f"{stats['throughput']:.2f}" if stats["throughput"] else "-"
+        rss = f"{stats['peak_rss_mb']:.0f}" if stats["peak_rss_mb"] else "-"
+        print(f"{stage:<26}{stats['count']:>5}{stats['p50']:>10.3f}{stats['p95']:>10.3f}{throughput:>9}{rss:>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк конвейера на локальных заглушках сервисов")
+    parser.add_argument("--rounds", type=int, default=5, help="Повторов каждого этапа")
+    parser.add_argument("--documents", type=int, default=20, help="Синтетических резюме для извлечения текста")
+    parser.add_argument("--sessions", type=int, default=10, help="Одновременных интервью в сквозном этапе")
+    parser.add_argument("--questions", type=int, default=3, help="Вопросов в каждом интервью")
+    parser.add_argument("--model", default=None, help="Путь к модели эмбеддингов (по умолчанию model/)")
+    parser.add_argument("--whisper", action="store_true", help="Замерить и Whisper (нужна модель)")
+    parser.add_argument("--mic-speed", type=float, default=4.0, help="Ускорение фейкового микрофона")
+    parser.add_argument("--llm-ttft", type=float, default=0.3)
+    parser.add_argument("--llm-token-delay", type=float, default=0.02)
+    parser.add_argument("--llm-latency", type=float, default=1.0)
+    parser.add_argument("--tts-latency", type=float, default=0.2)
+    parser.add_argument("--stt-latency", type=float, default=0.3)
+    parser.add_argument("--stages", default="documents,llm,tts,recording,stt,interview",
+                        help="Этапы через запятую")
+    parser.add_argument("--baseline", default=None, help="JSON прошлого прогона для поиска регрессий")
+    parser.add_argument("--output", default=None, help="Куда сохранить результаты (JSON)")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")  # воспроизведение без звуковой карты
+    model_path = args.model or (str(ROOT / "model") if (ROOT / "model" / "config.json").exists() else None)
+    if model_path and Path(model_path).exists():
+        model_path = str(Path(model_path).resolve())
+    stages = set(args.stages.split(","))
+    output = Path(args.output).resolve() if args.output else RESULTS_DIR / f"bench_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    baseline = Path(args.baseline).resolve() if args.baseline else None
+    cwd = os.getcwd()
+
+    import audio_text
+    import transcription_queue
+    from benchmarks.mocks import MockBackends
+
+    recorder = StageRecorder()
+    with tempfile.TemporaryDirectory() as tmp, MockBackends(
+            llm_ttft=args.llm_ttft, llm_token_delay=args.llm_token_delay, llm_latency=args.llm_latency,
+            tts_latency=args.tts_latency, stt_latency=args.stt_latency) as backends:
+        workdir = Path(tmp)
+        os.chdir(workdir)  # аудио, кэши и отчёты прогона не попадают в проект
+        audio_text.TTS_URL = backends.tts_url
+        audio_text.STT_URL = backends.stt_url
+        audio_text.TTS_CACHE_DIR = str(workdir / "cache" / "tts")
+        try:
+            if "documents" in stages:
+                bench_documents(recorder, workdir, args.documents, model_path)
+            if "llm" in stages:
+                bench_llm(recorder, backends, args.rounds)
+            if "tts" in stages:
+                bench_tts(recorder, args.rounds)
+            answer_files = []
+            if "recording" in stages or "stt" in stages:
+                answer_files = bench_recording(recorder, workdir, args.rounds, args.mic_speed)
+            if "stt" in stages:
+                bench_stt(recorder, answer_files, args.whisper)
+            if "interview" in stages:
+                answer_file = answer_files[0] if args.whisper and answer_files else None
+                bench_interviews(recorder, backends, args.sessions, args.questions, answer_file)
+                if transcription_queue._transcription_queue is not None:
+                    transcription_queue._transcription_queue.shutdown()
+        finally:
+            os.chdir(cwd)
+        requests_count = dict(backends.requests)
+
+    summary = recorder.summary()
+    print_summary(summary)
+    print(f"\n📈 Пиковая память процесса: {peak_rss_mb():.0f} МБ; запросов к заглушкам: {requests_count}")
+
+    result = {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "args": vars(args),
+        "peak_rss_mb": peak_rss_mb(),
+        "mock_requests": requests_count,
+        "stages": summary,
+    }
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+    # Метрики самих модулей (спаны extract_text, embedding, llm, tts, record, asr)
+    from metrics import metrics
+    output.with_suffix(".prom").write_text(metrics.prometheus_text(), encoding="utf-8")
+    print(f"💾 Результаты: {output}")
+
+    if baseline:
+        regressions = compare(summary, baseline)
+        for stage, before, after in regressions:
+            print(f"❌ Регрессия {stage}: p95 {before:.3f} с -> {after:.3f} с")
+        if regressions:
+            return 1
+        print("✅ Регрессий относительно базового прогона нет")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
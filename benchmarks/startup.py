@@ -0,0 +1,133 @@
+"""Бенчмарк холодного старта: импорт модулей приложения и задержка первого действия.
+
+Каждый сценарий выполняется в отдельном чистом процессе. Запуск из корня проекта:
+    python -m benchmarks.startup --model model --repeats 3 [--whisper]
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+# Модули, которые импортирует скрипт Streamlit при каждом запуске
+APP_MODULES = ("config", "document_processor", "embedding_cache", "vector_index", "interview_engine")
+HEAVY_MODULES = ("torch", "transformers", "whisper", "pygame", "openai", "pandas", "sounddevice")
+SAMPLE_TEXT = "Аналитик данных: SQL, Python, A/B-тесты, построение отчётности. " * 20
+
+
+def _import_app():
+    start = time.perf_counter()
+    for name in APP_MODULES:
+        __import__(name)
+    return time.perf_counter() - start
+
+
+def _child(scenario, model_path):
+    """Один сценарий в текущем (свежем) процессе, результат — словарь секунд"""
+    result = {"import_app": _import_app()}
+    result["heavy_loaded"] = [name for name in HEAVY_MODULES if name in sys.modules]
+
+    if scenario == "heavy_imports":
+        # Для сравнения: сколько стоил бы импорт тяжёлых зависимостей при старте
+        start = time.perf_counter()
+        for name in ("torch", "transformers", "whisper", "pygame", "openai"):
+            __import__(name)
+        result["heavy_imports"] = time.perf_counter() - start
+
+    elif scenario in ("embedding_cold", "embedding_warm"):
+        from document_processor import get_embedding
+        if scenario == "embedding_warm":
+            from warmup import start_warmup
+            warmup = start_warmup(model_path, whisper=False)
+            warmup.wait()
+            result["warmup"] = warmup.timings.get("embedding")
+        start = time.perf_counter()
+        get_embedding(SAMPLE_TEXT, model_path, chunked=True, use_cache=False)
+        result["first_embedding"] = time.perf_counter() - start
+
+    elif scenario in ("whisper_cold", "whisper_warm"):
+        from audio_text import WHISPER_SAMPLE_RATE, get_transcription_engine
+        if scenario == "whisper_warm":
+            from warmup import start_warmup
+            warmup = start_warmup(whisper=True)
+            warmup.wait()
+            result["warmup"] = warmup.timings.get("whisper")
+        start = time.perf_counter()
+        audio = np.random.default_rng(0).normal(0, 0.01, 3 * WHISPER_SAMPLE_RATE).astype(np.float32)
+        get_transcription_engine().transcribe(audio)
+        result["first_transcription"] = time.perf_counter() - start
+    return result
+
+
+def _run_child(scenario, model_path):
+    command = [sys.executable, "-m", "benchmarks.startup", "--child", scenario]
+    if model_path:
+        command += ["--model", model_path]
+    start = time.perf_counter()
+    completed = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+    total = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(f"Сценарий {scenario} завершился ошибкой:\n{completed.stderr[-2000:]}")
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["process_total"] = total
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк холодного старта приложения")
+    parser.add_argument("--model", default=None, help="Путь к модели эмбеддингов (по умолчанию model/)")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--whisper", action="store_true", help="Замерить и первое распознавание Whisper")
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    model_path = args.model or (str(ROOT / "model") if (ROOT / "model" / "config.json").exists() else None)
+    if model_path and Path(model_path).exists():
+        model_path = str(Path(model_path).resolve())
+
+    if args.child:
+        print(json.dumps(_child(args.child, model_path)))
+        return 0
+
+    scenarios = ["import", "heavy_imports"]
+    if model_path:
+        scenarios += ["embedding_cold", "embedding_warm"]
+    else:
+        print("⏭️ Модель эмбеддингов не найдена — сценарии embedding пропущены (укажите --model)")
+    if args.whisper:
+        scenarios += ["whisper_cold", "whisper_warm"]
+
+    results = {}
+    for scenario in scenarios:
+        runs = [_run_child(scenario, model_path) for _ in range(args.repeats)]
+        metrics = {key: float(np.median([run[key] for run in runs]))
+                   for key, value in runs[0].items() if isinstance(value, (int, float)) and value is not None}
+        metrics["heavy_loaded"] = runs[0]["heavy_loaded"]
+        results[scenario] = metrics
+
+    print(f"\n{'Сценарий':<18}{'импорт, с':>11}{'прогрев, с':>12}{'первое действие, с':>20}{'процесс, с':>12}")
+    for scenario, metrics in results.items():
+        first = metrics.get("first_embedding", metrics.get("first_transcription", metrics.get("heavy_imports")))
+        warm = metrics.get("warmup")
+        print(f"{scenario:<18}{metrics['import_app']:>11.2f}{(f'{warm:.2f}' if warm else '-'):>12}"
+              f"{(f'{first:.2f}' if first is not None else '-'):>20}{metrics['process_total']:>12.2f}")
+    loaded = results["import"]["heavy_loaded"]
+    print(f"\nТяжёлые модули после импорта приложения: {', '.join(loaded) if loaded else 'нет'}")
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"startup_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({"created": time.strftime("%Y-%m-%d %H:%M:%S"), "args": vars(args),
+                                  "scenarios": results}, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"💾 Результаты: {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
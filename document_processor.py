@@ -1,12 +1,11 @@
 import json
 import re
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-import pandas as pd
 import docx
 from striprtf.striprtf import rtf_to_text
-from transformers import AutoTokenizer, AutoModel
-import torch
-import torch.nn.functional as F
+from embedding_cache import get_embedding_cache
+from metrics import metrics, span
 try:
     import fitz  # PyMuPDF
     FITZ_AVAILABLE = True
@@ -14,48 +13,253 @@ except ImportError as e:
     print(f"⚠️ PyMuPDF не доступен: {e}")
     FITZ_AVAILABLE = False
 
+# PDF длиннее этого числа страниц можно разбирать в нескольких процессах
+PARALLEL_PDF_MIN_PAGES = 50
+
+
+def iter_pdf_pages(filepath, start=0, stop=None):
+    """Генератор текста страниц PDF: страницы читаются по одной, без накопления строки"""
+    with fitz.open(filepath) as doc:
+        stop = doc.page_count if stop is None else min(stop, doc.page_count)
+        for page_number in range(start, stop):
+            yield doc.load_page(page_number).get_text()
+
+
+def _extract_pdf_range(filepath, start, stop):
+    """Текст диапазона страниц — выполняется в отдельном процессе"""
+    return "".join(iter_pdf_pages(filepath, start, stop))
+
+
+# Размеры порций при потоковом чтении табличных файлов
+CSV_CHUNK_ROWS = 10000
+JSON_READ_SIZE = 1 << 16
+
+
+def iter_csv_rows(filepath, chunksize=CSV_CHUNK_ROWS):
+    """Генератор строк CSV (словарь колонка -> значение), файл читается порциями"""
+    import pandas as pd
+
+    for chunk in pd.read_csv(filepath, chunksize=chunksize, dtype=str, keep_default_na=False):
+        columns = list(chunk.columns)
+        for values in chunk.itertuples(index=False, name=None):
+            yield dict(zip(columns, values))
+
+
+# Символы, после которых число или литерал JSON точно закончились
+JSON_DELIMITERS = frozenset(",:]} \t\r\n")
+
+
+class _JsonStream:
+    """Буфер поверх файла для разбора JSON по частям"""
+
+    def __init__(self, f, read_size):
+        self.f = f
+        self.read_size = read_size
+        self.buffer = ""
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        chunk = self.f.read(self.read_size)
+        self.eof = not chunk
+        self.buffer += chunk
+        return bool(chunk)
+
+    def peek(self):
+        """Следующий значимый символ ('' в конце файла)"""
+        while True:
+            self.buffer = self.buffer.lstrip()
+            if self.buffer or not self._fill():
+                return self.buffer[:1]
+
+    def take(self, expected):
+        char = self.peek()
+        if not char or char not in expected:
+            raise ValueError(f"Некорректный JSON: ожидалось {' или '.join(expected)}, получено {char!r}")
+        self.buffer = self.buffer[1:]
+        return char
+
+    def value(self):
+        """Следующее значение целиком"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer)
+            except ValueError:
+                if not self._fill():
+                    raise
+                continue
+            # Число или литерал на границе порции могли быть прочитаны не полностью
+            if not self.eof and (end == len(self.buffer) or self.buffer[end] not in JSON_DELIMITERS):
+                if self._fill():
+                    continue
+            self.buffer = self.buffer[end:]
+            return value
+
+    def end(self):
+        """После значения верхнего уровня допускаются только пробелы"""
+        if self.peek():
+            raise ValueError("Некорректный JSON: лишние данные после значения")
+
+    def items(self):
+        """Элементы массива по одному (открывающая скобка уже прочитана)"""
+        if self.peek() == "]":
+            self.take("]")
+            return
+        while True:
+            yield self.value()
+            if self.take(",]") == "]":
+                return
+
+
+def iter_json_records(filepath, read_size=JSON_READ_SIZE, nested=True):
+    """Генератор записей JSON: файл читается порциями, записи разбираются по одному.
+
+    Записи — элементы массива верхнего уровня. Если наверху объект, а nested=True,
+    записи берутся из первого поля-массива объектов ({"candidates": [{...}, ...]}),
+    остальные поля пропускаются. Объект без такого поля (или при nested=False)
+    и одиночное значение возвращаются целиком.
+    """
+    with open(filepath, "r", encoding="utf-8") as f:
+        stream = _JsonStream(f, read_size)
+        first = stream.peek()
+        if first == "[":
+            stream.take("[")
+            yield from stream.items()
+        elif first == "{" and nested:
+            yield from _iter_nested_records(stream)
+        else:
+            yield stream.value()
+        stream.end()
+
+
+def _render_json(filepath, read_size=JSON_READ_SIZE):
+    """Тот же текст, что json.dumps(json.load(f), ensure_ascii=False, indent=2),
+    но массив верхнего уровня разбирается и выводится по элементам"""
+    with open(filepath, "r", encoding="utf-8") as f:
+        stream = _JsonStream(f, read_size)
+        if stream.peek() != "[":
+            text = json.dumps(stream.value(), ensure_ascii=False, indent=2)
+            stream.end()
+            return text
+        stream.take("[")
+        # Элемент массива при indent=2 — его собственный вывод со сдвигом на один уровень
+        parts = ["  " + json.dumps(record, ensure_ascii=False, indent=2).replace("\n", "\n  ")
+                 for record in stream.items()]
+        stream.end()
+    return "[\n" + ",\n".join(parts) + "\n]" if parts else "[]"
+
+
+def _iter_nested_records(stream):
+    stream.take("{")
+    fields = {}
+    streamed = False
+    if stream.peek() == "}":
+        stream.take("}")
+        yield fields
+        return
+    while True:
+        key = stream.value()
+        stream.take(":")
+        if stream.peek() == "[" and not streamed:
+            stream.take("[")
+            if stream.peek() == "{":
+                yield from stream.items()
+                streamed = True
+            else:
+                fields[key] = list(stream.items())
+        elif streamed:
+            stream.value()
+        else:
+            fields[key] = stream.value()
+        if stream.take(",}") == "}":
+            break
+    if not streamed:
+        yield fields
+
+
 class DocumentReader:
-    def __init__(self, filepath: str):
+    def __init__(self, filepath: str, pdf_workers: int = 1):
         self.filepath = Path(filepath)
         self.text = ""
+        self.pdf_workers = pdf_workers
 
     def extract_text(self):
         suffix = self.filepath.suffix.lower()
 
-        if suffix == ".pdf":
-            self.text = self._read_pdf()
-        elif suffix == ".txt":
-            self.text = self.filepath.read_text(encoding="utf-8", errors="ignore")
-        elif suffix == ".json":
-            self.text = self._read_json()
-        elif suffix == ".csv":
-            self.text = self._read_csv()
-        elif suffix == ".docx":
-            self.text = self._read_docx()
-        elif suffix == ".rtf":
-            self.text = self._read_rtf()
-        else:
-            raise ValueError(f"Формат {suffix} не поддерживается.")
+        with span("extract_text", format=suffix.lstrip(".")):
+            if suffix == ".pdf":
+                self.text = self._read_pdf()
+            elif suffix == ".txt":
+                self.text = self.filepath.read_text(encoding="utf-8", errors="ignore")
+            elif suffix == ".json":
+                self.text = self._read_json()
+            elif suffix == ".csv":
+                self.text = self._read_csv()
+            elif suffix == ".docx":
+                self.text = self._read_docx()
+            elif suffix == ".rtf":
+                self.text = self._read_rtf()
+            else:
+                raise ValueError(f"Формат {suffix} не поддерживается.")
         return self.text
 
     def _read_pdf(self):
         if not FITZ_AVAILABLE:
             return "Обработка PDF недоступна (требуется PyMuPDF)"
 
-        text = ""
-        with fitz.open(self.filepath) as doc:
-            for page in doc:
-                text += page.get_text()
-        return text
+        if self.pdf_workers > 1:
+            with fitz.open(self.filepath) as doc:
+                page_count = doc.page_count
+            if page_count >= PARALLEL_PDF_MIN_PAGES:
+                return self._read_pdf_parallel(page_count)
+
+        return "".join(self.iter_pages())
+
+    def iter_pages(self):
+        """Постраничное чтение PDF для потоковой обработки больших файлов"""
+        if not FITZ_AVAILABLE:
+            raise ValueError("Обработка PDF недоступна (требуется PyMuPDF)")
+        return iter_pdf_pages(self.filepath)
+
+    def _read_pdf_parallel(self, page_count):
+        """Делит PDF на диапазоны страниц и разбирает их в пуле процессов"""
+        workers = min(self.pdf_workers, page_count)
+        step = -(-page_count // workers)
+        ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parts = executor.map(_extract_pdf_range, [str(self.filepath)] * len(ranges),
+                                 [start for start, _ in ranges], [stop for _, stop in ranges])
+            return "".join(parts)
 
     def _read_json(self):
-        with open(self.filepath, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        return json.dumps(data, ensure_ascii=False, indent=2)
+        return _render_json(self.filepath)
 
     def _read_csv(self):
-        df = pd.read_csv(self.filepath)
-        return df.to_string(index=False)
+        return "\n".join(self._iter_csv_lines())
+
+    def _iter_csv_lines(self):
+        header_written = False
+        for row in iter_csv_rows(self.filepath):
+            if not header_written:
+                yield " | ".join(row.keys())
+                header_written = True
+            yield " | ".join(row.values())
+
+    def iter_records(self):
+        """Каждая строка CSV или элемент JSON-массива как отдельный документ.
+
+        Для остальных форматов возвращается весь текст файла.
+        """
+        suffix = self.filepath.suffix.lower()
+        if suffix == ".csv":
+            for row in iter_csv_rows(self.filepath):
+                yield "\n".join(f"{column}: {value}" for column, value in row.items() if value)
+        elif suffix == ".json":
+            for record in iter_json_records(self.filepath):
+                yield json.dumps(record, ensure_ascii=False, indent=2)
+        else:
+            yield self.extract_text()
 
     def _read_docx(self):
         doc = docx.Document(self.filepath)
@@ -85,26 +289,44 @@ class DocumentReader:
         return rtf_to_text(content)
 
 
+# Ключевые слова перед названием вакансии в порядке приоритета и что должно идти после них.
+# «должность и зарплата» отдельно не нужна — её находит уже «должность».
+JOB_TITLE_KEYWORDS = (
+    ("должность", r"[:\s]*([^\n]+)"),
+    ("позиция", r"[:\s]*([^\n]+)"),
+    ("вакансия", r"[:\s]*([^\n]+)"),
+    ("ищем", r"\s+([^\n]+)"),
+    ("требуется", r"\s+([^\n]+)"),
+    ("название", r"[:\s]*([^\n]+)"),
+    (r"job\s+title", r"[:\s]*([^\n]+)"),
+)
+# Все ключевые слова ищутся за один проход по тексту. Класс первых букв впереди позволяет re
+# быстро пропускать позиции, с которых не начинается ни одно ключевое слово
+_JOB_TITLE_FIRST = "".join(sorted({c for keyword, _ in JOB_TITLE_KEYWORDS for c in (keyword[0].lower(),
+                                                                                     keyword[0].upper())}))
+JOB_TITLE_PATTERN = re.compile(f"(?=[{_JOB_TITLE_FIRST}])(?:"
+                               + "|".join(f"({keyword})" for keyword, _ in JOB_TITLE_KEYWORDS) + ")",
+                               re.IGNORECASE)
+JOB_TITLE_TAILS = [re.compile(tail) for _, tail in JOB_TITLE_KEYWORDS]
+JOB_TITLE_JUNK = re.compile(r'[^\w\sа-яА-ЯёЁ/-]')
+
+
 def extract_job_title(text: str) -> str:
     """Извлечение названия вакансии"""
-    patterns = [
-        r'(?i)должность[:\s]*([^\n]+)',
-        r'(?i)должность и зарплата[:\s]*([^\n]+)',
-        r'(?i)позиция[:\s]*([^\n]+)',
-        r'(?i)вакансия[:\s]*([^\n]+)',
-        r'(?i)ищем\s+([^\n]+)',
-        r'(?i)требуется\s+([^\n]+)',
-        r'(?i)название[:\s]*([^\n]+)',
-        r'(?i)job\s+title[:\s]*([^\n]+)'
-    ]
-
-    for pattern in patterns:
-        match = re.search(pattern, text)
-        if match:
-            title = match.group(1).strip()
-            # Очищаем от лишних символов
-            title = re.sub(r'[^\w\sа-яА-ЯёЁ/-]', '', title)
-            return title
+    best_priority, title = len(JOB_TITLE_KEYWORDS), None
+    for match in JOB_TITLE_PATTERN.finditer(text):
+        priority = match.lastindex - 1
+        if priority >= best_priority:
+            continue
+        tail = JOB_TITLE_TAILS[priority].match(text, match.end())
+        if tail:
+            best_priority, title = priority, tail.group(1)
+            if priority == 0:
+                break
+
+    if title is not None:
+        # Очищаем от лишних символов
+        return JOB_TITLE_JUNK.sub('', title.strip())
 
     # Если не нашли в шаблонах, берем первую строку
     first_line = text.split('\n')[0].strip()
@@ -114,30 +336,99 @@ def extract_job_title(text: str) -> str:
     return "Название вакансии не указано"
 
 
-def get_embedding(text, model_path):
-    tokenizer = AutoTokenizer.from_pretrained(model_path)
-    model = AutoModel.from_pretrained(model_path)
+# Модель эмбеддингов по умолчанию: скачанная копия в model/ или RuBERT-tiny2 из HuggingFace Hub
+LOCAL_MODEL_DIR = "model"
+HUB_MODEL = "cointegrated/rubert-tiny2"
+
+
+def default_model_path():
+    """Путь к модели эмбеддингов, если он не задан явно"""
+    return LOCAL_MODEL_DIR if (Path(LOCAL_MODEL_DIR) / "config.json").exists() else HUB_MODEL
+
+
+def _cache_config(config, backend):
+    # Квантизованная модель даёт немного другие векторы — у неё свои записи в кэше
+    return config if backend == "torch" else f"{config}:{backend}"
+
+
+def _embedding_config(chunked, window, stride, pooling):
+    return f"chunked:{window}:{stride}:{pooling}" if chunked else "truncate:512"
+
+
+def get_embedding(text, model_path, chunked=False, window=512, stride=256, pooling="mean", use_cache=True):
+    # torch и transformers загружаются при первом вычислении, а не при импорте модуля
+    import torch
+    from embeddings import get_embedding_service, EMBEDDING_BACKEND
+
+    config = _cache_config(_embedding_config(chunked, window, stride, pooling), EMBEDDING_BACKEND)
+    cache = get_embedding_cache(model_path) if use_cache else None
+    if cache is not None:
+        cached = cache.get(text, config)
+        metrics.inc("embedding_cache_total", result="miss" if cached is None else "hit")
+        if cached is not None:
+            return torch.from_numpy(cached).unsqueeze(0)
+
+    # Модель загружается один раз на процесс и переиспользуется между вызовами
+    service = get_embedding_service(model_path)
+    with span("embedding", mode="chunked" if chunked else "truncate"):
+        if chunked:
+            # Длинный документ целиком: скользящее окно вместо обрезки на 512 токенах
+            embedding = service.embed_long(text, window=window, stride=stride, pooling=pooling)
+        else:
+            embedding = service.embed(text)
+
+    if cache is not None:
+        cache.put(text, config, embedding[0].numpy())
+    return embedding
+
+
+def get_embeddings(texts, model_path, batch_size=32, use_cache=True, chunked=False, window=512, stride=256,
+                   pooling="mean"):
+    """Эмбеддинги сразу для многих текстов (батчами), матрица (N, dim).
+
+    chunked — как в get_embedding: документ целиком скользящим окном, записи кэша общие с ним.
+    """
+    import torch
+    from embeddings import get_embedding_service, EMBEDDING_BACKEND
+
+    texts = list(texts)
+    service = get_embedding_service(model_path)
+    mode = "chunked_batch" if chunked else "batch"
+
+    def compute(batch):
+        with span("embedding", mode=mode):
+            if chunked:
+                return service.embed_long_many(batch, window=window, stride=stride, pooling=pooling,
+                                               batch_size=batch_size)
+            return service.embed_many(batch, batch_size=batch_size)
 
-    # Добавьте эту строку - указываем устройство
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    model = model.to(device)
+    if not use_cache:
+        return compute(texts)
 
-    inputs = tokenizer(text, return_tensors="pt", truncation=True, padding=True, max_length=512)
+    config = _cache_config(_embedding_config(chunked, window, stride, pooling), EMBEDDING_BACKEND)
+    cache = get_embedding_cache(model_path)
+    cached = cache.get_many(texts, config)
+    missing = [i for i, vector in enumerate(cached) if vector is None]
+    metrics.inc("embedding_cache_total", len(texts) - len(missing), result="hit")
+    metrics.inc("embedding_cache_total", len(missing), result="miss")
 
-    # Перенесите inputs на то же устройство
-    inputs = {k: v.to(device) for k, v in inputs.items()}
+    result = torch.empty((len(texts), service.model.config.hidden_size))
+    for i, vector in enumerate(cached):
+        if vector is not None:
+            result[i] = torch.from_numpy(vector)
+    if missing:
+        computed = compute([texts[i] for i in missing])
+        result[missing] = computed
+        cache.put_many([texts[i] for i in missing], config, computed.numpy())
+    return result
 
-    with torch.no_grad():
-        outputs = model(**inputs)
-        embeddings = outputs.last_hidden_state.mean(dim=1)
-        embeddings = F.normalize(embeddings, p=2, dim=1)
 
-    # Верните на CPU для совместимости
-    return embeddings.cpu()
+# Порог схожести (в %), начиная с которого кандидата приглашают на собеседование
+MATCH_THRESHOLD = 85.5
 
 
 def _generate_recommendation(score: float):
-    if score >= 85.5:
+    if score >= MATCH_THRESHOLD:
 
         return "Хорошее соответствие. Рекомендуем пригласить на собеседование."
 
@@ -155,6 +446,6 @@ if __name__ == "__main__":
 
     resume_emb = get_embedding(resume_text, model_path)
     job_emb = get_embedding(job_text, model_path)
-    similarity = torch.mm(resume_emb, job_emb.T).item() * 100
+    similarity = (resume_emb @ job_emb.T).item() * 100
     print(f"Cхожесть: {similarity:.2f}%")
     print(_generate_recommendation(similarity))
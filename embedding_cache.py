@@ -0,0 +1,328 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+CACHE_DIR = "cache/embeddings"
+MAX_ENTRIES = 50000
+# Через столько дописанных в журнал записей индекс переписывается снимком целиком
+LOG_COMPACT_LINES = 20000
+
+
+@contextmanager
+def _file_lock(path):
+    """Эксклюзивная блокировка каталога кэша между процессами"""
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _file_stamp(path):
+    """Идентичность файла: меняется при атомарной замене (os.replace) и перезаписи"""
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def model_fingerprint(model_path):
+    """Отпечаток модели: при любом изменении файлов в model/ кэш становится недействительным"""
+    path = Path(model_path)
+    if not path.is_dir():
+        # Модель из HuggingFace Hub — идентифицируем по имени
+        return str(model_path)
+
+    digest = hashlib.sha256()
+    for file in sorted(path.rglob("*")):
+        if file.is_file():
+            stat = file.stat()
+            digest.update(f"{file.relative_to(path)}|{stat.st_size}|{stat.st_mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class EmbeddingCache:
+    """Кэш эмбеддингов на диске: матрица float32 в memmap + компактный индекс.
+
+    Ключ — хэш извлечённого текста, модель и конфигурация пулинга. При переполнении
+    вытесняются давно не использованные записи (LRU).
+
+    Индекс — снимок index.json и журнал index.log, в который каждый put_many дописывает
+    только новые назначения строк; журнал сворачивается в снимок раз в LOG_COMPACT_LINES
+    записей. Каталог кэша могут одновременно использовать несколько процессов (воркеры
+    Streamlit, ingest): все операции идут под межпроцессной блокировкой, а перед ними
+    подтягиваются изменения индекса, сделанные другими процессами. Порядок LRU по чтениям
+    у каждого процесса свой — на диск записываются только добавления.
+    """
+
+    def __init__(self, model_path, cache_dir=CACHE_DIR, max_entries=MAX_ENTRIES):
+        self.model_id = str(model_path)
+        self.fingerprint = model_fingerprint(model_path)
+        self.max_entries = max_entries
+
+        name = hashlib.sha256(self.model_id.encode("utf-8")).hexdigest()[:12]
+        self.dir = Path(cache_dir) / name
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.dir / "index.json"
+        self.log_path = self.dir / "index.log"
+        self.vectors_path = self.dir / "vectors.f32"
+        self.lock_path = self.dir / "cache.lock"
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # ключ -> строка матрицы, от давно не использованных к недавним
+        self._row_keys = {}  # строка матрицы -> ключ
+        self._next_row = 0
+        self._vectors = None
+        self.dim = None
+        self._index_stamp = None  # какой снимок индекса загружен
+        self._log_offset = 0  # до какого места прочитан журнал
+        self._log_records = 0
+        self._stale = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        with self._lock, _file_lock(self.lock_path):
+            self._sync(validate=True)
+
+    def _key(self, text, config):
+        text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return hashlib.sha256(f"{text_hash}|{self.model_id}|{config}".encode("utf-8")).hexdigest()[:32]
+
+    def _sync(self, validate=False):
+        """Подтягивает изменения других процессов: новый снимок индекса и дописанные строки журнала"""
+        stamp = _file_stamp(self.index_path)
+        if stamp != self._index_stamp:
+            self._load(validate)
+            self._index_stamp = _file_stamp(self.index_path)
+        if self._vectors is not None:
+            self._read_log()
+
+    def _load(self, validate):
+        self._vectors = None
+        self._entries = OrderedDict()
+        self._row_keys = {}
+        self._next_row = 0
+        self.dim = None
+        self._log_offset = 0
+        self._log_records = 0
+        if not self.index_path.exists():
+            return
+        try:
+            index = json.loads(self.index_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            if validate:
+                print(f"⚠️ Индекс кэша эмбеддингов повреждён, кэш сброшен: {e}")
+                self._reset()
+            return
+
+        if (index.get("fingerprint") != self.fingerprint
+                or index.get("max_entries") != self.max_entries
+                or not self.vectors_path.exists()):
+            if validate:
+                print("🔄 Модель или настройки изменились — кэш эмбеддингов сброшен")
+                self._reset()
+            else:
+                # Кэш сброшен процессом с другой версией модели — этот процесс больше в него не пишет
+                print("⚠️ Кэш эмбеддингов занят другой версией модели — кэширование отключено")
+                self._stale = True
+            return
+
+        self.dim = index["dim"]
+        entries = index["entries"]
+        if isinstance(entries, dict):
+            # Старый формат: ключ -> [строка, время последнего обращения]
+            entries = [(key, row) for key, (row, _) in sorted(entries.items(), key=lambda item: item[1][1])]
+        for key, row in entries:
+            self._assign(key, row)
+        self._open_vectors()
+
+    def _read_log(self):
+        if not self.log_path.exists():
+            return
+        with open(self.log_path, "rb") as f:
+            f.seek(self._log_offset)
+            data = f.read()
+        # Незавершённая последняя строка (процесс упал во время записи) пропускается
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            try:
+                key, row = json.loads(line)
+            except ValueError:
+                continue
+            if 0 <= row < self.max_entries:
+                self._assign(key, row)
+                self._log_records += 1
+        self._log_offset += end
+
+    def _assign(self, key, row):
+        """Закрепляет строку матрицы за ключом (прежний владелец строки вытеснен)"""
+        previous = self._row_keys.get(row)
+        if previous is not None and previous != key:
+            self._entries.pop(previous, None)
+        self._entries[key] = row
+        self._entries.move_to_end(key)
+        self._row_keys[row] = key
+        self._next_row = max(self._next_row, row + 1)
+
+    def _reset(self):
+        self._vectors = None
+        self._entries = OrderedDict()
+        self._row_keys = {}
+        self._next_row = 0
+        self.dim = None
+        self._log_offset = 0
+        self._log_records = 0
+        for path in (self.index_path, self.log_path, self.vectors_path):
+            if path.exists():
+                path.unlink()
+        self._index_stamp = None
+
+    def _open_vectors(self):
+        mode = "r+" if self.vectors_path.exists() else "w+"
+        self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode=mode,
+                                  shape=(self.max_entries, self.dim))
+
+    def _save_index(self):
+        """Снимок индекса целиком (запись во временный файл и атомарная замена), журнал очищается"""
+        index = {
+            "model_id": self.model_id,
+            "fingerprint": self.fingerprint,
+            "dim": self.dim,
+            "max_entries": self.max_entries,
+            "entries": list(self._entries.items()),
+        }
+        tmp_path = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(index, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp_path, self.index_path)
+        # Журнал очищается только после замены снимка: при падении между ними он повторно
+        # применит те же назначения строк
+        open(self.log_path, "wb").close()
+        self._log_offset = 0
+        self._log_records = 0
+        self._index_stamp = _file_stamp(self.index_path)
+
+    def _append_log(self, assigned):
+        with open(self.log_path, "ab") as f:
+            f.write("".join(json.dumps(item, separators=(",", ":")) + "\n" for item in assigned).encode("utf-8"))
+            self._log_offset = f.tell()
+        self._log_records += len(assigned)
+        if self._log_records >= LOG_COMPACT_LINES:
+            self._save_index()
+
+    def get(self, text, config):
+        """Эмбеддинг из кэша (вектор float32) или None"""
+        return self.get_many([text], config)[0]
+
+    def get_many(self, texts, config):
+        keys = [self._key(text, config) for text in texts]
+        result = []
+        with self._lock, _file_lock(self.lock_path):
+            # Вектор читается под блокировкой: другой процесс мог занять эту строку при вытеснении
+            self._sync()
+            for key in keys:
+                row = self._entries.get(key)
+                if row is None:
+                    self.misses += 1
+                    result.append(None)
+                    continue
+                self.hits += 1
+                self._entries.move_to_end(key)
+                result.append(np.array(self._vectors[row]))
+        return result
+
+    def put(self, text, config, vector):
+        self.put_many([text], config, np.asarray(vector).reshape(1, -1))
+
+    def put_many(self, texts, config, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        keys = [self._key(text, config) for text in texts]
+        with self._lock, _file_lock(self.lock_path):
+            self._sync()
+            if self._stale:
+                return
+            if self._vectors is None:
+                self.dim = vectors.shape[1]
+                self._open_vectors()
+                # Снимок с размерностью нужен сразу — по нему другие процессы откроют матрицу
+                self._save_index()
+
+            assigned = []
+            for key, vector in zip(keys, vectors):
+                row = self._entries.get(key)
+                if row is None:
+                    row = self._allocate_row()
+                    self._assign(key, row)
+                    assigned.append((key, row))
+                else:
+                    self._entries.move_to_end(key)
+                self._vectors[row] = vector
+
+            # Сначала векторы, затем журнал: запись индекса не может указывать на недописанную строку
+            self._vectors.flush()
+            if assigned:
+                self._append_log(assigned)
+
+    def _allocate_row(self):
+        if self._next_row < self.max_entries:
+            return self._next_row
+        # Кэш заполнен: освобождаем строку самой давно не использованной записи
+        _, row = self._entries.popitem(last=False)
+        del self._row_keys[row]
+        self.evictions += 1
+        return row
+
+    def clear(self):
+        with self._lock, _file_lock(self.lock_path):
+            self._reset()
+
+    def stats(self):
+        """Размер кэша и доля попаданий"""
+        with self._lock:
+            requests_total = self.hits + self.misses
+            index_size = sum(path.stat().st_size for path in (self.index_path, self.log_path) if path.exists())
+            return {
+                "model_id": self.model_id,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / requests_total if requests_total else 0.0,
+                "evictions": self.evictions,
+                "size_bytes": len(self._entries) * (self.dim or 0) * 4 + index_size,
+            }
+
+
+# Один кэш на модель в пределах процесса
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(model_path, cache_dir=CACHE_DIR):
+    key = (str(model_path), str(cache_dir))
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = EmbeddingCache(model_path, cache_dir=cache_dir)
+            _caches[key] = cache
+    return cache
@@ -0,0 +1,362 @@
+import hashlib
+import inspect
+import os
+import threading
+import time
+from pathlib import Path
+from transformers import AutoTokenizer, AutoModel
+import torch
+import torch.nn.functional as F
+from embedding_cache import model_fingerprint
+
+MAX_LENGTH = 512
+POOLING_MODES = ("mean", "max", "attention")
+
+# Среда выполнения модели на CPU: "torch" — fp32 PyTorch, "int8" — динамическая int8-квантизация
+# линейных слоёв, "onnx" — экспорт в ONNX и onnxruntime. Выбирается на процесс переменными окружения.
+EMBEDDING_BACKENDS = ("torch", "int8", "onnx")
+EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", "torch")
+# Потоки внутри операций (None — значение по умолчанию среды выполнения)
+EMBEDDING_THREADS = int(os.environ["EMBEDDING_THREADS"]) if os.environ.get("EMBEDDING_THREADS") else None
+ONNX_DIR = "cache/onnx"
+ONNX_OPSET = 14
+
+
+def _resolve_device(device=None):
+    if device is None:
+        return torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    return torch.device(device)
+
+
+class EmbeddingService:
+    """Модель эмбеддингов, загруженная один раз на процесс"""
+
+    def __init__(self, model_path, device=None, dtype=None, backend=EMBEDDING_BACKEND, threads=EMBEDDING_THREADS):
+        if backend not in EMBEDDING_BACKENDS:
+            raise ValueError(f"Неизвестный бэкенд эмбеддингов: {backend}")
+        self.model_path = str(model_path)
+        self.backend = backend
+        self.threads = threads
+        # int8 и ONNX — только для CPU
+        self.device = _resolve_device(device) if backend == "torch" else torch.device("cpu")
+        self.dtype = dtype
+
+        start = time.perf_counter()
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_path)
+        model = AutoModel.from_pretrained(self.model_path)
+        if dtype is not None and backend == "torch":
+            model = model.to(dtype=dtype)
+        self.model = model.to(self.device).eval()
+        if threads and backend != "onnx":
+            torch.set_num_threads(threads)
+        if backend == "int8":
+            self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+        self._session = _onnx_session(self.model, self.tokenizer, self.model_path, threads) \
+            if backend == "onnx" else None
+        self.load_time = time.perf_counter() - start
+
+        # Токенайзер и модель не рассчитаны на одновременные вызовы из сессий Streamlit
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.texts = 0
+        self.total_time = 0.0
+        self.last_time = 0.0
+        print(f"✅ Модель эмбеддингов загружена: {self.model_path} ({self.device}, {self.backend}, "
+              f"{self.load_time:.2f} с)")
+
+    def embed(self, text):
+        """Нормализованный эмбеддинг одного текста, тензор (1, dim) на CPU"""
+        start = time.perf_counter()
+        with self._lock:
+            inputs = self.tokenizer(text, return_tensors="pt", truncation=True, padding=True,
+                                    max_length=MAX_LENGTH)
+            embeddings = self._forward(inputs)
+            self._record(time.perf_counter() - start, 1)
+        return embeddings.cpu()
+
+    def embed_many(self, texts, batch_size=32):
+        """Нормализованные эмбеддинги списка текстов, матрица (N, dim) в исходном порядке"""
+        texts = list(texts)
+        if not texts:
+            return torch.empty((0, self.model.config.hidden_size))
+
+        start = time.perf_counter()
+        with self._lock:
+            encoded = self.tokenizer(texts, truncation=True, max_length=MAX_LENGTH)
+        input_ids = encoded["input_ids"]
+
+        # Сортируем по длине, чтобы в батче было минимум паддинга
+        order = sorted(range(len(texts)), key=lambda i: len(input_ids[i]))
+        result = torch.empty((len(texts), self.model.config.hidden_size))
+
+        for begin in range(0, len(order), batch_size):
+            batch_idx = order[begin:begin + batch_size]
+            features = [{k: encoded[k][i] for k in encoded.keys()} for i in batch_idx]
+            with self._lock:
+                inputs = self.tokenizer.pad(features, return_tensors="pt")
+                result[batch_idx] = self._forward(inputs).cpu()
+
+        with self._lock:
+            self._record(time.perf_counter() - start, len(texts))
+        return result
+
+    def embed_long(self, text, window=MAX_LENGTH, stride=None, pooling="mean", batch_size=16):
+        """Эмбеддинг длинного документа скользящим окном без обрезки на 512 токенах.
+
+        window и stride задаются в токенах, pooling: "mean", "max" или "attention".
+        """
+        if pooling not in POOLING_MODES:
+            raise ValueError(f"Неизвестный режим пулинга: {pooling}")
+        stride = stride or window // 2
+
+        start = time.perf_counter()
+        chunk_embs = []
+        batch = []
+        for chunk in self._iter_chunks(text, window, stride):
+            batch.append(chunk)
+            if len(batch) == batch_size:
+                chunk_embs.append(self._embed_chunks(batch))
+                batch = []
+        if batch:
+            chunk_embs.append(self._embed_chunks(batch))
+
+        if not chunk_embs:
+            return self.embed(text)
+
+        embeddings = _pool_chunks(torch.cat(chunk_embs), pooling)
+        with self._lock:
+            self._record(time.perf_counter() - start, 1)
+        return embeddings
+
+    def embed_long_many(self, texts, window=MAX_LENGTH, stride=None, pooling="mean", batch_size=16):
+        """embed_long для списка документов: окна разных документов идут в модель общими батчами.
+
+        Матрица (N, dim) в исходном порядке.
+        """
+        if pooling not in POOLING_MODES:
+            raise ValueError(f"Неизвестный режим пулинга: {pooling}")
+        texts = list(texts)
+        if not texts:
+            return torch.empty((0, self.model.config.hidden_size))
+        stride = stride or window // 2
+
+        start = time.perf_counter()
+        owners, batch, chunk_embs = [], [], []
+        for i, text in enumerate(texts):
+            for chunk in self._iter_chunks(text, window, stride):
+                owners.append(i)
+                batch.append(chunk)
+                if len(batch) == batch_size:
+                    chunk_embs.append(self._embed_chunks(batch))
+                    batch = []
+        if batch:
+            chunk_embs.append(self._embed_chunks(batch))
+
+        chunk_embs = torch.cat(chunk_embs) if chunk_embs else torch.empty((0, self.model.config.hidden_size))
+        owners = torch.tensor(owners, dtype=torch.long)
+        result = torch.empty((len(texts), self.model.config.hidden_size))
+        for i, text in enumerate(texts):
+            rows = chunk_embs[owners == i]
+            result[i] = (_pool_chunks(rows, pooling) if len(rows) else self.embed(text))[0]
+        with self._lock:
+            self._record(time.perf_counter() - start, len(texts))
+        return result
+
+    def _iter_chunks(self, text, window, stride):
+        """Генератор окон токенов: текст токенизируется по частям ровно один раз"""
+        content = window - len(self._special_ids())
+        if content <= 0 or not 0 < stride <= content:
+            raise ValueError(f"Некорректные параметры окна: window={window}, stride={stride}")
+
+        buffer = []
+        covered = 0  # сколько токенов в начале буфера уже вошло в выданные окна
+        for block in _iter_text_blocks(text):
+            with self._lock:
+                buffer.extend(self.tokenizer(block, add_special_tokens=False)["input_ids"])
+            while len(buffer) >= content:
+                yield buffer[:content]
+                del buffer[:stride]
+                covered = content - stride
+        if len(buffer) > covered:
+            yield buffer
+
+    def _special_ids(self):
+        """Служебные токены, которые токенайзер добавляет вокруг текста"""
+        with self._lock:
+            return self.tokenizer("")["input_ids"]
+
+    def _embed_chunks(self, chunks):
+        """Один батчевый проход модели по окнам документа"""
+        special = self._special_ids()
+        features = []
+        for ids in chunks:
+            # [CLS] окно [SEP] — так же, как токенайзер оформляет обычный текст
+            ids = special[:1] + ids + special[1:]
+            features.append({"input_ids": ids, "attention_mask": [1] * len(ids)})
+        with self._lock:
+            inputs = self.tokenizer.pad(features, return_tensors="pt")
+            return self._forward(inputs).cpu()
+
+    def _forward(self, inputs):
+        """Прогон модели и усреднение по токенам без учёта паддинга"""
+        inputs = {k: v.to(self.device) for k, v in inputs.items()}
+        with torch.no_grad():
+            if self._session is not None:
+                feed = {item.name: inputs[item.name].numpy() for item in self._session.get_inputs()}
+                hidden = torch.from_numpy(self._session.run(None, feed)[0])
+            else:
+                hidden = self.model(**inputs).last_hidden_state
+            mask = inputs["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+            embeddings = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+            return F.normalize(embeddings.float(), p=2, dim=1)
+
+    def _record(self, elapsed, texts):
+        self.calls += 1
+        self.texts += texts
+        self.total_time += elapsed
+        self.last_time = elapsed
+
+    def stats(self):
+        """Счётчики загрузки и задержек вызовов"""
+        with self._lock:
+            return {
+                "model_path": self.model_path,
+                "backend": self.backend,
+                "threads": self.threads,
+                "device": str(self.device),
+                "dtype": str(self.dtype) if self.dtype is not None else None,
+                "load_time": self.load_time,
+                "calls": self.calls,
+                "texts": self.texts,
+                "total_time": self.total_time,
+                "avg_time": self.total_time / self.calls if self.calls else 0.0,
+                "last_time": self.last_time,
+            }
+
+
+def _iter_text_blocks(text, block_chars=2000):
+    """Режет текст на блоки по строкам (длинные строки — по пробелам), не копируя его целиком"""
+    for line in text.splitlines(keepends=True):
+        while len(line) > block_chars:
+            cut = line.rfind(" ", 0, block_chars)
+            if cut <= 0:
+                cut = block_chars
+            yield line[:cut]
+            line = line[cut:]
+        if line.strip():
+            yield line
+
+
+def _pool_chunks(chunk_embs, pooling, temperature=0.05):
+    """Сводит эмбеддинги окон (K, dim) в один нормализованный вектор (1, dim)"""
+    if pooling == "mean":
+        pooled = chunk_embs.mean(dim=0, keepdim=True)
+    elif pooling == "max":
+        pooled = chunk_embs.max(dim=0, keepdim=True).values
+    else:
+        # Окна, близкие к общему смыслу документа, получают больший вес
+        query = F.normalize(chunk_embs.mean(dim=0, keepdim=True), p=2, dim=1)
+        weights = torch.softmax(torch.mm(chunk_embs, query.T) / temperature, dim=0)
+        pooled = (weights * chunk_embs).sum(dim=0, keepdim=True)
+    return F.normalize(pooled, p=2, dim=1)
+
+
+class _HiddenStates(torch.nn.Module):
+    """Обёртка для экспорта: позиционные входы токенайзера -> last_hidden_state"""
+
+    def __init__(self, model, input_names):
+        super().__init__()
+        self.model = model
+        self.input_names = input_names
+
+    def forward(self, *inputs):
+        return self.model(**dict(zip(self.input_names, inputs))).last_hidden_state
+
+
+def _onnx_session(model, tokenizer, model_path, threads=None, onnx_dir=ONNX_DIR):
+    """Сессия onnxruntime; модель экспортируется в ONNX один раз и пересоздаётся при изменении model/"""
+    try:
+        import onnxruntime
+    except ImportError as e:
+        raise RuntimeError(f"Бэкенд onnx требует пакет onnxruntime: {e}")
+
+    folder = hashlib.sha256(f"{model_path}|{model_fingerprint(model_path)}".encode("utf-8")).hexdigest()[:12]
+    path = Path(onnx_dir) / folder / "model.onnx"
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids")
+                       if name in tokenizer.model_input_names]
+        # Пример с паддингом, чтобы граф не зависел от формы конкретного входа
+        sample = tokenizer(["пример текста", "второй, более длинный пример текста"], padding=True,
+                           return_tensors="pt")
+        options = {}
+        if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+            options["dynamo"] = False  # в новых версиях PyTorch экспортёр по умолчанию другой
+        print(f"🔄 Экспорт модели эмбеддингов в ONNX: {path}")
+        # Экспорт во временный файл: прерванный экспорт или параллельный процесс
+        # не оставят на месте model.onnx недописанный граф
+        tmp_path = path.with_name(f"model.{os.getpid()}.onnx.tmp")
+        try:
+            torch.onnx.export(
+                _HiddenStates(model, input_names), tuple(sample[name] for name in input_names), str(tmp_path),
+                input_names=input_names, output_names=["last_hidden_state"],
+                dynamic_axes={name: {0: "batch", 1: "tokens"} for name in input_names + ["last_hidden_state"]},
+                opset_version=ONNX_OPSET, **options)
+            os.replace(tmp_path, path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+    session_options = onnxruntime.SessionOptions()
+    session_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if threads:
+        session_options.intra_op_num_threads = threads
+    return onnxruntime.InferenceSession(str(path), session_options, providers=["CPUExecutionProvider"])
+
+
+def check_parity(model_path, texts, backend, tolerance=0.5, threads=EMBEDDING_THREADS):
+    """Сверяет бэкенд с fp32 PyTorch: схожести всех пар текстов (в %) не должны расходиться больше tolerance.
+
+    Возвращает (прошла ли проверка, максимальное расхождение в процентных пунктах).
+    """
+    reference = get_embedding_service(model_path, device="cpu", backend="torch").embed_many(texts)
+    candidate = get_embedding_service(model_path, backend=backend, threads=threads).embed_many(texts)
+    deviation = float(((candidate @ candidate.T - reference @ reference.T) * 100).abs().max())
+    return deviation <= tolerance, deviation
+
+
+# Реестр загруженных моделей: (путь, устройство, dtype, бэкенд, потоки) -> EmbeddingService
+_services = {}
+_services_lock = threading.Lock()
+
+
+def get_embedding_service(model_path, device=None, dtype=None, backend=EMBEDDING_BACKEND, threads=EMBEDDING_THREADS):
+    """Возвращает сервис эмбеддингов, загружая модель только при первом обращении"""
+    device = _resolve_device(device) if backend == "torch" else torch.device("cpu")
+    key = (str(model_path), str(device), str(dtype), backend, threads)
+    with _services_lock:
+        service = _services.get(key)
+        if service is None:
+            service = EmbeddingService(model_path, device=device, dtype=dtype, backend=backend, threads=threads)
+            _services[key] = service
+    return service
+
+
+def embedding_stats():
+    """Статистика по всем загруженным моделям"""
+    with _services_lock:
+        services = list(_services.values())
+    return [service.stats() for service in services]
+
+
+def rank_candidates(resume_embs, job_embs, top_k=10):
+    """Скоринг N резюме против M вакансий одним умножением матриц.
+
+    Возвращает для каждой вакансии список (индекс резюме, схожесть в %) по убыванию схожести.
+    """
+    scores = torch.mm(job_embs, resume_embs.T) * 100  # (M, N)
+    k = min(top_k, scores.shape[1])
+    if k == 0:
+        return [[] for _ in range(scores.shape[0])]
+    values, indices = torch.topk(scores, k, dim=1)
+    return [list(zip(idx.tolist(), val.tolist())) for idx, val in zip(indices, values)]
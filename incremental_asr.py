@@ -0,0 +1,138 @@
+import threading
+import time
+import numpy as np
+from audio_recording import SAMPLE_RATE, load_audio
+from audio_text import WHISPER_WINDOW_SAMPLES, get_transcription_engine
+from metrics import metrics, current_interview
+
+# Как часто (в секундах новой речи) пересчитывать промежуточную гипотезу
+PARTIAL_STEP = 1.0
+
+
+def _common_prefix(words, other):
+    size = 0
+    for a, b in zip(words, other):
+        if a != b:
+            break
+        size += 1
+    return words[:size]
+
+
+class IncrementalTranscriber:
+    """Распознавание ответа, пока кандидат говорит.
+
+    Принимает куски записи через feed (совместим с on_chunk у StreamingRecorder),
+    периодически декодирует накопленный звук и фиксирует начало текста, совпавшее
+    в двух гипотезах подряд — это живые подсказки для UI (on_partial). Итоговый текст
+    после конца речи — обычное распознавание transcribe() всей записи без подсказки,
+    то же, что для файла: ошибки промежуточных гипотез в него не попадают.
+
+    Задержка от последнего кадра речи (включая паузу, которую ждёт детектор конца речи)
+    до текста пишется в metrics как asr_final_latency_seconds.
+    """
+
+    def __init__(self, engine=None, step=PARTIAL_STEP, on_partial=None):
+        self.engine = engine or get_transcription_engine()
+        self.step_samples = int(step * SAMPLE_RATE)
+        self.on_partial = on_partial
+
+        self._chunks = []
+        self._samples = 0
+        self._decoded_samples = 0
+        self._previous_words = None
+        self.stable_text = ""
+        self.partial_text = ""
+        self.text = None
+        self.latency = None
+        # Поток распознавания не наследует контекст вызывающего — интервью запоминается здесь
+        self._interview = current_interview()
+
+        self._lock = threading.Lock()
+        self._new_audio = threading.Event()
+        self._final = threading.Event()
+        self._done = threading.Event()
+        self._speech_end = None
+        self._thread = threading.Thread(target=self._run, name="incremental-asr", daemon=True)
+        self._thread.start()
+
+    def feed(self, chunk, is_final=False, trailing_silence=0.0):
+        """Добавляет кусок записи (int16 или float32 16 кГц).
+
+        trailing_silence — сколько секунд тишины в конце записи уже прошло после речи.
+        """
+        if chunk.dtype == np.int16:
+            chunk = chunk.astype(np.float32) / 32768.0
+        with self._lock:
+            self._chunks.append(chunk)
+            self._samples += len(chunk)
+        if is_final:
+            self._speech_end = time.perf_counter() - trailing_silence
+            self._final.set()
+        self._new_audio.set()
+
+    def finish(self):
+        """Отмечает конец записи, если последний кусок так и не пришёл (например, при ошибке)"""
+        if not self._final.is_set():
+            self.feed(np.zeros(0, dtype=np.float32), is_final=True)
+
+    def result(self, timeout=None):
+        """Итоговый текст (ждёт окончания распознавания)"""
+        self._done.wait(timeout)
+        return self.text
+
+    def _audio(self):
+        with self._lock:
+            self._chunks = [np.concatenate(self._chunks)] if self._chunks else [np.zeros(0, np.float32)]
+            return self._chunks[0]
+
+    def _run(self):
+        try:
+            while not self._final.is_set():
+                self._new_audio.wait()
+                self._new_audio.clear()
+                with self._lock:
+                    ready = self._samples - self._decoded_samples >= self.step_samples
+                    # Гипотезы строим, пока запись помещается в одно окно Whisper
+                    ready = ready and self._samples <= WHISPER_WINDOW_SAMPLES
+                if ready and not self._final.is_set():
+                    self._update_partial()
+            self._finish()
+        except Exception as e:
+            print(f"❌ Ошибка распознавания Whisper: {e}")
+            self.text = "Ошибка распознавания речи"
+            self._done.set()
+
+    def _update_partial(self):
+        audio = self._audio()
+        self._decoded_samples = len(audio)
+        tail = self.engine.decode_window(audio, prefix=self.stable_text)
+        words = f"{self.stable_text} {tail}".split()
+
+        if self._previous_words is not None:
+            # Последнее слово могло оборваться на границе записи — его не фиксируем
+            stable = _common_prefix(words, self._previous_words)[:-1]
+            if len(stable) > len(self.stable_text.split()):
+                self.stable_text = " ".join(stable)
+        self._previous_words = words
+        self.partial_text = " ".join(words)
+        if self.on_partial:
+            self.on_partial(self.partial_text, self.stable_text)
+
+    def _finish(self):
+        audio = self._audio()
+        self.text = self.engine.transcribe(audio).strip()
+
+        self.latency = time.perf_counter() - self._speech_end
+        metrics.record_span("asr_final_latency", self.latency, interview=self._interview)
+        print(f"✅ Распознано через {self.latency:.2f} с после конца речи: {self.text}")
+        self._done.set()
+
+
+def record_and_transcribe(duration=25, folder="audio/answers", on_partial=None):
+    """Записывает ответ и распознаёт его по ходу речи. Возвращает (файл записи, текст)"""
+    transcriber = IncrementalTranscriber(on_partial=on_partial)
+    audio_file = load_audio(duration=duration, folder=folder, on_chunk=transcriber.feed)
+    transcriber.finish()
+    text = transcriber.result()
+    return audio_file, text
+
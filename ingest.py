@@ -0,0 +1,192 @@
+import argparse
+import hashlib
+import itertools
+import json
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from document_processor import DocumentReader, default_model_path, get_embeddings
+
+SUPPORTED_SUFFIXES = {".pdf", ".docx", ".rtf", ".txt", ".csv", ".json"}
+# Файлы, которые при split_records делятся на отдельные резюме
+RECORD_SUFFIXES = {".csv", ".json"}
+OUTPUT_PATH = "data/ingested/resumes.parquet"
+# Сколько резюме за раз проходит дедупликацию, эмбеддинги и запись
+INGEST_BATCH = 1024
+
+
+def _supported_files(folder):
+    return sorted(p for p in folder.rglob("*") if p.is_file() and p.suffix.lower() in SUPPORTED_SUFFIXES)
+
+
+@contextmanager
+def collect_files(source):
+    """Папка и список файлов резюме из неё или из zip-архива (архив распаковывается во временную папку)"""
+    source = Path(source)
+    if source.is_dir():
+        yield source, _supported_files(source)
+    elif zipfile.is_zipfile(source):
+        with tempfile.TemporaryDirectory() as tmp_dir, zipfile.ZipFile(source) as archive:
+            archive.extractall(tmp_dir)
+            yield Path(tmp_dir), _supported_files(Path(tmp_dir))
+    else:
+        raise ValueError(f"Ожидается папка или zip-архив: {source}")
+
+
+def _extract(path):
+    """Текст одного файла целиком — выполняется в пуле процессов"""
+    start = time.perf_counter()
+    try:
+        text = DocumentReader(path).extract_text()
+        error = None if text.strip() else "Пустой текст"
+    except Exception as e:
+        text, error = "", str(e)
+    return text, error, time.perf_counter() - start
+
+
+def _iter_documents(root, files, split_records, workers, report):
+    """(источник, текст) каждого резюме.
+
+    Файлы целиком разбираются в пуле процессов; при split_records записи CSV и JSON
+    читаются потоком, и большой файл не загружается в память целиком.
+    """
+    record_files = [p for p in files if split_records and p.suffix.lower() in RECORD_SUFFIXES]
+    whole_files = [p for p in files if not (split_records and p.suffix.lower() in RECORD_SUFFIXES)]
+    timings = report["timings"]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        extracted = executor.map(_extract, [str(p) for p in whole_files], chunksize=8)
+        for path, (text, error, elapsed) in zip(whole_files, extracted):
+            name = str(path.relative_to(root))
+            timings["extract_per_file_max"] = max(timings["extract_per_file_max"], elapsed)
+            if error:
+                report["failed"].append({"file": name, "error": error})
+                continue
+            yield name, text
+
+    for path in record_files:
+        name = str(path.relative_to(root))
+        count = 0
+        try:
+            for record_number, text in enumerate(DocumentReader(path).iter_records(), 1):
+                if text.strip():
+                    count += 1
+                    yield f"{name}#{record_number}", text
+        except Exception as e:
+            report["failed"].append({"file": name, "error": str(e)})
+            continue
+        if not count:
+            report["failed"].append({"file": name, "error": "Пустой текст"})
+
+
+def ingest(source, output=OUTPUT_PATH, model_path=None, workers=None, batch_size=32, add_to_index=False,
+           split_records=False):
+    """Загружает пачку резюме: текст -> дедупликация -> эмбеддинги -> Parquet.
+
+    split_records: каждая строка CSV и каждый элемент JSON-массива — отдельное резюме.
+    Резюме проходят эмбеддинги и запись порциями по INGEST_BATCH, поэтому память
+    не растёт с размером пачки (в ней остаются только хэши для дедупликации).
+
+    Возвращает отчёт с временем этапов и списком файлов, которые не удалось обработать.
+    """
+    model_path = model_path or default_model_path()
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    timings = dict.fromkeys(("extract", "extract_per_file_max", "dedup", "embed", "write"), 0.0)
+    report = {"source": str(source), "output": str(output), "timings": timings, "failed": []}
+    total_start = time.perf_counter()
+
+    seen = set()
+    texts_total = 0
+    writer = None
+    index = None
+    with collect_files(source) as (root, files):
+        report["files"] = len(files)
+        documents = _iter_documents(root, files, split_records, workers, report)
+        while True:
+            # 1. Извлечение текста (параллельно для файлов, потоком для записей)
+            start = time.perf_counter()
+            chunk = list(itertools.islice(documents, INGEST_BATCH))
+            timings["extract"] += time.perf_counter() - start
+            if not chunk:
+                break
+
+            # 2. Дедупликация по хэшу содержимого
+            start = time.perf_counter()
+            rows = []
+            for name, text in chunk:
+                texts_total += 1
+                candidate_id = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+                if candidate_id not in seen:
+                    seen.add(candidate_id)
+                    rows.append({"candidate_id": candidate_id, "source": name, "text": text})
+            timings["dedup"] += time.perf_counter() - start
+            if not rows:
+                continue
+
+            # 3. Эмбеддинги батчами
+            start = time.perf_counter()
+            # Те же окна и пулинг, что в интерфейсе и скрининге: векторы в общем индексе сопоставимы
+            embeddings = get_embeddings([row["text"] for row in rows], model_path, batch_size=batch_size,
+                                        chunked=True).numpy()
+            timings["embed"] += time.perf_counter() - start
+
+            # 4. Колоночное хранилище, дописывается по порциям
+            start = time.perf_counter()
+            df = pd.DataFrame(rows)
+            df["embedding"] = list(embeddings)
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(output, table.schema)
+            writer.write_table(table)
+            timings["write"] += time.perf_counter() - start
+
+            if add_to_index:
+                from vector_index import get_resume_index
+                start = time.perf_counter()
+                index = get_resume_index(embeddings.shape[1])
+                index.add_many([row["candidate_id"] for row in rows], embeddings,
+                               [{"file": row["source"]} for row in rows])
+                timings["index"] = timings.get("index", 0.0) + time.perf_counter() - start
+
+    if writer is not None:
+        writer.close()
+    else:
+        pd.DataFrame(columns=["candidate_id", "source", "text", "embedding"]).to_parquet(output, index=False)
+    if index is not None:
+        start = time.perf_counter()
+        index.save()
+        timings["index"] += time.perf_counter() - start
+
+    report["documents"] = len(seen)
+    report["duplicates"] = texts_total - len(seen)
+    timings["total"] = time.perf_counter() - total_start
+    report_path = output.with_suffix(".report.json")
+    report_path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    print(f"✅ Загружено резюме: {report['documents']} (дубликатов: {report['duplicates']}, "
+          f"ошибок: {len(report['failed'])}) за {timings['total']:.1f} с")
+    print(f"💾 Результаты: {output}, отчёт: {report_path}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Массовая загрузка резюме из папки или zip-архива")
+    parser.add_argument("source", help="Папка или zip-архив с резюме")
+    parser.add_argument("--output", default=OUTPUT_PATH, help="Parquet-файл с результатами")
+    parser.add_argument("--model", default=None, help="Путь к модели эмбеддингов")
+    parser.add_argument("--workers", type=int, default=None, help="Число процессов для извлечения текста")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--index", action="store_true", help="Добавить резюме в индекс пула кандидатов")
+    parser.add_argument("--split-records", action="store_true",
+                        help="Каждая строка CSV / элемент JSON-массива — отдельное резюме")
+    args = parser.parse_args()
+
+    ingest(args.source, output=args.output, model_path=args.model, workers=args.workers,
+           batch_size=args.batch_size, add_to_index=args.index, split_records=args.split_records)
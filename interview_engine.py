@@ -0,0 +1,330 @@
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import time
+from app_new_2 import InterviewBot
+from audio_text import presynthesize, get_audio_player
+from audio_recording import load_audio
+from transcription_queue import get_transcription_queue
+from llm_client import AsyncLLMClient, LLM_API_BASE
+from metrics import interview_context
+
+MAX_SESSIONS = 500
+LLM_CONCURRENCY = 64
+# Сколько ждать ответ кандидата, присланный из UI (в режиме без локального микрофона)
+ANSWER_TIMEOUT = 180
+SESSIONS_AUDIO_DIR = "audio/sessions"
+# Сколько завершённая сессия хранится в памяти, если UI не забрал её (вкладку закрыли)
+SESSION_TTL = 3600
+
+EARLY_STOP_NOTE = "⚠️ Кандидат досрочно завершил интервью. Он сам закончил собеседование."
+NO_ANSWER = "Кандидат не ответил"
+
+# Состояния сессии: вопрос → озвучка → запись → распознавание → ... → отчёты
+CREATED = "created"
+ASKING = "asking"
+SPEAKING = "speaking"
+RECORDING = "recording"
+TRANSCRIBING = "transcribing"
+REPORTING = "reporting"
+FINISHED = "finished"
+FAILED = "failed"
+
+
+class InterviewSession:
+    """Одно интервью: бот, текущее состояние и то, что показывает UI"""
+
+    def __init__(self, session_id, bot, local_audio=False):
+        self.id = session_id
+        self.bot = bot
+        # True — вопрос звучит из колонок сервера и ответ пишется с его микрофона (одно рабочее место);
+        # False — UI сам проигрывает audio_files и присылает ответ через submit_answer
+        self.local_audio = local_audio
+        self.state = CREATED
+        self.question_text = ""  # текущий вопрос, дополняется по предложениям
+        self.audio_files = []  # озвучка текущего вопроса по предложениям
+        self.terminated = False
+        self.error = None
+        self.started_at = time.time()
+        self.finished_at = None
+        self.task = None
+        self.answers = None  # asyncio.Queue ответов из UI, создаётся в цикле движка
+
+    def snapshot(self):
+        """Копия состояния для UI (вызывается из других потоков)"""
+        bot = self.bot
+        return {
+            "session_id": self.id,
+            "state": self.state,
+            "question_number": bot.current_question_number,
+            "num_questions": bot.num_questions,
+            "question_text": self.question_text,
+            "audio_files": list(self.audio_files),
+            "questions": list(bot.questions),
+            "answers": list(bot.answers),
+            "terminated": self.terminated,
+            "overall_feedback": bot.overall_feedback,
+            "final_assessment": bot.final_assessment,
+            "error": self.error,
+            "timings": bot.timings(),
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class InterviewEngine:
+    """Асинхронный движок интервью: много одновременных сессий в одном процессе.
+
+    Цикл asyncio работает в отдельном потоке и не зависит от перезапусков скрипта Streamlit.
+    Методы вызываются синхронно из любого потока, UI опрашивает status().
+    """
+
+    def __init__(self, max_sessions=MAX_SESSIONS, llm_concurrency=LLM_CONCURRENCY):
+        self.max_sessions = max_sessions
+        self.llm_concurrency = llm_concurrency
+        self.sessions = {}
+        self._clients = {}  # (api_key, api_base) -> AsyncLLMClient
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="interview-engine", daemon=True)
+        self._thread.start()
+
+    def start_session(self, api_key, job_description, resume, num_questions, local_audio=False,
+                      api_base=LLM_API_BASE):
+        """Запускает интервью в фоне и возвращает id сессии"""
+        self._check_capacity()
+        bot = InterviewBot(api_key, job_description, resume, num_questions, api_base=api_base)
+        return self._add_session(bot, local_audio)
+
+    def resume_session(self, interview_id, api_key, local_audio=False, api_base=LLM_API_BASE):
+        """Продолжает интервью, прерванное падением процесса, с первого вопроса без ответа"""
+        if interview_id in self.sessions:
+            return interview_id
+        self._check_capacity()
+        bot = InterviewBot.from_store(api_key, interview_id, api_base=api_base)
+        return self._add_session(bot, local_audio)
+
+    def _check_capacity(self):
+        active = sum(1 for session in self.sessions.values() if session.state not in (FINISHED, FAILED))
+        if active >= self.max_sessions:
+            raise RuntimeError(f"Достигнут лимит одновременных интервью: {self.max_sessions}")
+
+    def _add_session(self, bot, local_audio):
+        self._evict_finished()
+        session = InterviewSession(bot.interview_id, bot, local_audio=local_audio)
+        self.sessions[session.id] = session
+        asyncio.run_coroutine_threadsafe(self._start(session), self._loop).result()
+        return session.id
+
+    def submit_answer(self, session_id, audio_file=None, text=None):
+        """Ответ кандидата на текущий вопрос: запись (распознаётся Whisper) или готовый текст.
+
+        Возвращает False, если сессия сейчас не ждёт ответа.
+        """
+        session = self.sessions.get(session_id)
+        if session is None or session.local_audio or session.state != RECORDING:
+            return False
+        self._loop.call_soon_threadsafe(session.answers.put_nowait, (audio_file, text))
+        return True
+
+    def stop_session(self, session_id):
+        """Досрочное завершение: интервью прерывается, отчёты формируются по уже данным ответам"""
+        session = self.sessions.get(session_id)
+        if session is not None:
+            self._loop.call_soon_threadsafe(self._stop, session)
+
+    def status(self, session_id):
+        session = self.sessions.get(session_id)
+        return session.snapshot() if session is not None else None
+
+    def list_sessions(self):
+        return [session.snapshot() for session in list(self.sessions.values())]
+
+    def wait(self, session_id, timeout=None):
+        """Ждёт окончания интервью и возвращает его состояние"""
+        session = self.sessions[session_id]
+        asyncio.run_coroutine_threadsafe(asyncio.wait({session.task}, timeout=timeout), self._loop).result()
+        return session.snapshot()
+
+    def remove_session(self, session_id):
+        """Забывает завершённую сессию (интервью уже записано в хранилище)"""
+        session = self.sessions.get(session_id)
+        if session is not None and session.state in (FINISHED, FAILED):
+            del self.sessions[session_id]
+
+    def _evict_finished(self, ttl=SESSION_TTL):
+        """Забывает сессии, завершённые больше ttl секунд назад"""
+        deadline = time.time() - ttl
+        for session_id, session in list(self.sessions.items()):
+            if session.finished_at is not None and session.finished_at < deadline:
+                self.remove_session(session_id)
+
+    def shutdown(self):
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    # --- Всё ниже выполняется в цикле движка ---
+
+    async def _start(self, session):
+        session.answers = asyncio.Queue()
+        session.task = asyncio.create_task(self._run(session))
+
+    def _stop(self, session):
+        if session.state in (REPORTING, FINISHED, FAILED) or session.terminated:
+            return
+        session.terminated = True
+        session.task.cancel()
+
+    async def _shutdown(self):
+        tasks = [session.task for session in self.sessions.values() if session.task and not session.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for client in self._clients.values():
+            await client.close()
+
+    def _client(self, bot):
+        key = (bot.api_key, bot.api_base)
+        client = self._clients.get(key)
+        if client is None:
+            client = AsyncLLMClient(bot.api_key, api_base=bot.api_base, max_concurrency=self.llm_concurrency)
+            self._clients[key] = client
+        return client
+
+    async def _run(self, session):
+        with interview_context(session.id):
+            await self._run_session(session)
+
+    async def _run_session(self, session):
+        bot = session.bot
+        client = self._client(bot)
+        try:
+            # Запись в SQLite и файлы — в пуле потоков: медленный fsync не должен останавливать цикл,
+            # общий для всех интервью
+            await _run_in_thread(bot.start_record)
+            try:
+                await bot.abuild_profile(client)
+                # Продолженное интервью начинается после последнего вопроса с ответом
+                for number in range(bot.next_question_number, bot.num_questions + 1):
+                    bot.current_question_number = number
+                    previous_answer = bot.answers[-1] if bot.answers else None
+                    question = await self._ask(session, client, previous_answer)
+                    if not question:
+                        break
+                    await _run_in_thread(bot.record_question, question)
+                    answer = await self._answer(session)
+                    await _run_in_thread(bot.record_answer, answer)
+            except asyncio.CancelledError:
+                if not session.terminated:
+                    raise
+
+            session.state = REPORTING
+            if len(bot.answers) < len(bot.questions):
+                await _run_in_thread(bot.record_answer, NO_ANSWER)  # остановлено во время ответа
+            bot.terminated = session.terminated
+            note = EARLY_STOP_NOTE if session.terminated else ""
+            bot.set_reports(*await bot.agenerate_reports(note, client=client))
+            await _run_in_thread(bot.save_interview)
+            session.state = FINISHED
+        except asyncio.CancelledError:
+            # В хранилище интервью остаётся активным — его можно продолжить (resume_session)
+            session.state = FAILED
+            session.error = "Интервью отменено"
+        except Exception as e:
+            print(f"❌ Ошибка интервью {session.id}: {e}")
+            session.state = FAILED
+            session.error = str(e)
+            await _run_in_thread(bot.mark_failed, e)
+        finally:
+            session.finished_at = time.time()
+
+    async def _ask(self, session, client, previous_answer):
+        """Генерирует вопрос; каждое готовое предложение сразу уходит на синтез и озвучку"""
+        session.state = ASKING
+        session.question_text = ""
+        session.audio_files = []
+        speech = asyncio.Queue()
+        speaker = asyncio.create_task(self._speak(session, speech))
+
+        def on_sentence(sentence):
+            session.question_text = f"{session.question_text} {sentence}".strip()
+            # Синтез общий для всех сессий, поэтому отмена одной сессии его не прерывает
+            speech.put_nowait(asyncio.shield(asyncio.wrap_future(presynthesize(sentence))))
+
+        try:
+            question = await session.bot.astream_question(client, previous_answer, on_sentence=on_sentence)
+            session.state = SPEAKING
+            speech.put_nowait(None)
+            await speaker
+        finally:
+            speaker.cancel()
+        return question
+
+    async def _speak(self, session, speech):
+        folder = os.path.join(SESSIONS_AUDIO_DIR, session.id)
+        await _run_in_thread(functools.partial(os.makedirs, folder, exist_ok=True))
+        part = 0
+        while True:
+            synthesis = await speech.get()
+            if synthesis is None:
+                return
+            audio = await synthesis
+            if audio is None:
+                continue
+            part += 1
+            filename = os.path.join(folder, f"question_{session.bot.current_question_number}_{part}.ogg")
+            await _run_in_thread(_write_file, filename, audio)
+            session.audio_files.append(filename)
+            if session.local_audio:
+                try:
+                    done = get_audio_player().play(audio)
+                    await _run_in_thread(done.wait)
+                except Exception as e:
+                    print(f"⚠️ Ошибка воспроизведения: {e}")
+
+    async def _answer(self, session):
+        """Запись ответа (локально или из UI) и его распознавание"""
+        session.state = RECORDING
+        if session.local_audio:
+            try:
+                audio_file = await _run_in_thread(load_audio)
+            except Exception as e:
+                print(f"⚠️ Ошибка записи аудио: {e}")
+                return "Не удалось распознать ответ"
+            text = None
+        else:
+            try:
+                audio_file, text = await asyncio.wait_for(session.answers.get(), ANSWER_TIMEOUT)
+            except asyncio.TimeoutError:
+                return NO_ANSWER
+
+        if text is not None:
+            return text
+        session.state = TRANSCRIBING
+        return await asyncio.wrap_future(get_transcription_queue().submit(audio_file))
+
+
+def _write_file(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+async def _run_in_thread(func, *args):
+    """Блокирующий вызов в пуле потоков; замеры внутри попадают в трассу текущего интервью"""
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(None, functools.partial(context.run, func, *args))
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_interview_engine():
+    """Общий движок интервью процесса (создаётся при первом обращении)"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = InterviewEngine()
+    return _engine
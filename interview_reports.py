@@ -0,0 +1,78 @@
+import json
+import os
+import sys
+from interview_store import get_interview_store
+
+REPORTS_DIR = "reports/sessions"
+
+
+def render_candidate_feedback(record):
+    """TXT для кандидата"""
+    return f"=== ФИДБЕК ДЛЯ КАНДИДАТА ===\n\n{record['overall_feedback'] or ''}"
+
+
+def render_hr_assessment(record):
+    """TXT для HR: вакансия, вопросы и ответы, итоговая оценка"""
+    lines = ["=== ОЦЕНКА ДЛЯ HR ===\n\n",
+             f"ВАКАНСИЯ: {record['job_description']}\n",
+             f"КАНДИДАТ: {record['resume'][:200]}...\n\n",
+             "=== ВОПРОСЫ И ОТВЕТЫ ===\n"]
+    for i, (question, answer) in enumerate(zip(record["questions"], record["answers"]), 1):
+        lines.append(f"\n🔹 ВОПРОС {i}:\n{question}\n")
+        lines.append(f"💬 ОТВЕТ:\n{answer}\n")
+        lines.append("-" * 50 + "\n")
+    lines.append("\n=== ИТОГОВАЯ ОЦЕНКА ===\n")
+    lines.append(record["final_assessment"] or "")
+    return "".join(lines)
+
+
+def render_json(record):
+    """JSON — общий архив"""
+    results = {
+        "interview_id": record["id"],
+        "status": record["status"],
+        "job_description": record["job_description"],
+        "resume": record["resume"],
+        "questions": record["questions"],
+        "answers": record["answers"],
+        "profile": record["profile"],
+        "timings": record["timings"],
+        "terminated": record["terminated"],
+        "overall_feedback": record["overall_feedback"],
+        "final_assessment": record["final_assessment"],
+    }
+    return json.dumps(results, ensure_ascii=False, indent=2)
+
+
+def export_interview(interview_id, folder=None, store=None):
+    """Строит отчёты интервью из хранилища и сохраняет их в папку (по умолчанию reports/sessions/<id>)"""
+    record = (store or get_interview_store()).load(interview_id)
+    if record is None:
+        raise KeyError(f"Интервью {interview_id} не найдено")
+
+    folder = folder or os.path.join(REPORTS_DIR, interview_id)
+    os.makedirs(folder, exist_ok=True)
+    files = {
+        "interview_results.json": render_json(record),
+        "candidate_feedback.txt": render_candidate_feedback(record),
+        "hr_assessment.txt": render_hr_assessment(record),
+    }
+    for name, content in files.items():
+        with open(os.path.join(folder, name), "w", encoding="utf-8") as f:
+            f.write(content)
+
+    print("\n💾 Результаты сохранены в файлы:")
+    print(f"   - {folder}/candidate_feedback.txt (фидбек для кандидата)")
+    print(f"   - {folder}/hr_assessment.txt (оценка для HR)")
+    print(f"   - {folder}/interview_results.json (архив)")
+    return folder
+
+
+if __name__ == "__main__":
+    # python interview_reports.py <id интервью> [папка] — отчёты по запросу;
+    # без аргументов — список последних интервью
+    if len(sys.argv) > 1:
+        export_interview(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
+    else:
+        for interview in get_interview_store().list_interviews(limit=20):
+            print(f"{interview['id']}  {interview['status']:<9} {interview['job_title'] or ''}")
@@ -0,0 +1,211 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+STORE_PATH = "reports/interviews.db"
+
+# Статусы интервью в хранилище
+ACTIVE = "active"
+FINISHED = "finished"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS interviews (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    job_title TEXT,
+    job_description TEXT NOT NULL,
+    resume TEXT NOT NULL,
+    num_questions INTEGER NOT NULL,
+    profile TEXT,
+    terminated INTEGER NOT NULL DEFAULT 0,
+    overall_feedback TEXT,
+    final_assessment TEXT,
+    timings TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS interviews_status ON interviews (status, created_at);
+CREATE INDEX IF NOT EXISTS interviews_created ON interviews (created_at);
+
+-- Журнал событий интервью: только дописывается, строки не изменяются
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    interview_id TEXT NOT NULL REFERENCES interviews (id),
+    kind TEXT NOT NULL,
+    number INTEGER,
+    text TEXT,
+    data TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_interview ON events (interview_id, seq);
+"""
+
+# Поля списка интервью — без текстов документов и отчётов
+SUMMARY_FIELDS = ("id", "status", "created_at", "updated_at", "job_title", "num_questions", "terminated")
+
+
+class InterviewStore:
+    """Хранилище интервью в SQLite (WAL): каждый вопрос и ответ записывается сразу.
+
+    Интервью, прерванное падением процесса, остаётся со статусом active и может быть
+    продолжено (load возвращает уже заданные вопросы и полученные ответы).
+    Отчёты строятся по хранилищу отдельно — см. interview_reports.py.
+    """
+
+    def __init__(self, path=STORE_PATH):
+        self.path = str(path)
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # Одно соединение на процесс: записи короткие, порядок задаёт блокировка
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            # В режиме WAL NORMAL не теряет согласованность при падении процесса
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    # --- Запись по ходу интервью ---
+
+    def start(self, interview_id, job_description, resume, num_questions, job_title=None):
+        """Регистрирует интервью (повторный вызов при продолжении снова делает его активным)"""
+        now = time.time()
+        self._execute(
+            "INSERT INTO interviews (id, status, created_at, updated_at, job_title, job_description, resume,"
+            " num_questions) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (id) DO UPDATE SET status = excluded.status, updated_at = excluded.updated_at,"
+            " error = NULL",
+            (interview_id, ACTIVE, now, now, job_title, job_description, resume, num_questions))
+        self.append(interview_id, "start")
+
+    def append(self, interview_id, kind, number=None, text=None, **data):
+        """Дописывает событие интервью (question, answer, ...) в журнал"""
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.execute(
+                    "INSERT INTO events (interview_id, kind, number, text, data, created_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (interview_id, kind, number, text,
+                     json.dumps(data, ensure_ascii=False) if data else None, now))
+                self._conn.execute("UPDATE interviews SET updated_at = ? WHERE id = ?", (now, interview_id))
+
+    def add_question(self, interview_id, number, question, **data):
+        self.append(interview_id, "question", number, question, **data)
+
+    def add_answer(self, interview_id, number, answer, **data):
+        self.append(interview_id, "answer", number, answer, **data)
+
+    def set_profile(self, interview_id, profile):
+        self._execute("UPDATE interviews SET profile = ?, updated_at = ? WHERE id = ?",
+                      (profile, time.time(), interview_id))
+
+    def finish(self, interview_id, overall_feedback, final_assessment, timings=None, terminated=False):
+        """Итог интервью: отчёты LLM и время по этапам"""
+        self._execute(
+            "UPDATE interviews SET status = ?, updated_at = ?, overall_feedback = ?, final_assessment = ?,"
+            " timings = ?, terminated = ? WHERE id = ?",
+            (FINISHED, time.time(), overall_feedback, final_assessment,
+             json.dumps(timings or {}, ensure_ascii=False), int(terminated), interview_id))
+        self.append(interview_id, "finish")
+
+    def fail(self, interview_id, error):
+        self._execute("UPDATE interviews SET status = ?, updated_at = ?, error = ? WHERE id = ?",
+                      (FAILED, time.time(), str(error), interview_id))
+        self.append(interview_id, "fail", text=str(error))
+
+    # --- Чтение ---
+
+    def load(self, interview_id):
+        """Интервью целиком: документы, пары вопрос-ответ, отчёты; None, если его нет.
+
+        Вопрос без ответа (процесс упал во время ответа) не попадает в пары — при
+        продолжении он будет задан заново. numbers — номера вопросов пар в том же порядке:
+        если ответ в середине не записался, номера идут с пропуском, и продолжение
+        начинается после наибольшего из них, не перезаписывая уже заданные вопросы.
+        """
+        rows = self._query("SELECT * FROM interviews WHERE id = ?", (interview_id,))
+        if not rows:
+            return None
+        record = dict(rows[0])
+        record["terminated"] = bool(record["terminated"])
+        record["timings"] = json.loads(record["timings"]) if record["timings"] else {}
+
+        questions, answers = {}, {}
+        for event in self._query("SELECT kind, number, text FROM events WHERE interview_id = ?"
+                                 " AND kind IN ('question', 'answer') ORDER BY seq", (interview_id,)):
+            # Переспрошенный вопрос записывается повторно — берём последний
+            target = questions if event["kind"] == "question" else answers
+            target[event["number"]] = event["text"]
+        numbers = sorted(number for number in questions if number in answers)
+        record["questions"] = [questions[number] for number in numbers]
+        record["answers"] = [answers[number] for number in numbers]
+        record["numbers"] = numbers
+        return record
+
+    def events(self, interview_id):
+        """Журнал событий интервью в порядке записи"""
+        events = []
+        for row in self._query("SELECT kind, number, text, data, created_at FROM events"
+                               " WHERE interview_id = ? ORDER BY seq", (interview_id,)):
+            event = dict(row)
+            event["data"] = json.loads(event["data"]) if event["data"] else {}
+            events.append(event)
+        return events
+
+    def list_interviews(self, status=None, since=None, limit=50, offset=0):
+        """Краткие записи интервью (новые первыми) без загрузки текстов"""
+        conditions, params = [], []
+        if status is not None:
+            conditions.append("status = ?")
+            params.append(status)
+        if since is not None:
+            conditions.append("created_at >= ?")
+            params.append(since)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self._query(f"SELECT {', '.join(SUMMARY_FIELDS)} FROM interviews{where}"
+                           f" ORDER BY created_at DESC LIMIT ? OFFSET ?", (*params, limit, offset))
+        return [dict(row) for row in rows]
+
+    def unfinished(self, limit=-1):
+        """Интервью, прерванные падением процесса (их можно продолжить), новые первыми"""
+        return self.list_interviews(status=ACTIVE, limit=limit)
+
+    def stats(self):
+        """Число интервью по статусам"""
+        return {row["status"]: row["count"]
+                for row in self._query("SELECT status, COUNT(*) AS count FROM interviews GROUP BY status")}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# Хранилища по пути к файлу базы
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_interview_store(path=STORE_PATH):
+    """Общее хранилище интервью процесса (открывается при первом обращении)"""
+    key = os.path.abspath(path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = InterviewStore(path)
+            _stores[key] = store
+    return store
@@ -0,0 +1,219 @@
+import functools
+import re
+import threading
+import numpy as np
+
+# Доля покрытия навыков вакансии в лексической оценке, остальное — TF-IDF-схожесть текстов
+SKILL_WEIGHT = 0.6
+
+# Слова, версии (node.js) и названия вроде c++ / c#; регистр и «ё» приводятся заранее
+TOKEN_PATTERN = re.compile(r"[a-zа-я0-9]+(?:\.[a-zа-я0-9]+)*[+#]*")
+CYRILLIC = re.compile(r"[а-я]")
+# Окончания для грубого стемминга русских слов, длинные проверяются первыми
+RU_ENDINGS = ("ами", "ями", "ого", "его", "ому", "ему", "ыми", "ими", "ых", "их", "ой", "ей", "ий", "ый",
+              "ая", "яя", "ое", "ее", "ов", "ев", "ам", "ям", "ах", "ях", "ом", "ем", "ью",
+              "ы", "и", "а", "я", "о", "е", "у", "ю", "ь")
+
+# Словарь навыков: каноническое название -> варианты написания
+DEFAULT_SKILLS = {
+    "python": ("python", "питон"),
+    "sql": ("sql",),
+    "postgresql": ("postgresql", "postgres", "постгрес"),
+    "mysql": ("mysql",),
+    "clickhouse": ("clickhouse",),
+    "mongodb": ("mongodb", "mongo"),
+    "redis": ("redis",),
+    "java": ("java",),
+    "javascript": ("javascript", "js"),
+    "typescript": ("typescript",),
+    "react": ("react", "react.js", "reactjs"),
+    "node.js": ("node.js", "nodejs"),
+    "go": ("golang", "go"),
+    "c++": ("c++",),
+    "c#": ("c#",),
+    "php": ("php",),
+    "kotlin": ("kotlin",),
+    "swift": ("swift",),
+    "1с": ("1с", "1c"),
+    "html": ("html", "html5"),
+    "css": ("css", "css3"),
+    "docker": ("docker",),
+    "kubernetes": ("kubernetes", "k8s"),
+    "linux": ("linux",),
+    "git": ("git", "github", "gitlab"),
+    "ci/cd": ("ci cd", "ci", "jenkins"),
+    "kafka": ("kafka",),
+    "rabbitmq": ("rabbitmq",),
+    "airflow": ("airflow",),
+    "spark": ("spark", "pyspark"),
+    "hadoop": ("hadoop",),
+    "pandas": ("pandas",),
+    "numpy": ("numpy",),
+    "scikit-learn": ("scikit learn", "sklearn"),
+    "pytorch": ("pytorch", "torch"),
+    "tensorflow": ("tensorflow", "keras"),
+    "машинное обучение": ("машинное обучение", "machine learning", "ml"),
+    "nlp": ("nlp", "обработка естественного языка"),
+    "компьютерное зрение": ("компьютерное зрение", "computer vision"),
+    "статистика": ("статистика", "statistics"),
+    "a/b-тесты": ("a b тест", "a b тестирование", "ab тест"),
+    "excel": ("excel", "эксель"),
+    "power bi": ("power bi", "powerbi"),
+    "tableau": ("tableau",),
+    "superset": ("superset",),
+    "rest api": ("rest api", "rest", "restful"),
+    "микросервисы": ("микросервисы", "микросервисная архитектура", "microservices"),
+    "тестирование": ("тестирование", "qa"),
+    "автотесты": ("автотесты", "автоматизированное тестирование", "selenium", "pytest"),
+    "jira": ("jira",),
+    "confluence": ("confluence",),
+    "figma": ("figma",),
+    "agile": ("agile", "scrum", "kanban"),
+    "управление проектами": ("управление проектами", "project management"),
+    "английский язык": ("английский язык", "английский", "english"),
+    "продажи": ("продажи", "sales"),
+    "переговоры": ("переговоры",),
+    "бухгалтерский учёт": ("бухгалтерский учет", "бухучет"),
+}
+
+
+# Словарь реальных текстов невелик, поэтому основа каждого слова вычисляется один раз
+@functools.lru_cache(maxsize=200000)
+def _stem(token):
+    if len(token) <= 4 or not CYRILLIC.match(token):
+        return token
+    for ending in RU_ENDINGS:
+        if token.endswith(ending) and len(token) - len(ending) >= 3:
+            return token[:-len(ending)]
+    return token
+
+
+def tokenize(text):
+    """Токены текста в нижнем регистре, русские слова без окончаний"""
+    return [_stem(token) for token in TOKEN_PATTERN.findall(text.lower().replace("ё", "е"))]
+
+
+class SkillMatcher:
+    """Поиск навыков словаря в тексте за один проход по токенам.
+
+    Варианты написания собраны в префиксное дерево по токенам (многословные навыки —
+    путь из нескольких узлов), поэтому стоимость не зависит от размера словаря.
+    """
+
+    def __init__(self, skills=None):
+        skills = skills or DEFAULT_SKILLS
+        self.skills = list(skills)
+        self.depth = 1  # самый длинный вариант написания в токенах
+        self._trie = {}
+        for column, (skill, aliases) in enumerate(skills.items()):
+            for alias in (skill, *aliases):
+                tokens = tokenize(alias)
+                node = self._trie
+                for token in tokens:
+                    node = node.setdefault(token, {})
+                node[None] = column  # конец варианта написания
+                self.depth = max(self.depth, len(tokens))
+
+    def find_columns(self, tokens):
+        """Номера навыков, найденных в последовательности токенов"""
+        found = set()
+        trie = self._trie
+        for start, token in enumerate(tokens):
+            node = trie.get(token)
+            if node is None:  # почти все токены — не начало навыка
+                continue
+            if None in node:
+                found.add(node[None])
+            for token in tokens[start + 1:start + self.depth]:
+                node = node.get(token)
+                if node is None:
+                    break
+                if None in node:
+                    found.add(node[None])
+        return found
+
+    def find(self, text):
+        return sorted(self.skills[column] for column in self.find_columns(tokenize(text)))
+
+    def matrix(self, token_lists):
+        """Разреженная бинарная матрица (документы × навыки)"""
+        from scipy import sparse
+
+        rows, columns = [], []
+        for row, tokens in enumerate(token_lists):
+            found = self.find_columns(tokens)
+            rows.extend([row] * len(found))
+            columns.extend(found)
+        return sparse.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, columns)),
+                                 shape=(len(token_lists), len(self.skills)))
+
+
+class LexicalScorer:
+    """Быстрая лексическая оценка резюме против вакансий без трансформера.
+
+    Для M вакансий и N резюме за один матричный проход считает:
+    skills — долю навыков вакансии, найденных в резюме; tfidf — косинус TF-IDF-векторов;
+    lexical — их взвешенную сумму (для вакансий без навыков из словаря — только tfidf).
+    Все оценки в диапазоне 0..1, матрицы (M, N).
+    """
+
+    def __init__(self, skills=None, skill_weight=SKILL_WEIGHT):
+        self.matcher = SkillMatcher(skills)
+        self.skill_weight = skill_weight
+
+    def score(self, vacancies, resumes):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        vacancy_tokens = [tokenize(text) for text in vacancies]
+        resume_tokens = [tokenize(text) for text in resumes]
+
+        # Навыки: совпавшие / требуемые
+        required = self.matcher.matrix(vacancy_tokens)
+        matched = (required @ self.matcher.matrix(resume_tokens).T).toarray()
+        required_count = np.asarray(required.sum(axis=1))
+        has_skills = required_count > 0
+        skills = np.divide(matched, required_count, out=np.zeros_like(matched), where=has_skills)
+
+        # TF-IDF по общему корпусу вакансий и резюме; строки нормированы, косинус — скалярное произведение
+        vectorizer = TfidfVectorizer(analyzer=lambda tokens: tokens, sublinear_tf=True, dtype=np.float32)
+        matrix = vectorizer.fit_transform(vacancy_tokens + resume_tokens)
+        tfidf = (matrix[:len(vacancies)] @ matrix[len(vacancies):].T).toarray()
+
+        lexical = np.where(has_skills, self.skill_weight * skills + (1 - self.skill_weight) * tfidf, tfidf)
+        return {"skills": skills, "tfidf": tfidf, "lexical": lexical}
+
+    def rank(self, vacancies, resumes, top_k=10):
+        """Как embeddings.rank_candidates: для каждой вакансии (индекс резюме, оценка в %) по убыванию"""
+        scores = self.score(vacancies, resumes)["lexical"] * 100
+        k = min(top_k, scores.shape[1])
+        ranking = []
+        for row in scores:
+            top = np.argpartition(-row, k - 1)[:k] if k else []
+            top = sorted(top, key=lambda i: -row[i])
+            ranking.append([(int(i), float(row[i])) for i in top])
+        return ranking
+
+    def explain(self, vacancy, resume):
+        """Навыки вакансии: найденные в резюме и отсутствующие"""
+        required = self.matcher.find(vacancy)
+        present = set(self.matcher.find(resume))
+        matched = [skill for skill in required if skill in present]
+        return {
+            "required": required,
+            "matched": matched,
+            "missing": [skill for skill in required if skill not in present],
+            "coverage": len(matched) / len(required) if required else None,
+        }
+
+
+_scorer = None
+_scorer_lock = threading.Lock()
+
+
+def get_lexical_scorer():
+    """Общий лексический скорер процесса со словарём навыков по умолчанию"""
+    global _scorer
+    with _scorer_lock:
+        if _scorer is None:
+            _scorer = LexicalScorer()
+    return _scorer
@@ -0,0 +1,107 @@
+import asyncio
+import json
+import random
+import aiohttp
+
+LLM_API_BASE = "https://api.deepseek.com/v1"
+LLM_MODEL = "deepseek-chat"
+LLM_TIMEOUT = 120
+LLM_MAX_RETRIES = 3
+LLM_MAX_CONCURRENCY = 8
+
+# Ошибки, после которых запрос имеет смысл повторить
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    pass
+
+
+class AsyncLLMClient:
+    """Асинхронный клиент chat completions (DeepSeek, OpenAI-совместимый API).
+
+    Держит пул соединений, ограничивает число одновременных запросов и повторяет
+    неудачные запросы с экспоненциальной задержкой. Используется как async-контекстный менеджер.
+    """
+
+    def __init__(self, api_key, api_base=LLM_API_BASE, model=LLM_MODEL, timeout=LLM_TIMEOUT,
+                 max_retries=LLM_MAX_RETRIES, backoff=0.5, max_concurrency=LLM_MAX_CONCURRENCY):
+        self.api_key = api_key
+        self.url = f"{api_base.rstrip('/')}/chat/completions"
+        self.model = model
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_concurrency = max_concurrency
+        self._session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        self._ensure_session()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def _ensure_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=self.timeout,
+                headers={"Authorization": f"Bearer {self.api_key}"})
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def chat(self, messages, **params):
+        """Текст ответа модели на список сообщений"""
+        data = await self._request({"model": self.model, "messages": messages, **params})
+        return data["choices"][0]["message"]["content"]
+
+    async def chat_json(self, messages, **params):
+        """Ответ модели в виде JSON-объекта"""
+        content = await self.chat(messages, response_format={"type": "json_object"}, **params)
+        return json.loads(content)
+
+    async def chat_stream(self, messages, **params):
+        """Текст ответа по частям, по мере генерации (без повторов: часть ответа уже могла быть выдана)"""
+        self._ensure_session()
+        payload = {"model": self.model, "messages": messages, "stream": True, **params}
+        async with self._semaphore:
+            async with self._session.post(self.url, json=payload) as response:
+                if response.status != 200:
+                    raise LLMError(f"{response.status}: {await response.text()}")
+                async for line in response.content:
+                    line = line.decode("utf-8").strip()
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        return
+                    delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+                    if delta:
+                        yield delta
+
+    async def _request(self, payload):
+        self._ensure_session()
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    async with self._session.post(self.url, json=payload) as response:
+                        if response.status == 200:
+                            return await response.json()
+                        text = await response.text()
+                        if response.status not in RETRY_STATUSES:
+                            raise LLMError(f"{response.status}: {text}")
+                        error = LLMError(f"{response.status}: {text}")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = e
+
+            if attempt == self.max_retries:
+                raise LLMError(f"Запрос к LLM не удался после {attempt + 1} попыток: {error}")
+            delay = self.backoff * 2 ** attempt * (1 + random.random())
+            print(f"⚠️ Ошибка LLM ({error}), повтор через {delay:.1f} с")
+            await asyncio.sleep(delay)
@@ -0,0 +1,213 @@
+import contextvars
+import json
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Границы корзин гистограмм длительностей, секунды
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Сколько последних интервью хранить с подробной трассой этапов
+MAX_TRACES = 1000
+METRICS_PREFIX = "hr_bot"
+
+# Интервью, к которому относятся замеры текущего потока / asyncio-задачи
+_current_interview = contextvars.ContextVar("current_interview", default=None)
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """Счётчики, гистограммы и трассы этапов по интервью. Потокобезопасен"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}  # (имя, метки) -> значение
+        self._histograms = {}  # (имя, метки) -> _Histogram
+        self._traces = OrderedDict()  # id интервью -> список спанов
+        self._log = None
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram()
+            histogram.observe(value)
+
+    def record_span(self, name, duration, interview=None, error=None, **labels):
+        """Учитывает завершённый этап: гистограмма длительности, счётчик ошибок, трасса интервью"""
+        interview = interview or _current_interview.get()
+        self.observe(f"{name}_seconds", duration, **labels)
+        if error is not None:
+            self.inc(f"{name}_errors_total", **labels)
+
+        record = {"ts": time.time(), "span": name, "duration": round(duration, 6), **labels}
+        if interview:
+            record["interview"] = interview
+        if error is not None:
+            record["error"] = error
+        with self._lock:
+            if interview:
+                trace = self._traces.get(interview)
+                if trace is None:
+                    trace = self._traces[interview] = []
+                    if len(self._traces) > MAX_TRACES:
+                        self._traces.popitem(last=False)
+                trace.append(record)
+            if self._log is not None:
+                self._log.write(json.dumps(record, ensure_ascii=False) + "\n")
+                self._log.flush()
+
+    @contextmanager
+    def span(self, name, interview=None, **labels):
+        """Замер этапа: with metrics.span("llm", kind="question"): ..."""
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            self.record_span(name, time.perf_counter() - start, interview, error=type(e).__name__, **labels)
+            raise
+        self.record_span(name, time.perf_counter() - start, interview, **labels)
+
+    def trace(self, interview):
+        """Все спаны интервью по порядку"""
+        with self._lock:
+            return list(self._traces.get(interview, []))
+
+    def trace_summary(self, interview):
+        """Сводка по этапам интервью: число вызовов, суммарное и максимальное время"""
+        summary = {}
+        for record in self.trace(interview):
+            name = record["span"] + (f".{record['kind']}" if "kind" in record else "")
+            stage = summary.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0, "errors": 0})
+            stage["count"] += 1
+            stage["total"] += record["duration"]
+            stage["max"] = max(stage["max"], record["duration"])
+            stage["errors"] += "error" in record
+        for stage in summary.values():
+            stage["total"] = round(stage["total"], 3)
+            stage["max"] = round(stage["max"], 3)
+        return summary
+
+    def enable_log(self, path):
+        """Дописывать каждый спан строкой JSON в файл path"""
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+            self._log = open(path, "a", encoding="utf-8")
+
+    def prometheus_text(self):
+        """Все метрики в текстовом формате Prometheus"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+            lines = []
+            seen = set()
+            for (name, labels), value in counters:
+                full_name = f"{METRICS_PREFIX}_{name}"
+                if full_name not in seen:
+                    lines.append(f"# TYPE {full_name} counter")
+                    seen.add(full_name)
+                lines.append(f"{full_name}{_format_labels(labels)} {value}")
+            for (name, labels), histogram in histograms:
+                full_name = f"{METRICS_PREFIX}_{name}"
+                if full_name not in seen:
+                    lines.append(f"# TYPE {full_name} histogram")
+                    seen.add(full_name)
+                cumulative = 0
+                for bound, count in zip(BUCKETS + ("+Inf",), histogram.counts):
+                    cumulative += count
+                    lines.append(f"{full_name}_bucket{_format_labels(labels + (('le', str(bound)),))} {cumulative}")
+                lines.append(f"{full_name}_sum{_format_labels(labels)} {histogram.sum:.6f}")
+                lines.append(f"{full_name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self._traces.clear()
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for _, value in labels)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + "}"
+
+
+metrics = Metrics()
+
+
+def span(name, interview=None, **labels):
+    return metrics.span(name, interview, **labels)
+
+
+def timed(name, **labels):
+    """Декоратор: каждый вызов функции — спан name"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with metrics.span(name, **labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def interview_context(interview):
+    """Замеры внутри блока (в этом потоке / asyncio-задаче) относятся к интервью interview"""
+    token = _current_interview.set(interview)
+    try:
+        yield
+    finally:
+        _current_interview.reset(token)
+
+
+def current_interview():
+    return _current_interview.get()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = metrics.prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_metrics_server(port=9108, host="127.0.0.1"):
+    """HTTP-эндпоинт /metrics для Prometheus в фоновом потоке"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    print(f"📈 Метрики Prometheus: http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,201 @@
+import argparse
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
+from document_processor import DocumentReader, default_model_path, get_embeddings, MATCH_THRESHOLD
+from lexical_scoring import get_lexical_scorer
+from metrics import metrics, span
+
+# Доля подходящих резюме, которую первый этап должен пропустить дальше
+TARGET_RECALL = 0.95
+# Сколько резюме пачки проверяется обеими ступенями для подбора порога первой:
+# доля пачки, но не меньше MIN_CALIBRATION_SIZE и не больше CALIBRATION_SIZE
+CALIBRATION_SHARE = 0.1
+MIN_CALIBRATION_SIZE = 50
+CALIBRATION_SIZE = 500
+# Меньше подходящих в калибровочной выборке — порог по ним ненадёжен
+MIN_CALIBRATION_POSITIVES = 5
+# Порог без калибровки (лексическая оценка в %): почти нет общих слов и навыков с вакансией.
+# Используется и для пачек не больше MIN_CALIBRATION_SIZE — их калибровка съела бы всю экономию
+FALLBACK_LEXICAL_THRESHOLD = 2.0
+OUTPUT_PATH = "reports/screening.json"
+
+
+def _lexical_threshold(lexical, similarity, recall):
+    """Наибольший порог лексической оценки, который пропускает долю recall подходящих резюме"""
+    positives = lexical[similarity >= MATCH_THRESHOLD]
+    if len(positives) < MIN_CALIBRATION_POSITIVES:
+        threshold = FALLBACK_LEXICAL_THRESHOLD
+        if len(positives):
+            threshold = min(threshold, float(positives.min()))
+        return threshold
+    return float(np.quantile(positives, 1 - recall, method="lower"))
+
+
+def _held_out_recall(lexical, similarity, recall):
+    """Доля подходящих резюме, которую пропускает порог, подобранный на другой половине выборки.
+
+    Двукратная перекрёстная проверка: на выборке, по которой подбирался порог, recall
+    всегда не меньше целевого и ничего не говорит об остальной пачке. None — подходящих мало.
+    """
+    positive = similarity >= MATCH_THRESHOLD
+    if np.count_nonzero(positive) < MIN_CALIBRATION_POSITIVES:
+        return None
+    half = len(lexical) // 2
+    passed = 0
+    for train, test in ((slice(None, half), slice(half, None)), (slice(half, None), slice(None, half))):
+        threshold = _lexical_threshold(lexical[train], similarity[train], recall)
+        passed += int(np.count_nonzero(lexical[test][positive[test]] >= threshold))
+    return passed / int(np.count_nonzero(positive))
+
+
+def screen(vacancy, resumes, model_path, recall=TARGET_RECALL, calibration_size=CALIBRATION_SIZE,
+           threshold=None, batch_size=32, seed=0):
+    """Каскадный скрининг пачки резюме под вакансию.
+
+    1. Лексическая оценка (навыки + TF-IDF, без трансформера) для всех резюме.
+    2. Порог первой ступени подбирается на случайной выборке, проверенной моделью, так чтобы
+       пропускать долю recall подходящих (схожесть >= MATCH_THRESHOLD). Можно задать threshold явно;
+       recall=None отключает каскад — модель считает все резюме. Пачка не больше
+       MIN_CALIBRATION_SIZE не калибруется: порог FALLBACK_LEXICAL_THRESHOLD.
+    3. Эмбеддинги RuBERT (документ целиком скользящим окном, как в интерфейсе) считаются
+       только для прошедших первую ступень.
+
+    Лексическая оценка и её порог (threshold, lexical_threshold в отчёте) — в процентах 0..100,
+    как схожесть. threshold_source в отчёте: calibrated, fallback, manual или None (без каскада).
+    calibration_recall в отчёте — доля подходящих резюме, пропущенная первой ступенью,
+    по перекрёстной проверке на калибровочной выборке (оценка для всей пачки).
+
+    Возвращает (результаты по резюме в исходном порядке, отчёт с числом сэкономленных прогонов модели).
+    """
+    resumes = list(resumes)
+    total = len(resumes)
+    report = {"resumes": total, "target_recall": recall, "timings": {}}
+    similarity = np.full(total, np.nan, dtype=np.float32)
+
+    start = time.perf_counter()
+    with span("screening", stage="lexical"):
+        lexical = get_lexical_scorer().score([vacancy], resumes)["lexical"][0] * 100
+    report["timings"]["lexical"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with span("screening", stage="embedding"):
+        vacancy_emb = get_embeddings([vacancy], model_path, batch_size=batch_size, chunked=True).numpy()[0]
+
+        def embed(indices):
+            if len(indices):
+                embs = get_embeddings([resumes[i] for i in indices], model_path, batch_size=batch_size,
+                                      chunked=True).numpy()
+                similarity[indices] = embs @ vacancy_emb * 100
+
+        calibration = np.arange(0)
+        if recall is None:
+            threshold = -np.inf
+            report["threshold_source"] = None
+        elif threshold is not None:
+            report["threshold_source"] = "manual"
+        elif total <= MIN_CALIBRATION_SIZE:
+            threshold = FALLBACK_LEXICAL_THRESHOLD
+            report["threshold_source"] = "fallback"
+        else:
+            report["threshold_source"] = "calibrated"
+            size = min(calibration_size, max(MIN_CALIBRATION_SIZE, int(total * CALIBRATION_SHARE)))
+            calibration = np.random.default_rng(seed).permutation(total)[:size]
+            embed(calibration)
+            threshold = _lexical_threshold(lexical[calibration], similarity[calibration], recall)
+            report["calibration_recall"] = _held_out_recall(lexical[calibration], similarity[calibration], recall)
+
+        passed = np.flatnonzero((lexical >= threshold) & np.isnan(similarity))
+        embed(passed)
+    report["timings"]["embedding"] = time.perf_counter() - start
+
+    embedded = int(np.count_nonzero(~np.isnan(similarity)))
+    report.update({
+        "lexical_threshold": float(threshold) if np.isfinite(threshold) else None,
+        "calibration": len(calibration),
+        "rejected_lexical": total - embedded,
+        "embedded": embedded,
+        "inferences_saved": total - embedded,
+        "saved_share": (total - embedded) / total if total else 0.0,
+        "recommended": int(np.count_nonzero(similarity >= MATCH_THRESHOLD)),
+    })
+    metrics.inc("screening_resumes_total", total)
+    metrics.inc("screening_inferences_saved_total", total - embedded)
+
+    results = []
+    for i in range(total):
+        rejected = np.isnan(similarity[i])
+        results.append({
+            "index": i,
+            "lexical": float(lexical[i]),
+            "similarity": None if rejected else float(similarity[i]),
+            "stage": "lexical" if rejected else "embedding",
+            "recommended": bool(not rejected and similarity[i] >= MATCH_THRESHOLD),
+        })
+    return results, report
+
+
+def _extract(path):
+    """Текст одного файла резюме — выполняется в пуле процессов"""
+    try:
+        return DocumentReader(path).extract_text(), None
+    except Exception as e:
+        return "", str(e)
+
+
+def screen_files(vacancy_path, source, model_path=None, output=OUTPUT_PATH, workers=None, **kwargs):
+    """Каскадный скрининг папки или zip-архива резюме под вакансию из файла"""
+    from ingest import collect_files
+
+    model_path = model_path or default_model_path()
+    vacancy = DocumentReader(vacancy_path).extract_text()
+    with collect_files(source) as (root, files):
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            extracted = list(executor.map(_extract, [str(p) for p in files], chunksize=8))
+        names = [str(path.relative_to(root)) for path in files]
+
+    failed = [{"file": name, "error": error or "Пустой текст"}
+              for name, (text, error) in zip(names, extracted) if error or not text.strip()]
+    documents = [(name, text) for name, (text, error) in zip(names, extracted) if not error and text.strip()]
+
+    results, report = screen(vacancy, [text for _, text in documents], model_path, **kwargs)
+    for result in results:
+        result["file"] = documents[result.pop("index")][0]
+    # Сначала рекомендованные, затем по схожести, отсеянные первой ступенью — по лексической оценке
+    results.sort(key=lambda r: (not r["recommended"], r["similarity"] is None,
+                                -(r["lexical"] if r["similarity"] is None else r["similarity"])))
+    report["failed"] = failed
+
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({"vacancy": str(vacancy_path), "report": report, "results": results},
+                                 ensure_ascii=False, indent=2), encoding="utf-8")
+
+    print(f"✅ Резюме: {report['resumes']}, рекомендовано: {report['recommended']}")
+    print(f"⚡ Отсеяно без модели: {report['rejected_lexical']} ({report['saved_share']:.0%} прогонов сэкономлено), "
+          f"порог первой ступени: {report['lexical_threshold']} ({report['threshold_source']})")
+    print(f"💾 Результаты: {output}")
+    return results, report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Каскадный скрининг пачки резюме под вакансию")
+    parser.add_argument("vacancy", help="Файл с описанием вакансии")
+    parser.add_argument("source", help="Папка или zip-архив с резюме")
+    parser.add_argument("--model", default=None, help="Путь к модели эмбеддингов")
+    parser.add_argument("--recall", type=float, default=TARGET_RECALL,
+                        help="Доля подходящих резюме, которую должна пропустить первая ступень")
+    parser.add_argument("--threshold", type=float, default=None,
+                        help="Порог лексической оценки в процентах (0..100, как lexical в результатах) "
+                             "вместо калибровки")
+    parser.add_argument("--calibration-size", type=int, default=CALIBRATION_SIZE)
+    parser.add_argument("--no-cascade", action="store_true", help="Считать модель для всех резюме")
+    parser.add_argument("--output", default=OUTPUT_PATH)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    screen_files(args.vacancy, args.source, model_path=args.model, output=args.output, workers=args.workers,
+                 recall=None if args.no_cascade else args.recall, threshold=args.threshold,
+                 calibration_size=args.calibration_size)
@@ -0,0 +1,86 @@
+import numpy as np
+from audio_recording import EndpointDetector, RingBuffer
+
+FRAME = 480  # 30 мс при 16 кГц
+
+
+def _frame(amplitude):
+    return np.full(FRAME, amplitude, dtype=np.int16)
+
+
+def _ramp(start, n):
+    return np.arange(start, start + n, dtype=np.int16)
+
+
+def test_ring_buffer_reads_in_order():
+    buffer = RingBuffer(8)
+    buffer.write(_ramp(0, 3))
+    buffer.write(_ramp(3, 2))
+    assert buffer.read(timeout=0).tolist() == [0, 1, 2, 3, 4]
+    assert buffer.read(timeout=0).tolist() == []
+    assert buffer.overruns == 0
+
+
+def test_ring_buffer_wraparound():
+    buffer = RingBuffer(8)
+    buffer.write(_ramp(0, 6))
+    buffer.read(timeout=0)
+    # Запись переходит через конец массива, чтение склеивает две части
+    buffer.write(_ramp(6, 5))
+    assert buffer.read(timeout=0).tolist() == [6, 7, 8, 9, 10]
+    buffer.write(_ramp(11, 8))
+    assert buffer.read(timeout=0).tolist() == list(range(11, 19))
+    assert buffer.overruns == 0
+
+
+def test_ring_buffer_overrun_keeps_newest_samples():
+    buffer = RingBuffer(8)
+    buffer.write(_ramp(0, 6))
+    buffer.write(_ramp(6, 6))
+    assert buffer.read(timeout=0).tolist() == list(range(4, 12))
+    assert buffer.overruns == 4
+
+
+def test_ring_buffer_write_larger_than_capacity():
+    buffer = RingBuffer(8)
+    buffer.write(_ramp(0, 3))
+    buffer.write(_ramp(3, 12))
+    assert buffer.read(timeout=0).tolist() == list(range(7, 15))
+    assert buffer.overruns == 7
+
+
+def test_endpoint_detector_stops_after_silence():
+    detector = EndpointDetector(silence_duration=0.3, calibration=0.3)
+    calibration = detector.calibration_frames
+    assert not any(detector.update(_frame(10)) for _ in range(calibration))
+    assert detector.noise_floor == 10
+
+    assert not any(detector.update(_frame(2000)) for _ in range(20))
+    assert detector.speech_started and detector.trailing_silence == 0
+
+    silence = [detector.update(_frame(10)) for _ in range(10)]
+    # 0.3 с тишины — это 10 кадров по 30 мс
+    assert silence == [False] * 9 + [True]
+    assert abs(detector.trailing_silence - 0.3) < 1e-9
+
+
+def test_endpoint_detector_pause_resets_on_speech():
+    detector = EndpointDetector(silence_duration=0.3, calibration=0.0)
+    detector.update(_frame(2000))
+    assert not any(detector.update(_frame(0)) for _ in range(5))
+    detector.update(_frame(2000))
+    assert detector.trailing_silence == 0
+    assert not any(detector.update(_frame(0)) for _ in range(9))
+    assert detector.update(_frame(0))
+
+
+def test_endpoint_detector_ignores_background_noise():
+    detector = EndpointDetector(calibration=0.3, noise_ratio=3.0, min_rms=300)
+    for _ in range(detector.calibration_frames):
+        detector.update(_frame(200))
+    # Громче min_rms, но тише noise_ratio * фон — не речь
+    assert not any(detector.update(_frame(500)) for _ in range(100))
+    assert not detector.speech_started
+    assert detector.trailing_silence == 0
+    detector.update(_frame(1000))
+    assert detector.speech_started
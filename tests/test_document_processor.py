@@ -0,0 +1,73 @@
+import io
+import json
+import pytest
+from document_processor import _JsonStream, _render_json, iter_json_records
+
+READ_SIZES = [1, 3, 1 << 16]
+
+RECORDS = [
+    {"name": "Иван", "skills": ["SQL", "Python"], "years": 3, "remote": True},
+    {"name": "Анна", "skills": [], "years": 12.5, "remote": None},
+    [1, -2.5e3, "строка с \"кавычками\", запятой и ]скобкой"],
+    1234567,
+    "текст",
+]
+
+
+def _write(tmp_path, text, name="data.json"):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+@pytest.mark.parametrize("read_size", READ_SIZES)
+def test_stream_values_split_across_reads(read_size):
+    stream = _JsonStream(io.StringIO(' [ 12345 , true, null , "a,b" , {"x": [1, 2]} ] '), read_size)
+    assert stream.take("[") == "["
+    # Число не обрезается на границе порции
+    assert list(stream.items()) == [12345, True, None, "a,b", {"x": [1, 2]}]
+    stream.end()
+
+
+def test_stream_take_rejects_unexpected_char():
+    stream = _JsonStream(io.StringIO("{}"), 4)
+    with pytest.raises(ValueError):
+        stream.take("[")
+
+
+@pytest.mark.parametrize("read_size", READ_SIZES)
+def test_records_from_top_level_array(tmp_path, read_size):
+    path = _write(tmp_path, json.dumps(RECORDS, ensure_ascii=False))
+    assert list(iter_json_records(path, read_size=read_size)) == RECORDS
+
+
+@pytest.mark.parametrize("read_size", READ_SIZES)
+def test_records_from_nested_array(tmp_path, read_size):
+    data = {"source": "hh", "tags": ["a", "b"], "candidates": RECORDS[:2], "total": 2}
+    path = _write(tmp_path, json.dumps(data, ensure_ascii=False, indent=2))
+    assert list(iter_json_records(path, read_size=read_size)) == RECORDS[:2]
+    assert list(iter_json_records(path, read_size=read_size, nested=False)) == [data]
+
+
+def test_object_without_records_is_one_record(tmp_path):
+    data = {"name": "Иван", "skills": ["SQL"]}
+    path = _write(tmp_path, json.dumps(data, ensure_ascii=False))
+    assert list(iter_json_records(path, read_size=2)) == [data]
+    assert list(iter_json_records(_write(tmp_path, "{}", "empty.json"))) == [{}]
+    assert list(iter_json_records(_write(tmp_path, "[]", "empty_list.json"))) == []
+
+
+@pytest.mark.parametrize("text", ['[{"a": 1}] x', '{"a": 1}{"b": 2}', '[1, 2', '[1 2]', '42 43'])
+def test_trailing_or_broken_data_raises(tmp_path, text):
+    path = _write(tmp_path, text)
+    with pytest.raises(ValueError):
+        list(iter_json_records(path, read_size=3))
+    with pytest.raises(ValueError):
+        _render_json(path, read_size=3)
+
+
+@pytest.mark.parametrize("read_size", READ_SIZES)
+@pytest.mark.parametrize("data", [RECORDS, [], {"candidates": RECORDS}, "текст", 3.5, [[]], [{}]])
+def test_render_matches_json_dumps(tmp_path, read_size, data):
+    path = _write(tmp_path, json.dumps(data, ensure_ascii=False))
+    assert _render_json(path, read_size=read_size) == json.dumps(data, ensure_ascii=False, indent=2)
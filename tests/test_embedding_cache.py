@@ -0,0 +1,84 @@
+import numpy as np
+import embedding_cache
+from embedding_cache import EmbeddingCache
+
+CONFIG = "mean|512|256"
+DIM = 4
+
+
+def _vector(i):
+    return np.full(DIM, i, dtype=np.float32)
+
+
+def _cache(tmp_path, max_entries=3, model="test-model"):
+    return EmbeddingCache(model, cache_dir=tmp_path, max_entries=max_entries)
+
+
+def _cached(cache, texts):
+    return [None if v is None else float(v[0]) for v in cache.get_many(texts, CONFIG)]
+
+
+def test_put_and_get(tmp_path):
+    cache = _cache(tmp_path)
+    assert cache.get("a", CONFIG) is None
+    cache.put_many(["a", "b"], CONFIG, [_vector(1), _vector(2)])
+    assert _cached(cache, ["a", "b", "c"]) == [1.0, 2.0, None]
+    # Другая конфигурация пулинга — другой ключ
+    assert cache.get("a", "cls|512|256") is None
+    assert cache.stats()["entries"] == 2
+
+
+def test_lru_evicts_least_recently_used(tmp_path):
+    cache = _cache(tmp_path)
+    cache.put_many(["a", "b", "c"], CONFIG, [_vector(1), _vector(2), _vector(3)])
+    cache.get("a", CONFIG)
+    cache.put("d", CONFIG, _vector(4))
+    assert _cached(cache, ["a", "b", "c", "d"]) == [1.0, None, 3.0, 4.0]
+    assert cache.evictions == 1
+    assert cache.stats()["entries"] == 3
+
+
+def test_other_process_sees_appended_entries(tmp_path):
+    first = _cache(tmp_path)
+    second = _cache(tmp_path)
+    first.put_many(["a", "b"], CONFIG, [_vector(1), _vector(2)])
+    assert _cached(second, ["a", "b"]) == [1.0, 2.0]
+
+    # Вытеснение в одном процессе занимает строку — другой процесс не отдаёт по ней чужой вектор
+    second.put_many(["c", "d"], CONFIG, [_vector(3), _vector(4)])
+    assert _cached(first, ["a", "b", "c", "d"]) == [None, 2.0, 3.0, 4.0]
+
+
+def test_log_is_compacted_into_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_cache, "LOG_COMPACT_LINES", 2)
+    cache = _cache(tmp_path, max_entries=10)
+    cache.put_many(["a", "b"], CONFIG, [_vector(1), _vector(2)])
+    assert cache.log_path.stat().st_size == 0
+    cache.put("c", CONFIG, _vector(3))
+    assert cache.log_path.stat().st_size > 0
+
+    reopened = _cache(tmp_path, max_entries=10)
+    assert _cached(reopened, ["a", "b", "c"]) == [1.0, 2.0, 3.0]
+
+
+def test_torn_log_line_is_ignored(tmp_path):
+    cache = _cache(tmp_path)
+    cache.put("a", CONFIG, _vector(1))
+    with open(cache.log_path, "ab") as f:
+        f.write(b'["deadbeef", 1')  # процесс упал посреди записи
+    reopened = _cache(tmp_path)
+    assert _cached(reopened, ["a"]) == [1.0]
+    assert reopened.stats()["entries"] == 1
+
+
+def test_model_change_resets_cache(tmp_path):
+    model = tmp_path / "model"
+    model.mkdir()
+    weights = model / "weights.bin"
+    weights.write_bytes(b"1")
+    cache_dir = tmp_path / "cache"
+    _cache(cache_dir, model=model).put("a", CONFIG, _vector(1))
+    assert _cached(_cache(cache_dir, model=model), ["a"]) == [1.0]
+
+    weights.write_bytes(b"22")
+    assert _cached(_cache(cache_dir, model=model), ["a"]) == [None]
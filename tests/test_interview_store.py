@@ -0,0 +1,82 @@
+import pytest
+from interview_store import ACTIVE, FAILED, FINISHED, InterviewStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = InterviewStore(tmp_path / "interviews.db")
+    yield store
+    store.close()
+
+
+def _start(store, interview_id="i1", num_questions=5):
+    store.start(interview_id, "Вакансия", "Резюме", num_questions, job_title="Аналитик")
+
+
+def test_load_missing(store):
+    assert store.load("nope") is None
+
+
+def test_load_pairs(store):
+    _start(store)
+    store.add_question("i1", 1, "q1", first_token=0.5)
+    store.add_answer("i1", 1, "a1")
+    store.add_question("i1", 2, "q2")
+    store.add_answer("i1", 2, "a2")
+    store.finish("i1", "фидбек", "оценка", timings={"llm": 1.5})
+
+    record = store.load("i1")
+    assert record["questions"] == ["q1", "q2"]
+    assert record["answers"] == ["a1", "a2"]
+    assert record["numbers"] == [1, 2]
+    assert record["status"] == FINISHED and record["terminated"] is False
+    assert record["timings"] == {"llm": 1.5}
+    assert record["overall_feedback"] == "фидбек"
+
+
+def test_load_skips_unanswered_question(store):
+    _start(store)
+    store.add_question("i1", 1, "q1")
+    store.add_answer("i1", 1, "a1")
+    store.add_question("i1", 2, "q2")  # процесс упал во время ответа
+
+    record = store.load("i1")
+    assert record["status"] == ACTIVE
+    assert (record["questions"], record["answers"], record["numbers"]) == (["q1"], ["a1"], [1])
+
+
+def test_load_keeps_numbers_after_gap(store):
+    _start(store)
+    for number in (1, 2, 3):
+        store.add_question("i1", number, f"q{number}")
+        if number != 2:  # ответ на второй вопрос не записался
+            store.add_answer("i1", number, f"a{number}")
+
+    record = store.load("i1")
+    assert record["questions"] == ["q1", "q3"]
+    assert record["answers"] == ["a1", "a3"]
+    # Продолжение начинается после наибольшего номера, а не после числа пар
+    assert record["numbers"] == [1, 3]
+
+
+def test_repeated_question_takes_latest(store):
+    _start(store)
+    store.add_question("i1", 1, "q1")
+    store.add_question("i1", 1, "q1 заново")
+    store.add_answer("i1", 1, "a1")
+    assert store.load("i1")["questions"] == ["q1 заново"]
+
+
+def test_unfinished_and_stats(store):
+    for interview_id in ("i1", "i2", "i3"):
+        _start(store, interview_id)
+    store.finish("i1", "", "")
+    store.fail("i2", RuntimeError("boom"))
+
+    assert [r["id"] for r in store.unfinished()] == ["i3"]
+    assert store.stats() == {FINISHED: 1, FAILED: 1, ACTIVE: 1}
+    assert store.load("i2")["error"] == "boom"
+    # Продолжение снова делает интервью активным
+    _start(store, "i2")
+    assert {r["id"] for r in store.unfinished()} == {"i2", "i3"}
+    assert [e["kind"] for e in store.events("i2")] == ["start", "fail", "start"]
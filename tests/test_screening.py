@@ -0,0 +1,119 @@
+import numpy as np
+import pytest
+import screening
+from screening import (FALLBACK_LEXICAL_THRESHOLD, MATCH_THRESHOLD, MIN_CALIBRATION_SIZE,
+                       _held_out_recall, _lexical_threshold, screen)
+
+
+def _batch(n, seed=0):
+    """Лексическая оценка (%) и схожесть (%), положительно связанные между собой"""
+    rng = np.random.default_rng(seed)
+    lexical = rng.uniform(0, 40, n)
+    similarity = 60 + lexical + rng.normal(0, 8, n)
+    return lexical, similarity
+
+
+@pytest.mark.parametrize("recall", [0.8, 0.95, 1.0])
+def test_threshold_keeps_target_recall(recall):
+    lexical, similarity = _batch(500)
+    threshold = _lexical_threshold(lexical, similarity, recall)
+    positives = lexical[similarity >= MATCH_THRESHOLD]
+    assert np.mean(positives >= threshold) >= recall
+    assert threshold > FALLBACK_LEXICAL_THRESHOLD
+
+
+def test_threshold_with_few_positives_falls_back():
+    lexical = np.array([1.0, 30.0, 40.0, 0.5])
+    assert _lexical_threshold(lexical, np.array([10.0, 20.0, 30.0, 40.0]), 0.95) == FALLBACK_LEXICAL_THRESHOLD
+    # Найденных подходящих порог не отсекает
+    similarity = np.array([10.0, 20.0, 30.0, 90.0])
+    assert _lexical_threshold(lexical, similarity, 0.95) == 0.5
+
+
+def test_held_out_recall():
+    lexical, similarity = _batch(500)
+    recall = _held_out_recall(lexical, similarity, 0.9)
+    assert 0.0 <= recall <= 1.0
+
+    # Порог, подобранный на одной половине, на другой пропускает около целевой доли
+    lexical = np.arange(1000, dtype=float)
+    similarity = np.where(lexical >= 500, 95.0, 20.0)
+    order = np.random.default_rng(1).permutation(1000)
+    assert _held_out_recall(lexical[order], similarity[order], 0.95) == pytest.approx(0.95, abs=0.02)
+
+
+def test_held_out_recall_needs_positives():
+    lexical, similarity = _batch(100)
+    assert _held_out_recall(lexical, np.minimum(similarity, 10.0), 0.95) is None
+
+
+class _Embeddings:
+    def __init__(self, array):
+        self.array = array
+
+    def numpy(self):
+        return self.array
+
+
+class _Scorer:
+    def __init__(self, lexical):
+        self.lexical = lexical
+
+    def score(self, vacancies, resumes):
+        return {"lexical": self.lexical[None, :] / 100}
+
+
+@pytest.fixture
+def fake_models(monkeypatch):
+    """Лексическая оценка и эмбеддинги без моделей: схожесть резюме задаётся в его тексте"""
+    calls = []
+
+    def get_embeddings(texts, model_path, batch_size=32, chunked=False):
+        if texts == ["vacancy"]:
+            return _Embeddings(np.array([[1.0, 0.0]], dtype=np.float32))
+        calls.extend(texts)
+        return _Embeddings(np.array([[float(t) / 100, 0.0] for t in texts], dtype=np.float32))
+
+    def install(lexical):
+        monkeypatch.setattr(screening, "get_lexical_scorer", lambda: _Scorer(lexical))
+        return calls
+
+    monkeypatch.setattr(screening, "get_embeddings", get_embeddings)
+    return install
+
+
+def test_small_batch_skips_calibration(fake_models):
+    lexical, similarity = _batch(MIN_CALIBRATION_SIZE)
+    calls = fake_models(lexical)
+    results, report = screen("vacancy", [str(s) for s in similarity], "model")
+
+    assert report["threshold_source"] == "fallback"
+    assert report["lexical_threshold"] == FALLBACK_LEXICAL_THRESHOLD
+    assert report["calibration"] == 0 and "calibration_recall" not in report
+    passed = np.count_nonzero(lexical >= FALLBACK_LEXICAL_THRESHOLD)
+    assert report["embedded"] == len(calls) == passed
+
+
+def test_large_batch_is_calibrated(fake_models):
+    lexical, similarity = _batch(1000)
+    calls = fake_models(lexical)
+    results, report = screen("vacancy", [str(s) for s in similarity], "model", recall=0.9)
+
+    assert report["threshold_source"] == "calibrated"
+    assert report["calibration"] == 100
+    assert report["calibration_recall"] is not None
+    # Каждое резюме прогоняется через модель не больше одного раза
+    assert len(calls) == len(set(calls)) == report["embedded"]
+    rejected = [r for r in results if r["stage"] == "lexical"]
+    assert all(r["lexical"] < report["lexical_threshold"] for r in rejected)
+
+
+def test_manual_threshold_and_no_cascade(fake_models):
+    lexical, similarity = _batch(200)
+    fake_models(lexical)
+    _, report = screen("vacancy", [str(s) for s in similarity], "model", threshold=20.0)
+    assert report["threshold_source"] == "manual"
+    assert report["embedded"] == np.count_nonzero(lexical >= 20.0)
+
+    _, report = screen("vacancy", [str(s) for s in similarity], "model", recall=None)
+    assert report["threshold_source"] is None and report["embedded"] == 200
@@ -0,0 +1,103 @@
+import json
+import numpy as np
+import pytest
+from vector_index import VectorIndex
+
+DIM = 16
+
+
+def _vectors(n, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(n, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _index(n, mode="exact"):
+    index = VectorIndex(DIM, mode=mode, n_probe=4)
+    vectors = _vectors(n)
+    ids = [f"c{i}" for i in range(n)]
+    index.add_many(ids, vectors, [{"row": i} for i in range(n)])
+    index.wait_training()
+    return index, ids, vectors
+
+
+def _top(index, vector, **kwargs):
+    return index.search(vector, top_k=1, **kwargs)[0]["candidate_id"]
+
+
+def test_search_and_replace():
+    index, ids, vectors = _index(50)
+    results = index.search(vectors[7], top_k=3)
+    assert results[0]["candidate_id"] == "c7"
+    assert results[0]["score"] == pytest.approx(100, abs=1e-3)
+    assert results[0]["metadata"] == {"row": 7}
+    assert [r["score"] for r in results] == sorted((r["score"] for r in results), reverse=True)
+
+    index.add("c7", vectors[8])
+    assert len(index) == 50
+    assert {r["candidate_id"] for r in index.search(vectors[8], top_k=2)} == {"c7", "c8"}
+
+
+def test_remove_moves_last_row():
+    index, ids, vectors = _index(20)
+    assert index.remove("c3")
+    assert not index.remove("c3")
+    assert "c3" not in index and len(index) == 19
+    # На место удалённой строки перенесена последняя
+    assert _top(index, vectors[19]) == "c19"
+    for i in range(20):
+        if i != 3:
+            assert _top(index, vectors[i]) == f"c{i}"
+    assert _top(index, vectors[3]) != "c3"
+
+
+def test_remove_keeps_ivf_assignment():
+    index, ids, vectors = _index(400, mode="ivf")
+    assert index._centroids is not None
+    for i in range(0, 400, 3):
+        index.remove(f"c{i}")
+    # Вектор кандидата всегда в кластере, который ищется первым
+    for i in range(400):
+        if i % 3:
+            assert _top(index, vectors[i], n_probe=1) == f"c{i}"
+
+
+@pytest.mark.parametrize("mode", ["exact", "ivf"])
+def test_save_load_roundtrip(tmp_path, mode):
+    index, ids, vectors = _index(300, mode=mode)
+    index.remove("c0")
+    index.save(tmp_path)
+    loaded = VectorIndex.load(tmp_path)
+    loaded.wait_training()
+
+    assert len(loaded) == 299 and "c0" not in loaded
+    assert loaded.mode == mode
+    assert loaded.metadata["c5"] == {"row": 5}
+    assert (loaded._centroids is not None) == (mode == "ivf")
+    for i in range(1, 300, 7):
+        assert loaded.search(vectors[i], top_k=1) == index.search(vectors[i], top_k=1)
+
+
+def test_save_replaces_previous_files(tmp_path):
+    index, ids, vectors = _index(10)
+    index.save(tmp_path)
+    index.add("new", _vectors(1, seed=1)[0])
+    index.save(tmp_path)
+
+    info = json.loads((tmp_path / "index.json").read_text(encoding="utf-8"))
+    assert sorted(p.name for p in tmp_path.glob("*.npy")) == sorted(info["files"].values())
+    assert not list(tmp_path.glob("*.tmp"))
+    assert len(VectorIndex.load(tmp_path)) == 11
+
+
+def test_load_unversioned_files(tmp_path):
+    index, ids, vectors = _index(10)
+    index.save(tmp_path)
+    # Формат до версионирования: постоянные имена файлов и нет ключа files
+    info = json.loads((tmp_path / "index.json").read_text(encoding="utf-8"))
+    for name, filename in info.pop("files").items():
+        (tmp_path / filename).rename(tmp_path / f"{name}.npy")
+    (tmp_path / "index.json").write_text(json.dumps(info), encoding="utf-8")
+
+    loaded = VectorIndex.load(tmp_path)
+    assert len(loaded) == 10
+    assert _top(loaded, vectors[4]) == "c4"
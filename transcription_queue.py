@@ -0,0 +1,96 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from audio_text import check_audio_file, get_transcription_engine
+from metrics import metrics, current_interview
+
+TRANSCRIPTION_WORKERS = 1
+TRANSCRIPTION_BATCH_SIZE = 8
+# Сколько ждать, пока в очереди накопятся записи для совместного распознавания
+BATCH_WAIT = 0.05
+
+
+class TranscriptionQueue:
+    """Фоновое распознавание ответов: запись отправляется в очередь, текст забирается из Future"""
+
+    def __init__(self, workers=TRANSCRIPTION_WORKERS, batch_size=TRANSCRIPTION_BATCH_SIZE, batch_wait=BATCH_WAIT):
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self._queue = queue.Queue()
+        self._threads = []
+        for i in range(workers):
+            thread = threading.Thread(target=self._worker, name=f"transcription-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, audio_file):
+        """Ставит запись в очередь и сразу возвращает Future с будущим текстом"""
+        future = Future()
+        error = check_audio_file(audio_file)
+        if error:
+            future.set_result(error)
+        else:
+            # Время от постановки в очередь до текста — в трассу интервью, отправившего запись
+            submitted, interview = time.perf_counter(), current_interview()
+            future.add_done_callback(lambda _: metrics.record_span(
+                "asr_queue", time.perf_counter() - submitted, interview))
+            self._queue.put((audio_file, future))
+        return future
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def shutdown(self):
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            # Добираем записи, пришедшие почти одновременно (например, из разных интервью)
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=self.batch_wait)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+            self._transcribe(batch)
+
+    def _transcribe(self, batch):
+        batch = [(audio_file, future) for audio_file, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        audio_files = [audio_file for audio_file, _ in batch]
+        try:
+            engine = get_transcription_engine()
+            if len(audio_files) == 1:
+                texts = [engine.transcribe(audio_files[0])]
+            else:
+                texts = engine.transcribe_batch(audio_files)
+        except Exception as e:
+            print(f"❌ Ошибка распознавания Whisper: {e}")
+            texts = ["Ошибка распознавания речи"] * len(batch)
+        for (_, future), text in zip(batch, texts):
+            future.set_result(text)
+
+
+_transcription_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_transcription_queue():
+    """Общая очередь распознавания процесса (создаётся при первом обращении)"""
+    global _transcription_queue
+    with _queue_lock:
+        if _transcription_queue is None:
+            _transcription_queue = TranscriptionQueue()
+    return _transcription_queue
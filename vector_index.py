@@ -0,0 +1,326 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+import numpy as np
+
+INDEX_DIR = "index/resumes"
+# С этого размера пула в режиме "auto" включается приближённый поиск (IVF)
+IVF_MIN_SIZE = 20000
+
+
+def _kmeans(vectors, n_lists, iterations=10, seed=0):
+    """Сферический k-means: центроиды кластеров для нормализованных векторов"""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, vectors)
+        empty = ~sums.any(axis=1)
+        # Пустые кластеры переинициализируем случайными векторами
+        sums[empty] = vectors[rng.integers(len(vectors), size=int(empty.sum()))]
+        centroids = sums / (np.linalg.norm(sums, axis=1, keepdims=True) + 1e-12)
+    return centroids.astype(np.float32)
+
+
+class VectorIndex:
+    """Индекс эмбеддингов резюме с метаданными кандидатов.
+
+    mode: "exact" — полный перебор, "ivf" — поиск только в ближайших кластерах,
+    "auto" — перебор для небольших пулов и IVF начиная с IVF_MIN_SIZE резюме.
+    Кластеры обучаются в фоновом потоке (при добавлении, загрузке или первом поиске);
+    пока их нет, поиск идёт полным перебором.
+    """
+
+    def __init__(self, dim, mode="auto", n_probe=8):
+        if mode not in ("exact", "ivf", "auto"):
+            raise ValueError(f"Неизвестный режим индекса: {mode}")
+        self.dim = dim
+        self.mode = mode
+        self.n_probe = n_probe
+
+        self._vectors = np.empty((1024, dim), dtype=np.float32)
+        self._ids = []  # строка матрицы -> id кандидата
+        self._rows = {}  # id кандидата -> строка матрицы
+        self.metadata = {}
+        self._centroids = None
+        self._assign = np.empty(1024, dtype=np.int32)
+        self._trained_size = 0
+        self._training = None  # фоновый поток обучения кластеров
+        # Счётчик изменений уже существующих строк (замена вектора, удаление): по нему
+        # фоновое обучение понимает, можно ли применить посчитанное без блокировки разбиение
+        self._mutations = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, candidate_id):
+        return candidate_id in self._rows
+
+    def add(self, candidate_id, vector, metadata=None):
+        """Добавляет или заменяет резюме кандидата"""
+        self.add_many([candidate_id], np.asarray(vector).reshape(1, -1), [metadata])
+
+    def add_many(self, candidate_ids, vectors, metadatas=None):
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        metadatas = metadatas or [None] * len(candidate_ids)
+        with self._lock:
+            self._reserve(len(self._ids) + len(candidate_ids))
+            for candidate_id, vector, metadata in zip(candidate_ids, vectors, metadatas):
+                row = self._rows.get(candidate_id)
+                if row is None:
+                    row = len(self._ids)
+                    self._ids.append(candidate_id)
+                    self._rows[candidate_id] = row
+                else:
+                    self._mutations += 1
+                self._vectors[row] = vector
+                if self._centroids is not None:
+                    self._assign[row] = np.argmax(self._centroids @ vector)
+                self.metadata[candidate_id] = metadata or {}
+            self._start_training()
+
+    def remove(self, candidate_id):
+        """Удаляет кандидата: на его место переносится последняя строка матрицы"""
+        with self._lock:
+            row = self._rows.pop(candidate_id, None)
+            if row is None:
+                return False
+            self.metadata.pop(candidate_id, None)
+            self._mutations += 1
+            last = len(self._ids) - 1
+            if row != last:
+                moved_id = self._ids[last]
+                self._vectors[row] = self._vectors[last]
+                self._assign[row] = self._assign[last]
+                self._ids[row] = moved_id
+                self._rows[moved_id] = row
+            self._ids.pop()
+            return True
+
+    def _reserve(self, size):
+        if size <= len(self._vectors):
+            return
+        capacity = max(size, 2 * len(self._vectors))
+        vectors = np.empty((capacity, self.dim), dtype=np.float32)
+        vectors[:len(self._ids)] = self._vectors[:len(self._ids)]
+        assign = np.empty(capacity, dtype=np.int32)
+        assign[:len(self._ids)] = self._assign[:len(self._ids)]
+        self._vectors, self._assign = vectors, assign
+
+    def train(self, n_lists=None, iterations=10, sample_size=50000):
+        """Строит кластеры для приближённого поиска по текущему пулу (синхронно)"""
+        with self._lock:
+            snapshot = self._snapshot()
+        if snapshot is not None:
+            self._fit_and_install(*snapshot, n_lists=n_lists, iterations=iterations, sample_size=sample_size)
+
+    def _snapshot(self):
+        """Копия векторов для обучения без блокировки (вызывается под self._lock)"""
+        size = len(self._ids)
+        if size == 0:
+            return None
+        return self._vectors[:size].copy(), self._mutations
+
+    def _fit_and_install(self, vectors, mutations, n_lists=None, iterations=10, sample_size=50000):
+        start = time.perf_counter()
+        size = len(vectors)
+        n_lists = min(n_lists or int(np.sqrt(size)), size)
+        sample = vectors
+        if size > sample_size:
+            sample = vectors[np.random.default_rng(0).choice(size, sample_size, replace=False)]
+        centroids = _kmeans(sample, n_lists, iterations)
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+
+        with self._lock:
+            current = len(self._ids)
+            if mutations == self._mutations and current >= size:
+                # Строки снимка не менялись — досчитываем только добавленные после него
+                self._assign[:size] = assign
+                if current > size:
+                    self._assign[size:current] = np.argmax(self._vectors[size:current] @ centroids.T, axis=1)
+            else:
+                self._assign[:current] = np.argmax(self._vectors[:current] @ centroids.T, axis=1)
+            self._centroids = centroids
+            self._trained_size = size
+        print(f"✅ Индекс резюме обучен: {size} векторов, {n_lists} кластеров "
+              f"({time.perf_counter() - start:.1f} с)")
+
+    def _needs_training(self):
+        if self.mode == "exact":
+            return False
+        if self.mode == "auto" and len(self._ids) < IVF_MIN_SIZE:
+            return False
+        # Пул вырос в разы с момента обучения — кластеры пересчитываем
+        return self._centroids is None or len(self._ids) > 4 * self._trained_size
+
+    def _start_training(self):
+        """Запускает обучение кластеров в фоне, если оно нужно (вызывается под self._lock)"""
+        if self._training is not None or not self._needs_training():
+            return
+        snapshot = self._snapshot()
+        if snapshot is None:
+            return
+
+        def run():
+            try:
+                self._fit_and_install(*snapshot)
+            except Exception as e:
+                print(f"⚠️ Не удалось обучить индекс резюме: {e}")
+            finally:
+                with self._lock:
+                    self._training = None
+
+        self._training = threading.Thread(target=run, name="resume-index-train", daemon=True)
+        self._training.start()
+
+    def wait_training(self, timeout=None):
+        """Ждёт окончания фонового обучения кластеров"""
+        training = self._training
+        if training is not None:
+            training.join(timeout)
+
+    def _use_ivf(self):
+        if self.mode == "exact" or (self.mode == "auto" and len(self._ids) < IVF_MIN_SIZE):
+            return False
+        self._start_training()
+        # Пока кластеров нет, ищем полным перебором; устаревшие кластеры работают до замены
+        return self._centroids is not None
+
+    def search(self, query, top_k=10, min_score=None, n_probe=None):
+        """Лучшие кандидаты для вектора вакансии.
+
+        Возвращает список словарей {"candidate_id", "score" (схожесть в %), "metadata"}.
+        """
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        with self._lock:
+            size = len(self._ids)
+            if size == 0:
+                return []
+
+            if self._use_ivf():
+                probes = np.argsort(-(self._centroids @ query))[:n_probe or self.n_probe]
+                rows = np.flatnonzero(np.isin(self._assign[:size], probes))
+                scores = (self._vectors[rows] @ query) * 100
+            else:
+                rows = None
+                scores = (self._vectors[:size] @ query) * 100
+
+            k = min(top_k, len(scores))
+            if k == 0:
+                return []
+            best = np.argpartition(-scores, k - 1)[:k]
+            best = best[np.argsort(-scores[best])]
+
+            results = []
+            for i in best:
+                score = float(scores[i])
+                if min_score is not None and score < min_score:
+                    break
+                candidate_id = self._ids[rows[i] if rows is not None else i]
+                results.append({"candidate_id": candidate_id, "score": score,
+                                "metadata": self.metadata.get(candidate_id, {})})
+            return results
+
+    def save(self, path=INDEX_DIR):
+        """Сохраняет индекс в папку: векторы и кластеры в .npy, id и метаданные в JSON.
+
+        Массивы пишутся в новые файлы с меткой версии, index.json со ссылками на них
+        заменяется атомарно последним — прерванное сохранение оставляет прежний набор целым.
+        """
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        previous = _index_files(path) if (path / "index.json").exists() else []
+        with self._lock:
+            size = len(self._ids)
+            tag = f"{time.time_ns():x}.{os.getpid()}"
+            arrays = {"vectors": self._vectors[:size], "assign": self._assign[:size]}
+            if self._centroids is not None:
+                arrays["centroids"] = self._centroids
+            files = {}
+            for name, array in arrays.items():
+                files[name] = f"{name}.{tag}.npy"
+                _save_array(path / files[name], array)
+            info = {
+                "dim": self.dim,
+                "mode": self.mode,
+                "n_probe": self.n_probe,
+                "trained_size": self._trained_size if self._centroids is not None else 0,
+                "files": files,
+                "ids": self._ids,
+                "metadata": self.metadata,
+            }
+            tmp_path = path / f"index.json.{os.getpid()}.tmp"
+            tmp_path.write_text(json.dumps(info, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp_path, path / "index.json")
+
+        # Файлы заменённой версии больше не нужны (чужие незавершённые сохранения не трогаем)
+        for name in set(previous) - set(files.values()):
+            try:
+                (path / name).unlink()
+            except OSError:
+                pass
+
+    @classmethod
+    def load(cls, path=INDEX_DIR):
+        path = Path(path)
+        info = json.loads((path / "index.json").read_text(encoding="utf-8"))
+        files = _files_of(info)
+        index = cls(info["dim"], mode=info["mode"], n_probe=info["n_probe"])
+        vectors = np.load(path / files["vectors"])
+        size = len(info["ids"])
+        index._reserve(size)
+        index._vectors[:size] = vectors[:size]
+        index._assign[:size] = np.load(path / files["assign"])[:size]
+        index._ids = list(info["ids"])
+        index._rows = {candidate_id: row for row, candidate_id in enumerate(index._ids)}
+        index.metadata = info["metadata"]
+        if info["trained_size"] and "centroids" in files and (path / files["centroids"]).exists():
+            index._centroids = np.load(path / files["centroids"])
+            index._trained_size = info["trained_size"]
+        with index._lock:
+            index._start_training()
+        return index
+
+
+def _files_of(info):
+    # Индексы, сохранённые до версионирования файлов, ссылаются на постоянные имена
+    return info.get("files") or {name: f"{name}.npy" for name in ("vectors", "assign", "centroids")}
+
+
+def _index_files(path):
+    """Файлы массивов, на которые ссылается текущий index.json"""
+    try:
+        return list(_files_of(json.loads((path / "index.json").read_text(encoding="utf-8"))).values())
+    except (OSError, ValueError):
+        return []
+
+
+def _save_array(path, array):
+    """np.save во временный файл и атомарная замена"""
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+# Пул резюме загружается с диска один раз на процесс
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_resume_index(dim, path=INDEX_DIR):
+    """Индекс резюме из папки path (или новый пустой)"""
+    key = str(path)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            if (Path(path) / "index.json").exists():
+                index = VectorIndex.load(path)
+            else:
+                index = VectorIndex(dim)
+            _indexes[key] = index
+    return index
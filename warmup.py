@@ -0,0 +1,73 @@
+import threading
+import time
+
+WARMUP_TEXT = "Прогрев модели"
+
+
+class Warmup:
+    """Фоновая загрузка моделей при старте сервера, чтобы первый пользователь не ждал.
+
+    Модели попадают в общие реестры процесса (get_embedding_service, get_transcription_engine),
+    поэтому последующие вызовы берут уже загруженные.
+    """
+
+    def __init__(self, embedding_model=None, whisper=True):
+        self.embedding_model = embedding_model
+        self.whisper = whisper
+        self.timings = {}
+        self.errors = {}
+        self.done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def wait(self, timeout=None):
+        return self.done.wait(timeout)
+
+    def status(self):
+        return {"done": self.done.is_set(), "timings": dict(self.timings), "errors": dict(self.errors)}
+
+    def _run(self):
+        try:
+            if self.embedding_model:
+                self._step("embedding", self._warm_embeddings)
+            if self.whisper:
+                self._step("whisper", self._warm_whisper)
+        finally:
+            self.done.set()
+
+    def _step(self, name, func):
+        start = time.perf_counter()
+        try:
+            func()
+            self.timings[name] = time.perf_counter() - start
+            print(f"🔥 Прогрев {name}: {self.timings[name]:.1f} с")
+        except Exception as e:
+            self.errors[name] = str(e)
+            print(f"⚠️ Ошибка прогрева {name}: {e}")
+
+    def _warm_embeddings(self):
+        from embeddings import get_embedding_service
+        # Первый проход модели заметно дольше последующих — делаем его заранее
+        get_embedding_service(self.embedding_model).embed(WARMUP_TEXT)
+
+    @staticmethod
+    def _warm_whisper():
+        import numpy as np
+        from audio_text import WHISPER_SAMPLE_RATE, get_transcription_engine
+        get_transcription_engine().decode_window(np.zeros(WHISPER_SAMPLE_RATE, dtype=np.float32))
+
+
+_warmup = None
+_warmup_lock = threading.Lock()
+
+
+def start_warmup(embedding_model=None, whisper=True):
+    """Запускает прогрев один раз на процесс и возвращает его (повторные вызовы — тот же объект)"""
+    global _warmup
+    with _warmup_lock:
+        if _warmup is None:
+            _warmup = Warmup(embedding_model, whisper=whisper).start()
+    return _warmup